@@ -0,0 +1,152 @@
+"""Adaptive timeouts and poll intervals for the SSMS window polling loops."""
+
+import atexit
+import threading
+import time
+from state import settings
+
+class PollSchedule:
+    """Sleep schedule for one wait
+
+    Polls coarsely while the expected completion time is still far off,
+    halving the sleep as it gets closer, then backs off exponentially from
+    min_interval once it has passed, never sleeping past the deadline.
+    """
+
+    def __init__(self, timing, stage, expected, timeout, min_interval, max_interval, default=None):
+        self.timing = timing
+        self.stage = stage
+        self.expected = expected
+        self.timeout = timeout
+        self.default = timeout if default is None else default  # The caller's timeout before stretching
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.start = time.monotonic()
+        self.deadline = self.start + timeout
+        self.backoff = min_interval  # Next sleep once past the expected time
+        self.polls = 0
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def expired(self):
+        return time.monotonic() >= self.deadline
+
+    def next_interval(self):
+        to_expected = self.expected - self.elapsed()
+        if to_expected > self.min_interval:
+            interval = to_expected / 2
+        else:
+            interval = self.backoff
+            self.backoff = min(self.backoff * 2, self.max_interval)
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        return max(0.0, min(interval, self.deadline - time.monotonic()))
+
+    def sleep(self):
+        self.polls += 1
+        time.sleep(self.next_interval())
+
+    def succeeded(self):
+        """Record how long the wait took"""
+        self.timing.record(self.stage, self.elapsed())
+
+    def timed_out(self):
+        """Record a wait that ran out, counted as taking the default timeout
+
+        The full (possibly stretched) wait would lift the mean and deviation
+        enough to keep the timeout stretched for good after a single miss.
+        """
+        self.timing.record(self.stage, min(self.elapsed(), self.default), timed_out=True)
+
+class AdaptiveTiming:
+    """Learned latency per polling stage, persisted in the [AdaptiveTiming] section of settings.ini
+
+    Each stage keeps an EWMA of how long its waits took and of their
+    deviation (like TCP's retransmission timer). Waits poll tightly around
+    the mean, and the timeout stretches to mean + 4 deviations when that's
+    longer than the caller's default, up to MAX_STRETCH times the default.
+    Timeouts are counted as samples at the default timeout, so a one-off
+    timeout decays away as later waits succeed and a wait that never
+    succeeds settles back to its default, while waits that succeed slowly
+    still stretch it.
+    """
+
+    ALPHA = 0.125  # Weight of a new sample in the mean
+    BETA = 0.25  # Weight of a new sample in the deviation
+    DEV_FACTOR = 4
+    MAX_STRETCH = 3
+    # Seconds to wait after the last sample before writing settings.ini
+    SAVE_DELAY = 30.0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}  # stage -> [mean, deviation]
+        self.loaded = set()  # Stages already read from settings
+        self.dirty = set()
+        self._save_timer = None
+
+    def _get(self, stage):
+        if stage not in self.loaded:
+            self.loaded.add(stage)
+            learned = settings.get_adaptive_timing(stage)
+            if learned and stage not in self.stages:
+                self.stages[stage] = list(learned)
+        return self.stages.get(stage)
+
+    def expected(self, stage):
+        """Get the learned mean wait for a stage in seconds (0 when nothing is learned yet)"""
+        with self.lock:
+            learned = self._get(stage)
+            return learned[0] if learned else 0.0
+
+    def timeout(self, stage, default):
+        """Get the timeout for a stage: the default, stretched if waits have been taking longer"""
+        with self.lock:
+            learned = self._get(stage)
+        if not learned:
+            return default
+        mean, dev = learned
+        return min(max(default, mean + self.DEV_FACTOR * dev), default * self.MAX_STRETCH)
+
+    def start(self, stage, timeout, min_interval=0.01, max_interval=0.1):
+        """Start a wait for a stage, timeout being the default the learned value can stretch"""
+        return PollSchedule(self, stage, self.expected(stage), self.timeout(stage, timeout), min_interval, max_interval,
+                            default=timeout)
+
+    def record(self, stage, seconds, timed_out=False):
+        with self.lock:
+            learned = self._get(stage)
+            if learned is None:
+                self.stages[stage] = [seconds, seconds / 2]
+            else:
+                mean, dev = learned
+                learned[1] = (1 - self.BETA) * dev + self.BETA * abs(seconds - mean)
+                learned[0] = (1 - self.ALPHA) * mean + self.ALPHA * seconds
+            self.dirty.add(stage)
+            if self._save_timer:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.SAVE_DELAY, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+        if timed_out:
+            print(f"[adaptive_timing] {stage} timed out (counted as {seconds:.2f}s), learned mean now {self.expected(stage):.2f}s")
+
+    def save(self):
+        """Store changed stages in settings (written with the next settings flush)"""
+        with self.lock:
+            if self._save_timer:
+                self._save_timer.cancel()
+                self._save_timer = None
+            changed = {stage: tuple(self.stages[stage]) for stage in self.dirty}
+            self.dirty = set()
+        if changed:
+            settings.set_adaptive_timing(changed)
+
+    def get_stats(self):
+        """Get {stage: (mean, deviation)} in seconds"""
+        with self.lock:
+            return {stage: tuple(values) for stage, values in self.stages.items()}
+
+# Shared instance used by the polling loops, saved before state's exit flush of settings.ini
+adaptive_timing = AdaptiveTiming()
+atexit.register(adaptive_timing.save)
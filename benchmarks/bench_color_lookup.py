@@ -0,0 +1,51 @@
+"""Microbenchmark: Settings color lookup cost as tracked combinations grow.
+
+Run from the repo root:
+    python benchmarks/bench_color_lookup.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import Settings
+
+SIZES = [10, 100, 1000, 10000]
+LOOKUPS = 100000
+
+def build_settings(path, count):
+    """Write a settings.ini with `count` server.db combinations and load it"""
+    with open(path, "w") as f:
+        f.write("[Appearance]\ngroupingmode = server_db\n\n[TabColoringServer]\n")
+        for i in range(count // 10 + 1):
+            f.write(f"srv{i} = {i % 17}\n")
+        f.write("\n[TabColoringDB]\n")
+        for i in range(count):
+            f.write(f"srv{i // 10}.db{i} = {i % 17}\n")
+    return Settings(path)
+
+def bench(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = build_settings(os.path.join(tmp, "settings.ini"), count)
+        keys = [(f"SRV{i // 10}", f"DB{i}") for i in random.sample(range(count), min(count, 1000))]
+        # Include some misses that fall back to the server color / default
+        keys += [(f"SRV{i}", "MISSING") for i in range(50)]
+
+        start = time.perf_counter()
+        for i in range(LOOKUPS):
+            server, db = keys[i % len(keys)]
+            settings.get_tab_color_for_combination(server, db)
+        elapsed = time.perf_counter() - start
+    return elapsed / LOOKUPS * 1e9
+
+def main():
+    print(f"{'combinations':>12}  {'ns/lookup':>10}")
+    for count in SIZES:
+        print(f"{count:>12}  {bench(count):>10.0f}")
+
+if __name__ == "__main__":
+    main()
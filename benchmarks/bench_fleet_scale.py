@@ -0,0 +1,176 @@
+"""Benchmark: regex writer and settings hot paths as tracked combinations grow.
+
+Generates a settings.ini with N server.db combinations and a temp dir with a
+few SSMS ColorByRegexConfig.txt files for each size, then reports the time
+and tracemalloc peak of each operation. Every operation runs twice on fresh
+state: once for the time (tracemalloc slows allocation-heavy code down a
+lot) and once for the peak memory.
+
+Run from the repo root:
+    python benchmarks/bench_fleet_scale.py
+    python benchmarks/bench_fleet_scale.py --sizes 10 1000 50000 --backend sqlite --compact
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import CONFIG_PATH
+# Importing state creates settings.ini if it's missing, don't leave one behind
+SETTINGS_EXISTED = os.path.exists(CONFIG_PATH)
+
+from settings import Settings
+from state import state
+from config_index import config_index
+from metrics import metrics
+import regex_writer
+
+SIZES = [10, 100, 1000, 10000, 50000]
+ADDS = 100  # New combinations per add_server_db / write_to_regex_file run
+CALLS = 100  # get_configured_db_combinations calls per run
+
+def build_tree(root, count, config_files, compact):
+    """Write settings.ini with `count` combinations and a temp dir with SSMS config folders"""
+    settings_path = os.path.join(root, "settings.ini")
+    with open(settings_path, "w") as f:
+        f.write("[Appearance]\ngroupingmode = server_db\n")
+        f.write(f"compactregex = {'true' if compact else 'false'}\n\n[TabColoringServer]\n")
+        for i in range(count // 10 + 1):
+            f.write(f"srv{i} = {i % 17}\n")
+        f.write("\n[TabColoringDB]\n")
+        for i in range(count):
+            f.write(f"srv{i // 10}.db{i} = {i % 17}\n")
+
+    temp_dir = os.path.join(root, "temp")
+    for i in range(config_files):
+        folder = os.path.join(temp_dir, f"{i:08x}-d9cb-469f-a165-70867728950e")
+        os.makedirs(folder)
+        with open(os.path.join(folder, "ColorByRegexConfig.txt"), "w") as f:
+            f.write("// User lines are kept\n")
+    return settings_path, temp_dir
+
+def load_settings(settings_path, temp_dir, backend):
+    """Fresh Settings for one run, patched in where regex_writer and state look for it"""
+    settings = Settings(settings_path)
+    # Keep the debounced flush out of the timings, it's measured on its own
+    settings.FLUSH_DELAY = 3600
+    if backend == "sqlite":
+        settings.set_combination_backend("sqlite")
+        settings.flush()
+    regex_writer.settings = settings
+    state.temp_dir = temp_dir
+    regex_writer._file_cache.clear()
+    regex_writer._last_regenerated = None
+    # Like the running app, where the watcher keeps the config file index current
+    config_index.set_watched(temp_dir, True)
+    return settings
+
+def new_combinations(count, prefix="NEW"):
+    """Combinations that aren't tracked yet (flush persists its adds, so callers use their own prefix)"""
+    return [(f"{prefix}SRV{i // 10}", f"{prefix}DB{i}") for i in range(count)]
+
+def prepare_operations(settings_path, temp_dir, backend):
+    """Operation name -> (prepare, ops per run), prepare() returns a callable doing one run"""
+    def load():
+        return lambda: Settings(settings_path)
+
+    def add_server_db():
+        settings = load_settings(settings_path, temp_dir, backend)
+        def run():
+            for server, db in new_combinations(ADDS):
+                settings.add_server_db(server, db)
+        return run
+
+    def flush():
+        settings = load_settings(settings_path, temp_dir, backend)
+        for server, db in new_combinations(ADDS):
+            settings.add_server_db(server, db)
+        return settings.flush
+
+    def get_configured_db_combinations():
+        settings = load_settings(settings_path, temp_dir, backend)
+        def run():
+            for _ in range(CALLS):
+                settings.get_configured_db_combinations()
+        return run
+
+    def write_to_regex_file():
+        load_settings(settings_path, temp_dir, backend)
+        def run():
+            for server, db in new_combinations(ADDS, prefix="REGEX"):
+                regex_writer.write_to_regex_file(server, db)
+        return run
+
+    def regenerate_all_regex_patterns():
+        load_settings(settings_path, temp_dir, backend)
+        return regex_writer.regenerate_all_regex_patterns
+
+    return {
+        "Settings() load": (load, 1),
+        "add_server_db": (add_server_db, ADDS),
+        "flush": (flush, 1),
+        "get_configured_db_combinations": (get_configured_db_combinations, CALLS),
+        "write_to_regex_file": (write_to_regex_file, ADDS),
+        "regenerate_all_regex_patterns": (regenerate_all_regex_patterns, 1),
+    }
+
+def measure(prepare):
+    """Run once for the time and once (on fresh state) for the tracemalloc peak"""
+    # The pipeline prints a line per new combination, keep that out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run = prepare()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+
+        run = prepare()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return elapsed, peak
+
+def bench(count, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        settings_path, temp_dir = build_tree(tmp, count, args.config_files, args.compact)
+        if args.backend == "sqlite":
+            # Migrate once up front so every operation, loading included, sees the store
+            load_settings(settings_path, temp_dir, args.backend)
+        for name, (prepare, ops) in prepare_operations(settings_path, temp_dir, args.backend).items():
+            elapsed, peak = measure(prepare)
+            yield name, elapsed / ops, elapsed, peak
+        # Drop the last Settings before the folder goes away
+        config_index.set_watched(temp_dir, False)
+        regex_writer.settings = None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Tracked combination counts")
+    parser.add_argument("--config-files", type=int, default=4, help="ColorByRegexConfig.txt files in the temp dir")
+    parser.add_argument("--backend", choices=("ini", "sqlite"), default="ini", help="Combination storage backend")
+    parser.add_argument("--compact", action="store_true", help="Enable regex compaction")
+    args = parser.parse_args()
+
+    if not SETTINGS_EXISTED and os.path.exists(CONFIG_PATH):
+        os.remove(CONFIG_PATH)
+    # write_to_regex_file is timed into metrics.json, keep that out of the real one
+    metrics_dir = tempfile.mkdtemp(prefix="ssmsplus_bench_")
+    metrics.path = os.path.join(metrics_dir, "metrics.json")
+
+    print(f"backend: {args.backend}  compaction: {args.compact}  config files: {args.config_files}")
+    print(f"{'combinations':>12}  {'operation':<32}{'ms/op':>10}{'total ms':>10}{'peak KiB':>10}")
+    for count in args.sizes:
+        for name, per_op, elapsed, peak in bench(count, args):
+            print(f"{count:>12}  {name:<32}{per_op * 1000:>10.3f}{elapsed * 1000:>10.1f}{peak / 1024:>10.0f}")
+        print()
+
+if __name__ == "__main__":
+    main()
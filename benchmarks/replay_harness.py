@@ -0,0 +1,150 @@
+"""Replay harness: drives the real watcher and on_new_sql against the SSMS simulator.
+
+Opens queries one at a time in a simulated SSMS (like a user pressing
+Ctrl+N), lets the watcher pick up each temp file and measures how long it
+takes until the file is saved and colored. Everything runs in a throwaway
+folder with its own settings.ini, kept afterwards for inspection.
+
+Run from the repo root:
+    python benchmarks/replay_harness.py --files 20 --combinations 4
+    python benchmarks/replay_harness.py --method keys --caps-lock
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import CONFIG_PATH
+# Importing state creates settings.ini if it's missing, don't leave one behind
+SETTINGS_EXISTED = os.path.exists(CONFIG_PATH)
+
+from state import state, settings
+from window_snapshot import window_snapshots
+from ssms_simulator import SsmsSimulator
+from metrics import metrics
+import watcher
+
+def setup(root, combinations, method):
+    """Point settings and state at a throwaway temp/save dir with an SSMS config folder"""
+    temp_dir = os.path.join(root, "temp")
+    save_dir = os.path.join(root, "save")
+    ssms_folder = os.path.join(temp_dir, "0f8fad5b-d9cb-469f-a165-70867728950e")
+    os.makedirs(ssms_folder)
+    os.makedirs(save_dir)
+    open(os.path.join(ssms_folder, "ColorByRegexConfig.txt"), "w").close()
+    with open(os.path.join(ssms_folder, "customized-groupid-color-harness.json"), "w") as f:
+        f.write("{}")
+
+    settings.config_path = os.path.join(root, "settings.ini")
+    settings.load()
+    settings.set_temp_dir(temp_dir)
+    settings.set_save_dir(save_dir)
+    settings.set_grouping_mode("server_db")
+    settings.set_tab_color_method(method)
+    state.temp_dir = temp_dir
+    state.save_dir = save_dir
+    state.clear_tab_color_tracking()
+
+    for i, (server, db) in enumerate(combinations):
+        settings.add_server_db(server, db)
+        settings.set_tab_color_for_database(server, db, i % 16 + 1)
+    settings.flush()
+    return temp_dir, save_dir, ssms_folder
+
+def wait_for(temp_path, timeout):
+    end = time.time() + timeout
+    while time.time() < end:
+        if watcher.temp_file_tracker.get_state(temp_path) in (watcher.TempFileTracker.DONE, watcher.TempFileTracker.FAILED):
+            return watcher.temp_file_tracker.get_state(temp_path)
+        time.sleep(0.005)
+    return None
+
+def check(sim, temp_path, save_dir, server, db, method, ssms_folder):
+    """Check the file was saved where expected and its tab got the configured color"""
+    tab = sim.get_tab(temp_path)
+    name = os.path.basename(temp_path).replace("..sql", ".sql")
+    expected = os.path.normpath(os.path.join(save_dir, server, db, "temp", f"{server.upper()}_{db.upper()}_{name}"))
+    saved = bool(tab["saved_path"]) and os.path.normpath(tab["saved_path"]) == expected and os.path.exists(expected)
+
+    color = settings.get_tab_color_for_combination(server, db)
+    if method == "keys":
+        colored = tab["color"] == color
+    else:
+        json_path = os.path.join(ssms_folder, "customized-groupid-color-harness.json")
+        with open(json_path) as f:
+            colored = any(f"\\\\{server}\\\\{db}" in group for group in json.load(f))
+    return saved, colored
+
+def run(args):
+    combinations = [(f"SRV{i // 3}", f"DB{i}") for i in range(args.combinations)]
+    root = tempfile.mkdtemp(prefix="ssmsplus_replay_")
+    if not SETTINGS_EXISTED and os.path.exists(CONFIG_PATH):
+        os.remove(CONFIG_PATH)
+    temp_dir, save_dir, ssms_folder = setup(root, combinations, args.method)
+    sim = SsmsSimulator(temp_dir, loading_time=args.loading, dialog_delay=args.dialog_delay, caps_lock=args.caps_lock)
+    window_snapshots.set_backend(sim)
+    state.current_watcher_observer = watcher.create_watcher(temp_dir, watcher.on_new_sql)
+
+    latencies = []
+    results = {"done": 0, "failed": 0, "timeout": 0, "saved": 0, "colored": 0}
+    start = time.perf_counter()
+    try:
+        for i in range(args.files):
+            server, db = combinations[i % len(combinations)]
+            if i < len(combinations):
+                # The first file of a combination is the one that gets colored
+                state.tab_colors_applied.discard(f"{server.lower()}.{db.lower()}")
+            opened = time.perf_counter()
+            temp_path = sim.open_query(server, db, content=f"SELECT {i} FROM {db}.dbo.T\n")
+            outcome = wait_for(temp_path, args.timeout)
+            latencies.append(time.perf_counter() - opened)
+
+            if outcome == watcher.TempFileTracker.DONE:
+                results["done"] += 1
+                saved, colored = check(sim, temp_path, save_dir, server, db, args.method, ssms_folder)
+                results["saved"] += saved
+                results["colored"] += colored or i >= len(combinations)
+            elif outcome == watcher.TempFileTracker.FAILED:
+                results["failed"] += 1
+            else:
+                results["timeout"] += 1
+            time.sleep(args.think_time)
+    finally:
+        elapsed = time.perf_counter() - start
+        watcher.stop_watcher()
+        window_snapshots.set_backend(None)
+
+    latencies.sort()
+    print()
+    print(f"Files: {args.files}  combinations: {len(combinations)}  method: {args.method}  caps lock: {args.caps_lock}")
+    print(f"Results: {results}")
+    print(f"Throughput: {args.files / elapsed:.2f} files/s over {elapsed:.2f} s")
+    print(f"Latency (open query -> saved and colored): mean {statistics.mean(latencies) * 1000:.0f} ms, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms")
+    print(f"Simulator: {sim.get_stats()}")
+    print()
+    print(metrics.format_table())
+    metrics.save()
+    print(f"\nSettings, journal and metrics are in {root}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20, help="Queries to open")
+    parser.add_argument("--combinations", type=int, default=4, help="Distinct server/database pairs")
+    parser.add_argument("--method", choices=("file", "keys"), default="file", help="Tab color method")
+    parser.add_argument("--loading", type=float, default=0.2, help="Seconds the loading title shows after Ctrl+N")
+    parser.add_argument("--dialog-delay", type=float, default=0.05, help="Seconds before Save File As appears")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between queries")
+    parser.add_argument("--caps-lock", action="store_true", help="Simulate Caps Lock being on")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for each file")
+    run(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
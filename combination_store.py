@@ -0,0 +1,120 @@
+"""SQLite store for tracked server/database combinations."""
+
+import sqlite3
+import threading
+import time
+
+# Kinds of combination rows, matching the INI sections they replace
+KIND_SERVER = "server"  # [TabColoringServer]
+KIND_DB = "db"  # [TabColoringDB]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS combinations (
+    kind TEXT NOT NULL,
+    server TEXT NOT NULL,
+    db TEXT NOT NULL DEFAULT '',
+    color INTEGER DEFAULT 0,
+    first_seen REAL,
+    last_seen REAL,
+    use_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, server, db)
+);
+CREATE INDEX IF NOT EXISTS idx_combinations_server ON combinations (server);
+CREATE INDEX IF NOT EXISTS idx_combinations_db ON combinations (db);
+CREATE INDEX IF NOT EXISTS idx_combinations_color ON combinations (color);
+CREATE INDEX IF NOT EXISTS idx_combinations_first_seen ON combinations (first_seen);
+CREATE INDEX IF NOT EXISTS idx_combinations_last_seen ON combinations (last_seen);
+CREATE INDEX IF NOT EXISTS idx_combinations_use_count ON combinations (use_count);
+"""
+
+class CombinationStore:
+    """Indexed table of combinations with color and usage info
+
+    Keys are stored lowercase like the INI sections. Writes are applied in
+    batches by Settings.flush(), reads happen once when settings are loaded.
+    A NULL color is an invalid value carried over from the INI, resolved
+    like a missing color (the server color, then 0).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self._allow_null_colors()
+            self.conn.executescript(SCHEMA)
+
+    def _allow_null_colors(self):
+        """Rebuild a table created when color was NOT NULL, keeping its rows"""
+        columns = {row[1]: row[3] for row in self.conn.execute("PRAGMA table_info(combinations)")}
+        if not columns.get("color"):
+            return
+        self.conn.execute("ALTER TABLE combinations RENAME TO combinations_old")
+        # The old indexes keep their names on the renamed table, drop them so SCHEMA can recreate them
+        for (name,) in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'combinations_old' "
+                "AND sql IS NOT NULL").fetchall():
+            self.conn.execute(f"DROP INDEX {name}")
+        self.conn.executescript(SCHEMA.split(";", 1)[0] + ";")
+        self.conn.execute("INSERT INTO combinations SELECT kind, server, db, color, first_seen, last_seen, use_count "
+                          "FROM combinations_old")
+        self.conn.execute("DROP TABLE combinations_old")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM combinations").fetchone()[0]
+
+    def all(self, kind):
+        """Get {key: color} for every combination of a kind (key is 'server' or 'server.db')"""
+        with self.lock:
+            rows = self.conn.execute("SELECT server, db, color FROM combinations WHERE kind = ?", (kind,)).fetchall()
+        if kind == KIND_SERVER:
+            return {server: color for server, _, color in rows}
+        return {f"{server}.{db}": color for server, db, color in rows}
+
+    def get_usage(self, kind, server, db=""):
+        """Get (first_seen, last_seen, use_count) for a combination, or None"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT first_seen, last_seen, use_count FROM combinations WHERE kind = ? AND server = ? AND db = ?",
+                (kind, server, db)).fetchone()
+
+    @staticmethod
+    def split_key(kind, key):
+        """Split an INI style key into (server, db)"""
+        if kind == KIND_SERVER:
+            return key, ""
+        server, db = key.split(".", 1)
+        return server, db
+
+    def apply(self, changes):
+        """Apply batched changes in one transaction
+
+        Args:
+            changes (dict): (kind, key) -> {"color": int or None, "uses": int, "last_seen": float},
+                a change without "color" leaves the color alone, None stores an invalid one
+        """
+        if not changes:
+            return
+        now = time.time()
+        with self.lock, self.conn:
+            for (kind, key), change in changes.items():
+                server, db = self.split_key(kind, key)
+                last_seen = change.get("last_seen")
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO combinations (kind, server, db, color, first_seen, last_seen, use_count) "
+                    "VALUES (?, ?, ?, 0, ?, ?, 0)",
+                    (kind, server, db, last_seen or now, last_seen))
+                if "color" in change:
+                    self.conn.execute(
+                        "UPDATE combinations SET color = ? WHERE kind = ? AND server = ? AND db = ?",
+                        (change["color"], kind, server, db))
+                if change.get("uses"):
+                    self.conn.execute(
+                        "UPDATE combinations SET use_count = use_count + ?, last_seen = ? "
+                        "WHERE kind = ? AND server = ? AND db = ?",
+                        (change["uses"], last_seen or now, kind, server, db))
@@ -0,0 +1,140 @@
+"""Cached index of SSMS tab color config file locations."""
+
+import fnmatch
+import os
+import threading
+from pathlib import Path
+
+CONFIG_FILENAME = "ColorByRegexConfig.txt"
+COLOR_JSON_PATTERN = "customized-groupid-color-*.json"
+
+def is_indexed_name(path):
+    """Check if a path is one of the files the index tracks"""
+    name = os.path.basename(path)
+    return name == CONFIG_FILENAME or fnmatch.fnmatch(name, COLOR_JSON_PATTERN)
+
+class ConfigFileIndex:
+    """Index of ColorByRegexConfig.txt and customized-groupid-color-*.json files under the temp dir
+
+    The index is built with a single walk of the temp dir and then kept current
+    by the watcher's recursive observer. When nothing is watching the temp dir
+    the index can't be trusted, so every lookup rebuilds it like before.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.root = None
+        self.config_files = set()
+        self.color_jsons = set()
+        self.latest_config = None
+        self.valid = False
+        self.watched = False  # Set by the watcher while it keeps the index up to date
+        self.stats = {"builds": 0, "lookups": 0, "updates": 0}
+
+    @staticmethod
+    def _normalize(path):
+        return os.path.normcase(os.path.abspath(str(path)))
+
+    def set_watched(self, temp_dir, watched):
+        """Mark whether the watcher is keeping the index for temp_dir current"""
+        with self.lock:
+            self.watched = watched
+            if not watched or self.root != self._normalize(temp_dir):
+                self.valid = False
+
+    def invalidate(self):
+        with self.lock:
+            self.valid = False
+
+    def _ensure(self, temp_dir):
+        root = self._normalize(temp_dir)
+        if self.valid and self.watched and self.root == root:
+            return
+        self.root = root
+        self.config_files = set()
+        self.color_jsons = set()
+        if temp_dir and os.path.isdir(temp_dir):
+            # One walk for both kinds of file
+            for folder, _, names in os.walk(temp_dir):
+                for name in names:
+                    if name == CONFIG_FILENAME:
+                        self.config_files.add(Path(folder, name))
+                    elif fnmatch.fnmatch(name, COLOR_JSON_PATTERN):
+                        self.color_jsons.add(Path(folder, name))
+        self.latest_config = None
+        self.valid = True
+        self.stats["builds"] += 1
+        print(f"[config_index] Indexed {len(self.config_files)} config files and {len(self.color_jsons)} color files in {temp_dir}")
+
+    def add(self, path):
+        """Record a created/moved-in config or color file"""
+        path = Path(path)
+        with self.lock:
+            if not self.valid:
+                return
+            if path.name == CONFIG_FILENAME:
+                self.config_files.add(path)
+                self.latest_config = None
+            elif fnmatch.fnmatch(path.name, COLOR_JSON_PATTERN):
+                self.color_jsons.add(path)
+            self.stats["updates"] += 1
+
+    def modified(self, path):
+        """A config file was written, so the most recently used folder may have changed"""
+        with self.lock:
+            if Path(path).name == CONFIG_FILENAME:
+                self.latest_config = None
+
+    def remove(self, path):
+        """Forget a deleted/moved-out config or color file"""
+        path = Path(path)
+        with self.lock:
+            if not self.valid:
+                return
+            self.config_files.discard(path)
+            self.color_jsons.discard(path)
+            self.latest_config = None
+            self.stats["updates"] += 1
+
+    def get_config_files(self, temp_dir):
+        """Get every ColorByRegexConfig.txt under temp_dir"""
+        with self.lock:
+            self._ensure(temp_dir)
+            self.stats["lookups"] += 1
+            return list(self.config_files)
+
+    def get_latest_config(self, temp_dir):
+        """Get the ColorByRegexConfig.txt in the most recently modified/created folder, or None"""
+        with self.lock:
+            self._ensure(temp_dir)
+            self.stats["lookups"] += 1
+            if self.latest_config is None and self.config_files:
+                # Find the folder with the most recent modification or creation time, its config file included
+                def folder_time(path):
+                    try:
+                        stat = path.parent.stat()
+                        folder = max(stat.st_mtime, stat.st_ctime)
+                    except OSError:
+                        return 0
+                    try:
+                        return max(folder, path.stat().st_mtime)
+                    except OSError:
+                        return folder
+                self.latest_config = max(self.config_files, key=folder_time)
+            return self.latest_config
+
+    def get_color_jsons(self, folder):
+        """Get the customized-groupid-color-*.json files directly inside folder"""
+        folder = Path(folder)
+        with self.lock:
+            if not self.valid:
+                return list(folder.glob(COLOR_JSON_PATTERN))
+            self.stats["lookups"] += 1
+            return [p for p in self.color_jsons if p.parent == folder]
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+# Shared instance kept current by the watcher
+config_index = ConfigFileIndex()
@@ -0,0 +1,182 @@
+"""Content-hash catalog of saved and archived scripts."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import zipfile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS saved (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_saved_hash ON saved (hash);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    zip_path TEXT NOT NULL,
+    arcname TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blobs_zip ON blobs (zip_path);
+CREATE TABLE IF NOT EXISTS refs (
+    zip_path TEXT NOT NULL,
+    arcname TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (zip_path, arcname)
+);
+CREATE INDEX IF NOT EXISTS idx_refs_hash ON refs (hash);
+"""
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DedupCatalog:
+    """Tracks script contents by hash so identical scripts are stored once
+
+    Saved scripts are hashed after every save so duplicates can be reported,
+    but they are left alone: SSMS still has them open and may keep writing to
+    them. Once a script is archived it never changes, so the archive stores
+    each distinct content once ("blobs") and later copies become catalog
+    references to it ("refs"). When a zip holding a blob is evicted, the blob
+    is moved into a zip that still references it.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.stats = {"saved_duplicates": 0, "archived_duplicates": 0, "bytes_saved": 0, "moved": 0}
+
+    def _connect(self):
+        if self.conn:
+            return
+        if not self.path:
+            from state import settings
+            self.path = settings.get_dedup_catalog_path()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+    def record_saved(self, path):
+        """Hash a saved script and return the path of an identical saved script, or None"""
+        digest = hash_file(path)
+        size = os.path.getsize(path)
+        with self.lock:
+            self._connect()
+            with self.conn:
+                row = self.conn.execute(
+                    "SELECT path FROM saved WHERE hash = ? AND path != ? LIMIT 1", (digest, path)).fetchone()
+                self.conn.execute("INSERT OR REPLACE INTO saved (path, hash, size) VALUES (?, ?, ?)", (path, digest, size))
+        if row:
+            self.stats["saved_duplicates"] += 1
+            print(f"[dedup_catalog] {os.path.basename(path)} is identical to {row[0]}")
+            return row[0]
+        return None
+
+    def forget_saved(self, paths):
+        """Drop saved scripts that were archived or deleted"""
+        with self.lock:
+            self._connect()
+            with self.conn:
+                self.conn.executemany("DELETE FROM saved WHERE path = ?", ((p,) for p in paths))
+
+    def find_archived(self, digest):
+        """Get (zip_path, arcname) of the archived copy of some content, or None"""
+        with self.lock:
+            self._connect()
+            return self.conn.execute("SELECT zip_path, arcname FROM blobs WHERE hash = ?", (digest,)).fetchone()
+
+    def add_archived(self, digest, size, zip_path, arcname):
+        with self.lock:
+            self._connect()
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO blobs (hash, size, zip_path, arcname) VALUES (?, ?, ?, ?)",
+                                  (digest, size, zip_path, arcname))
+
+    def add_reference(self, zip_path, arcname, digest, size):
+        """Record an archived script whose content is stored elsewhere"""
+        with self.lock:
+            self._connect()
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO refs (zip_path, arcname, hash) VALUES (?, ?, ?)",
+                                  (zip_path, arcname, digest))
+        self.stats["archived_duplicates"] += 1
+        self.stats["bytes_saved"] += size
+
+    def get_references(self, zip_path):
+        """Get the arcnames in a zip that are only stored in the catalog"""
+        with self.lock:
+            self._connect()
+            return [r[0] for r in self.conn.execute("SELECT arcname FROM refs WHERE zip_path = ?", (zip_path,))]
+
+    def resolve(self, zip_path, arcname):
+        """Get (zip_path, arcname) holding the content of an archived script"""
+        with self.lock:
+            self._connect()
+            row = self.conn.execute(
+                "SELECT b.zip_path, b.arcname FROM refs r JOIN blobs b ON b.hash = r.hash "
+                "WHERE r.zip_path = ? AND r.arcname = ?", (zip_path, arcname)).fetchone()
+        return row or (zip_path, arcname)
+
+    def evict_zip(self, zip_path):
+        """Forget a zip that's about to be deleted, moving blobs other zips still reference out of it first
+
+        Returns:
+            list: The zips blobs were moved into (one entry per blob), they've grown
+
+        Raises:
+            OSError: A blob couldn't be moved. Its catalog entry and the zip's
+                references are kept, and the zip must not be deleted.
+        """
+        moved = []
+        failed = 0
+        with self.lock:
+            self._connect()
+            blobs = self.conn.execute("SELECT hash, arcname FROM blobs WHERE zip_path = ?", (zip_path,)).fetchall()
+            with self.conn:
+                for digest, arcname in blobs:
+                    refs = self.conn.execute(
+                        "SELECT zip_path, arcname FROM refs WHERE hash = ? AND zip_path != ?", (digest, zip_path)).fetchall()
+                    if not refs:
+                        self.conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                        continue
+                    # The newest day's zip is the one that will be kept the longest
+                    ref = max(refs, key=lambda r: os.path.basename(r[0]))
+                    try:
+                        with zipfile.ZipFile(zip_path) as source:
+                            data = source.read(arcname)
+                        with zipfile.ZipFile(ref[0], "a", compression=zipfile.ZIP_DEFLATED) as target:
+                            target.writestr(ref[1], data)
+                    except Exception as e:
+                        print(f"[dedup_catalog] Error moving {arcname} from {zip_path} to {ref[0]}: {e}")
+                        failed += 1
+                        continue
+                    self.conn.execute("UPDATE blobs SET zip_path = ?, arcname = ? WHERE hash = ?", (ref[0], ref[1], digest))
+                    self.conn.execute("DELETE FROM refs WHERE zip_path = ? AND arcname = ?", ref)
+                    moved.append(ref[0])
+                if not failed:
+                    self.conn.execute("DELETE FROM refs WHERE zip_path = ?", (zip_path,))
+        self.stats["moved"] += len(moved)
+        if failed:
+            # Blobs that did move are committed, the rest stay here until the next eviction attempt
+            raise OSError(f"Could not move {failed} archived scripts out of {zip_path}")
+        return moved
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Shared instance, the catalog lives next to settings.ini
+dedup_catalog = DedupCatalog()
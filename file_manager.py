@@ -1,9 +1,24 @@
 """Handles file moving, renaming, and opening in SSMS."""
 
 import os
+import queue
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 from state import state
+from config_index import config_index
+from retention import RetentionEngine, archive_folder_for
+from search_index import search_index
+from dedup_catalog import dedup_catalog
+
+# Scripts SSMS is still writing after Save As, handled by FileManager.after_save
+_saved_files = queue.Queue()
+_saved_files_thread = None
+_saved_files_lock = threading.Lock()
+_queued_saves = set()  # Paths waiting in _saved_files, so a burst of writes queues a path once
+_processed_saves = OrderedDict()  # path -> (size, mtime) last indexed, so unchanged files aren't indexed again
+PROCESSED_SAVES_LIMIT = 1000  # Most recently indexed paths remembered in _processed_saves
 
 class FileManager:
     def __init__(self):
@@ -33,90 +48,212 @@ class FileManager:
             state.session_start_time = time.time()  # Fallback to current time
 
     @staticmethod
-    def cleanup_old_temp_files():
-        """Delete temp files from previous sessions at startup"""
-        if not hasattr(state, 'session_start_time'):
+    def find_temp_folders(save_dir):
+        """Get the <server>/<db>/temp folders for the tracked combinations
+
+        Only the server folders of tracked combinations are listed, instead of
+        walking the whole save directory. Servers tracked on their own (server
+        grouping) get every database folder checked.
+        """
+        from state import settings
+        
+        tracked = {}  # server -> set of dbs, or None for every db
+        for combination in settings.get_configured_db_combinations():
+            server, db = combination.lower().split(".", 1)
+            if tracked.get(server, set()) is not None:
+                tracked.setdefault(server, set()).add(db)
+        for server in settings.get_configured_server_combinations():
+            tracked[server.lower()] = None
+        
+        temp_folders = []
+        with os.scandir(save_dir) as servers:
+            server_dirs = [e for e in servers if e.is_dir() and e.name.lower() in tracked]
+        for server_entry in server_dirs:
+            dbs = tracked[server_entry.name.lower()]
+            try:
+                with os.scandir(server_entry.path) as db_entries:
+                    for db_entry in db_entries:
+                        if not db_entry.is_dir() or (dbs is not None and db_entry.name.lower() not in dbs):
+                            continue
+                        temp_folder = os.path.join(db_entry.path, "temp")
+                        if os.path.isdir(temp_folder):
+                            temp_folders.append(temp_folder)
+            except OSError as e:
+                print(f"[FileManager] Error listing {server_entry.path}: {e}")
+        return temp_folders
+
+    @staticmethod
+    def cleanup_old_temp_files(progress=None):
+        """Archive (or delete) temp files from previous sessions
+        
+        With the [Retention] Mode 'archive' (the default) old files are moved
+        into per-day zips next to the temp folder and the archives are kept
+        within the size/age quotas. Mode 'delete' removes them like before.
+        
+        Args:
+            progress (callable): Optional, called with (folders_done, folders_total, files_removed)
+        """
+        if not getattr(state, 'session_start_time', None):
             print("[FileManager] No session start time available, skipping cleanup")
             return
             
-        save_dir = Path(state.save_dir)
-        if not save_dir.exists():
+        save_dir = state.save_dir
+        if not save_dir or not os.path.isdir(save_dir):
             print(f"[FileManager] Save directory does not exist: {save_dir}")
             return
             
+        from state import settings
+        archiving = settings.get_retention_mode() == "archive"
+        engine = RetentionEngine.from_settings(settings, dedup_catalog) if archiving else None
+        
         try:
-            # Find all 'temp' folders in the save directory structure
-            temp_folders = list(save_dir.rglob("temp"))
+            temp_folders = FileManager.find_temp_folders(save_dir)
             
             if not temp_folders:
-                print("[FileManager] No temp folders found in save directory structure.")
+                print("[FileManager] No temp folders found for tracked combinations.")
                 return
                 
             print(f"[FileManager] Found {len(temp_folders)} temp folders to check for old files...")
             
             total_deleted = 0
-            for temp_folder in temp_folders:
-                if not temp_folder.is_dir():
-                    continue
-                    
+            for done, temp_folder in enumerate(temp_folders, 1):
                 try:
-                    # Get all files in this temp folder
-                    all_files = [f for f in temp_folder.iterdir() if f.is_file()]
-                    
-                    if not all_files:
-                        continue
-                        
-                    # Find files older than this session
-                    old_files = []
-                    for file_path in all_files:
-                        file_mtime = file_path.stat().st_mtime
-                        if file_mtime < state.session_start_time:
-                            old_files.append(file_path)
+                    # DirEntry.stat() is cached from the directory listing on Windows, no extra round trip per file
+                    with os.scandir(temp_folder) as entries:
+                        old_files = [e for e in entries if e.is_file() and e.stat().st_mtime < state.session_start_time]
                     
-                    if not old_files:
-                        print(f"[FileManager] {temp_folder}: No old files to delete")
-                        continue
-                        
-                    print(f"[FileManager] {temp_folder}: Deleting {len(old_files)} old files from previous sessions...")
+                    if old_files:
+                        dedup_catalog.forget_saved(entry.path for entry in old_files)
                     
-                    for file_path in old_files:
-                        try:
-                            file_path.unlink()
-                            print(f"[FileManager]   Deleted: {file_path.name}")
-                            total_deleted += 1
-                        except Exception as e:
-                            print(f"[FileManager]   Error deleting {file_path}: {e}")
+                    if old_files and archiving:
+                        print(f"[FileManager] {temp_folder}: Archiving {len(old_files)} old files from previous sessions...")
+                        total_deleted += engine.archive(temp_folder, old_files)
+                    elif old_files:
+                        print(f"[FileManager] {temp_folder}: Deleting {len(old_files)} old files from previous sessions...")
+                        for entry in old_files:
+                            try:
+                                os.unlink(entry.path)
+                                total_deleted += 1
+                            except Exception as e:
+                                print(f"[FileManager]   Error deleting {entry.path}: {e}")
                             
                 except Exception as e:
                     print(f"[FileManager] Error processing temp folder {temp_folder}: {e}")
+                
+                if progress:
+                    progress(done, len(temp_folders), total_deleted)
+                # Yield between folders so cleanup never competes with the watcher
+                time.sleep(0.01)
                     
-            print(f"[FileManager] Cleanup complete: {total_deleted} old temp files deleted.")
+            if archiving:
+                engine.enforce_quotas(archive_folder_for(folder) for folder in temp_folders)
+                print(f"[FileManager] Cleanup complete: {total_deleted} old temp files archived, retention stats: {engine.get_stats()}")
+            else:
+                print(f"[FileManager] Cleanup complete: {total_deleted} old temp files deleted.")
                     
         except Exception as e:
             print(f"[FileManager] Error during temp file cleanup: {e}")
 
     @staticmethod
-    def get_ssms_temp():
-        temp_dir = state.temp_dir
-        config_files = list(temp_dir.rglob("ColorByRegexConfig.txt"))
+    def start_background_cleanup():
+        """Run cleanup_old_temp_files, then reconcile the search index, on a low priority background thread"""
+        def report(done, total, deleted):
+            state.cleanup_progress = (done, total, deleted)
+            if done == total or done % 50 == 0:
+                print(f"[FileManager] Cleanup progress: {done}/{total} folders, {deleted} files cleaned up")
+
+        def run():
+            if os.name == 'nt':
+                try:
+                    import ctypes
+                    THREAD_PRIORITY_LOWEST = -2
+                    kernel32 = ctypes.windll.kernel32
+                    kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_LOWEST)
+                except Exception as e:
+                    print(f"[FileManager] Could not lower cleanup thread priority: {e}")
+            FileManager.cleanup_old_temp_files(progress=report)
+            FileManager.reconcile_search_index()
+
+        thread = threading.Thread(target=run, name="TempCleanup", daemon=True)
+        thread.start()
+        return thread
 
-        if not config_files:
+    @staticmethod
+    def after_save(path, timeout=10.0):
+        """Index and hash a saved script once SSMS has finished writing it (it does so after Save As returns)"""
+        global _saved_files_thread
+        with _saved_files_lock:
+            if path in _queued_saves:
+                return
+            _queued_saves.add(path)
+        _saved_files.put((path, time.time() + timeout))
+        if not _saved_files_thread:
+            _saved_files_thread = threading.Thread(target=FileManager._process_saved_files, name="SavedFiles", daemon=True)
+            _saved_files_thread.start()
+
+    @staticmethod
+    def _process_saved_files():
+        while True:
+            path, deadline = _saved_files.get()
+            # Wait for the file to exist and stop changing (an empty new query stays at 0 bytes)
+            last = None
+            while time.time() < deadline:
+                try:
+                    stat = os.stat(path)
+                    signature = (stat.st_size, stat.st_mtime)
+                    if signature == last:
+                        break
+                    last = signature
+                except OSError:
+                    pass
+                time.sleep(0.5)
+            with _saved_files_lock:
+                _queued_saves.discard(path)
+            if not os.path.exists(path):
+                print(f"[FileManager] Saved file never appeared: {path}")
+                continue
+            if last is not None and _processed_saves.get(path) == last:
+                continue
+            _processed_saves[path] = last
+            _processed_saves.move_to_end(path)
+            if len(_processed_saves) > PROCESSED_SAVES_LIMIT:
+                _processed_saves.popitem(last=False)
+            try:
+                search_index.add_file(path)
+            except Exception as e:
+                print(f"[FileManager] Error indexing {path}: {e}")
+            try:
+                dedup_catalog.record_saved(path)
+            except Exception as e:
+                print(f"[FileManager] Error hashing {path}: {e}")
+
+    @staticmethod
+    def reconcile_search_index():
+        """Index scripts saved or archived while we weren't running, and forget deleted ones"""
+        save_dir = state.save_dir
+        if not save_dir or not os.path.isdir(save_dir):
             return
+        try:
+            temp_folders = FileManager.find_temp_folders(save_dir)
+            archive_folders = [archive_folder_for(folder) for folder in temp_folders]
+            search_index.reconcile(temp_folders + archive_folders)
+        except Exception as e:
+            print(f"[FileManager] Error reconciling search index: {e}")
+
+    @staticmethod
+    def get_ssms_temp():
+        latest_config = config_index.get_latest_config(state.temp_dir)
 
-        # Find the parent folder with the most recent modification or creation time
-        def folder_time(path):
-            folder = path.parent
-            stat = folder.stat()
-            return max(stat.st_mtime, stat.st_ctime)
+        if not latest_config:
+            return
 
-        latest_config = max(config_files, key=folder_time)
         latest_folder = latest_config.parent
 
         state.regex_path = str(latest_config)
 
         # Find the color json file in the same folder
-        color_jsons = list(latest_folder.glob("customized-groupid-color-*.json"))
+        color_jsons = config_index.get_color_jsons(latest_folder)
         if color_jsons:
             # Pick the most recent one if multiple
             latest_json = max(color_jsons, key=lambda p: max(p.stat().st_mtime, p.stat().st_ctime))
-            state.color_path = str(latest_json)
\ No newline at end of file
+            state.color_path = str(latest_json)
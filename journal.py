@@ -0,0 +1,179 @@
+"""Append-only journal of the temp file processing pipeline."""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+# Pipeline steps in the order on_new_sql goes through them
+STEPS = ("detected", "resolved", "saved", "regex_written", "colored")
+
+class Journal:
+    """Append-only record of every pipeline step per temp file, kept next to settings.ini
+
+    Each line is a JSON object: {"event": "step", "path", "step", "time", ...}
+    for each step and {"event": "processed", "path", "time"} once a file is
+    done. Lines are flushed as they're written and fsynced in batches.
+
+    At startup the journal tells the watcher which temp files were already
+    organized (so they're never processed twice) and which ones stopped part
+    way, so the missing steps can be finished. The step times double as a
+    latency trace. Entries older than the retention period are dropped when
+    the journal is loaded.
+    """
+
+    # Seconds to wait before fsyncing appended lines
+    SYNC_DELAY = 0.5
+
+    def __init__(self, path=None, retention=7 * 86400):
+        self.path = path
+        self.retention = retention
+        self.lock = threading.Lock()
+        self.processed = None  # normalized path -> time processed, loaded lazily
+        self.incomplete = {}  # normalized path -> {"steps": {step: time}, "data": {...}}
+        self.file = None
+        self._sync_timer = None
+        self.stats = {"loaded": 0, "appended": 0, "syncs": 0, "compacted": 0}
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _load(self):
+        if self.processed is not None:
+            return
+        if not self.path:
+            from state import settings
+            self.path = settings.get_journal_path()
+
+        self.processed = {}
+        self.incomplete = {}
+        kept = []
+        lines = 0
+        cutoff = time.time() - self.retention
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line after a crash
+                    if record.get("time", 0) < cutoff:
+                        continue
+                    kept.append(line if line.endswith("\n") else line + "\n")
+                    self._apply(record)
+        except FileNotFoundError:
+            pass
+        self.stats["loaded"] = len(kept)
+
+        # Rewrite without expired entries once they make up most of the file
+        if lines > 2 * len(kept) + 100:
+            self._compact(kept)
+
+    def _apply(self, record):
+        """Update the in-memory state from one journal record"""
+        key = record.get("path")
+        if record.get("event") == "processed":
+            self.processed[key] = record["time"]
+            self.incomplete.pop(key, None)
+        elif record.get("event") == "step" and key not in self.processed:
+            entry = self.incomplete.setdefault(key, {"steps": {}, "data": {}})
+            entry["steps"][record["step"]] = record["time"]
+            entry["data"].update({k: v for k, v in record.items() if k not in ("event", "path", "step", "time")})
+
+    def _compact(self, lines):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.stats["compacted"] += 1
+
+    def _append(self, record):
+        try:
+            if not self.file:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+        except OSError as e:
+            print(f"[journal] Error writing {self.path}: {e}")
+            return
+        self.stats["appended"] += 1
+        if not self._sync_timer:
+            self._sync_timer = threading.Timer(self.SYNC_DELAY, self.sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def sync(self):
+        """fsync everything appended so far"""
+        with self.lock:
+            if self._sync_timer:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self.file:
+                try:
+                    os.fsync(self.file.fileno())
+                    self.stats["syncs"] += 1
+                except OSError as e:
+                    print(f"[journal] Error syncing {self.path}: {e}")
+
+    def close(self):
+        self.sync()
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def is_processed(self, path):
+        with self.lock:
+            self._load()
+            return self._key(path) in self.processed
+
+    def record_step(self, path, step, **data):
+        """Record that a pipeline step finished for a temp file (data is kept for recovery)"""
+        record = {"event": "step", "path": self._key(path), "step": step, "time": time.time()}
+        record.update(data)
+        with self.lock:
+            self._load()
+            self._apply(record)
+            self._append(record)
+
+    def mark_processed(self, path):
+        """Record that a temp file has been organized"""
+        record = {"event": "processed", "path": self._key(path), "time": time.time()}
+        with self.lock:
+            self._load()
+            trace = self.incomplete.get(record["path"])
+            self._apply(record)
+            self._append(record)
+        if trace:
+            print(f"[journal] {os.path.basename(path)} step times: {self.format_trace(trace['steps'], record['time'])}")
+
+    @staticmethod
+    def format_trace(steps, end=None):
+        """Seconds from detection to each step, e.g. 'resolved +0.12s, saved +1.80s'"""
+        start = steps.get("detected", min(steps.values()))
+        parts = [f"{step} +{steps[step] - start:.2f}s" for step in STEPS if step in steps and step != "detected"]
+        if end is not None:
+            parts.append(f"done +{end - start:.2f}s")
+        return ", ".join(parts)
+
+    def get_incomplete(self):
+        """Get {path: {"steps": {step: time}, "data": {...}}} for files that stopped part way"""
+        with self.lock:
+            self._load()
+            return {path: {"steps": dict(e["steps"]), "data": dict(e["data"])} for path, e in self.incomplete.items()}
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["processed"] = len(self.processed or ())
+            stats["incomplete"] = len(self.incomplete)
+        return stats
+
+# Shared instance used by the watcher
+journal = Journal()
+atexit.register(journal.close)
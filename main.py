@@ -2,8 +2,11 @@
 from tray import TrayApp
 from settings_ui import SettingsWindow
 from state import state, settings
-from watcher import create_watcher
+from watcher import create_watcher, stop_watcher
 from file_manager import FileManager
+from journal import journal
+from adaptive_timing import adaptive_timing
+from metrics import metrics
 import threading
 from watcher import on_new_sql
 import os
@@ -11,15 +14,13 @@ import sys
 
 def start_watcher_in_thread(temp_dir):
     # Stop existing watcher if it exists
-    if state.current_watcher_observer:
-        state.current_watcher_observer.stop()
-        state.current_watcher_observer = None
+    stop_watcher()
     
     # Start new watcher
     state.current_watcher_observer = create_watcher(temp_dir, on_new_sql)
     return state.current_watcher_observer
 
-def on_settings():
+def on_settings(initial_tab=None):
     # If a settings window is already open, bring it to focus
     if state.current_settings_window and state.current_settings_window.root.winfo_exists():
         try:
@@ -27,6 +28,9 @@ def on_settings():
             state.current_settings_window.root.focus_force()
             state.current_settings_window.root.attributes('-topmost', True)
             state.current_settings_window.root.after_idle(state.current_settings_window.root.attributes, '-topmost', False)
+            if initial_tab == "search":
+                state.current_settings_window.root.after_idle(state.current_settings_window.notebook.select,
+                                                              state.current_settings_window.search_frame)
             return
         except:
             # Window no longer exists, create a new one
@@ -57,23 +61,32 @@ def on_settings():
             state.current_tray_app.update_icon_and_name()
 
     def show_settings_window():
-        state.current_settings_window = SettingsWindow(temp_dir, save_dir, on_save, initial_error)
+        state.current_settings_window = SettingsWindow(temp_dir, save_dir, on_save, initial_error, initial_tab)
         state.current_settings_window.show()
         state.current_settings_window = None  # Clear reference when window closes
 
     threading.Thread(target=show_settings_window).start()
 
+def on_search():
+    on_settings(initial_tab="search")
+
 def on_exit():
     # Stop watcher if it's running 
-    if state.current_watcher_observer:
-        state.current_watcher_observer.stop()
-        state.current_watcher_observer = None
+    stop_watcher()
+    settings.stop_file_watch()
+    # Write any settings changes still waiting for the debounced flush, learned poll timings included
+    adaptive_timing.save()
+    settings.flush()
+    metrics.save()
+    journal.close()
 
 if __name__ == '__main__':
-    # Initialize session and cleanup old temp files
+    # Initialize session (old temp files are cleaned up once the watcher is running)
     if state.save_dir and os.path.isdir(state.save_dir):
         FileManager.mark_session_start()
-        FileManager.cleanup_old_temp_files()
+    
+    # Pick up settings.ini edits made by other processes
+    settings.start_file_watch()
     
     # Clear tab color tracking for new session
     state.clear_tab_color_tracking()
@@ -83,6 +96,10 @@ if __name__ == '__main__':
         on_settings()
     else:
         start_watcher_in_thread(state.temp_dir)
-    tray = TrayApp(on_exit=on_exit, on_settings=on_settings)
+    
+    # Cleanup old temp files in the background so it never delays the watcher
+    if state.save_dir and os.path.isdir(state.save_dir):
+        FileManager.start_background_cleanup()
+    tray = TrayApp(on_exit=on_exit, on_settings=on_settings, on_search=on_search)
     state.current_tray_app = tray  # Store reference for updates
     tray.run()
\ No newline at end of file
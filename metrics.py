@@ -0,0 +1,170 @@
+"""Per-stage timing of the save pipeline."""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Pipeline stages in display order
+STAGES = (
+    "on_new_sql",
+    "resolve_server_db",
+    "get_server_db",
+    "wait_for_query",
+    "is_combination_in_actual_regex_files",
+    "automate_save_as",
+    "write_to_regex_file",
+    "apply_tab_color",
+)
+
+class StageHistogram:
+    """Latency samples for one stage: exact totals plus the most recent samples for percentiles"""
+
+    def __init__(self, capacity=1000):
+        self.samples = deque(maxlen=capacity)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+    def to_dict(self):
+        return {"count": self.count, "total": self.total, "max": self.max, "samples": list(self.samples)}
+
+    @classmethod
+    def from_dict(cls, data, capacity=1000):
+        histogram = cls(capacity)
+        histogram.samples.extend(data.get("samples", []))
+        histogram.count = data.get("count", len(histogram.samples))
+        histogram.total = data.get("total", sum(histogram.samples))
+        histogram.max = data.get("max", max(histogram.samples, default=0.0))
+        return histogram
+
+class Metrics:
+    """Collects stage timings and persists them to metrics.json next to settings.ini
+
+    Writes are debounced like settings saves, so a burst of saved files only
+    writes the file once.
+    """
+
+    # Seconds to wait after the last sample before writing metrics.json
+    SAVE_DELAY = 5.0
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stages = None  # stage -> StageHistogram, loaded lazily
+        self._save_timer = None
+
+    def _load(self):
+        if self.stages is not None:
+            return
+        if not self.path:
+            from state import settings
+            self.path = settings.get_metrics_path()
+        self.stages = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for stage, values in data.get("stages", {}).items():
+                self.stages[stage] = StageHistogram.from_dict(values)
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError) as e:
+            print(f"[metrics] Ignoring unreadable {self.path}: {e}")
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self._load()
+            self.stages.setdefault(stage, StageHistogram()).add(seconds)
+            if self._save_timer:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.SAVE_DELAY, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    @contextmanager
+    def span(self, stage):
+        """Time the body of a with block as one sample of stage (failures are timed too)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def timed(self, stage=None):
+        """Decorator timing every call of a function as a stage (defaults to the function name)"""
+        def decorator(func):
+            name = stage or func.__name__
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """Get {stage: {count, mean, p50, p95, p99, max}} in seconds, pipeline stages first"""
+        with self.lock:
+            self._load()
+            order = list(STAGES) + sorted(s for s in self.stages if s not in STAGES)
+            return {stage: self.stages[stage].summary() for stage in order if stage in self.stages}
+
+    def reset(self):
+        with self.lock:
+            self._load()
+            self.stages = {}
+        self.save()
+
+    def save(self):
+        """Write metrics.json atomically"""
+        with self.lock:
+            if self._save_timer:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self.stages is None:
+                return
+            data = {"saved_at": time.time(), "stages": {s: h.to_dict() for s, h in self.stages.items()}}
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"[metrics] Error writing {self.path}: {e}")
+
+    def format_table(self):
+        """Summary as aligned text lines, in milliseconds"""
+        lines = [f"{'Stage':<38}{'Count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'Max':>9}"]
+        for stage, s in self.summary().items():
+            lines.append(f"{stage:<38}{s['count']:>7}" + "".join(
+                f"{s[key] * 1000:>9.0f}" for key in ("p50", "p95", "p99", "max")))
+        return "\n".join(lines)
+
+# Shared instance used across the pipeline
+metrics = Metrics()
+atexit.register(metrics.save)
@@ -0,0 +1,129 @@
+"""Compacts per-combination tab regex patterns into prefix-trie alternations."""
+
+import re
+
+# Regex text for one literal backslash in a path
+SEP = "\\\\"
+LOOKAHEAD = "(?=\\\\|$)"
+
+def expanded_pattern(server, db=None):
+    """The one-line-per-combination pattern (db=None for server grouping)"""
+    if db is None:
+        return f"{SEP}{server}{SEP}.*{LOOKAHEAD}"
+    return f"{SEP}{server}{SEP}{db}{LOOKAHEAD}"
+
+def _build_trie(sequences):
+    root = {}
+    for tokens in sequences:
+        node = root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[None] = {}  # End of a sequence
+    return root
+
+def _trie_to_regex(node):
+    ends_here = None in node
+    branches = [token + _trie_to_regex(child) for token, child in sorted((k, v) for k, v in node.items() if k is not None)]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not ends_here:
+        return branches[0]
+    group = "(?:" + "|".join(branches) + ")"
+    return group + "?" if ends_here else group
+
+def trie_regex(sequences):
+    """Build a regex fragment matching exactly the given token sequences, sharing common prefixes"""
+    return _trie_to_regex(_build_trie(sequences))
+
+def compact_patterns(combinations, color_for):
+    """Fold combinations that share a color into one trie alternation line per color
+
+    Combinations with color 0 (no color / let SSMS pick) keep their own line,
+    because SSMS hands out automatic colors per regex line and folding them
+    would make them all share one color.
+
+    Args:
+        combinations (list): (server, db) tuples, db is None for server grouping
+        color_for (callable): (server, db) -> color index
+
+    Returns:
+        list: Pattern lines
+    """
+    groups = {}
+    patterns = []
+    for server, db in combinations:
+        color = color_for(server, db)
+        if color:
+            groups.setdefault(color, []).append((server, db))
+        else:
+            patterns.append(expanded_pattern(server, db))
+
+    for color in sorted(groups):
+        members = groups[color]
+        if members[0][1] is None:
+            patterns.append(f"{SEP}{trie_regex([list(s) for s, _ in members])}{SEP}.*{LOOKAHEAD}")
+        else:
+            patterns.append(f"{SEP}{trie_regex([list(s) + [SEP] + list(d) for s, d in members])}{LOOKAHEAD}")
+    return patterns
+
+def _sample_paths(server, db):
+    """Paths that should and (mostly) shouldn't match a combination"""
+    if db is None:
+        return [
+            f"C:\\Save\\{server}\\DB\\temp\\a.sql",
+            f"C:\\Save\\{server}X\\DB\\a.sql",
+            f"C:\\Save\\{server[:-1]}\\DB\\a.sql",
+        ]
+    return [
+        f"C:\\Save\\{server}\\{db}\\temp\\a.sql",
+        f"C:\\Save\\{server}\\{db}",
+        f"C:\\Save\\{server}\\{db}X\\temp\\a.sql",
+        f"C:\\Save\\{server}\\{db[:-1]}\\temp\\a.sql",
+        f"C:\\Save\\{server}X\\{db}\\temp\\a.sql",
+    ]
+
+def _candidates(path, known):
+    """Combinations whose expanded line could match the path
+
+    Expanded lines only match whole path segments (\\SERVER\\DB followed by a
+    backslash or the end), so only adjacent segment pairs need checking.
+    """
+    segments = path.split("\\")
+    found = []
+    for i, segment in enumerate(segments):
+        if (segment, None) in known and i + 1 < len(segments):
+            found.append((segment, None))
+        if i + 1 < len(segments) and (segment, segments[i + 1]) in known:
+            found.append((segment, segments[i + 1]))
+    return found
+
+def _first_match(regexes, path):
+    best = None
+    for regex in regexes:
+        m = regex.search(path)
+        if m and (best is None or m.start() < best[0]):
+            best = (m.start(), m.group(0))
+    return best
+
+def verify_compaction(combinations, compacted):
+    """Check the compacted lines match exactly the same paths (and text) as the expanded lines
+
+    For sample paths around every combination, the leftmost match of the
+    compacted lines must be the same as the leftmost match of the expanded
+    lines.
+    """
+    known = set(combinations)
+    expanded_lines = {expanded_pattern(*c): c for c in combinations}
+    # Lines kept as-is can only match their own combination, folded lines could match anything
+    kept = {expanded_lines[p]: re.compile(p) for p in compacted if p in expanded_lines}
+    folded = [re.compile(p) for p in compacted if p not in expanded_lines]
+
+    for server, db in combinations:
+        for path in _sample_paths(server, db):
+            candidates = _candidates(path, known)
+            expected = _first_match([re.compile(expanded_pattern(*c)) for c in candidates], path)
+            actual = _first_match(folded + [kept[c] for c in candidates if c in kept], path)
+            if expected != actual:
+                print(f"[regex_compactor] Mismatch for {path}: expanded={expected} compacted={actual}")
+                return False
+    return True
@@ -1,12 +1,112 @@
 """Regex/color config updater for SSMS."""
-from pathlib import Path
+import hashlib
+import os
+import threading
 from state import state, settings
+from config_index import config_index
+from metrics import metrics
+import tab_color_engine
+
+# Counters for config file writes that were performed vs skipped because nothing changed
+write_stats = {"written": 0, "skipped": 0}
+
+# Per-file cache of (mtime_ns, size, keep_other_lines, pattern hash) after our last read/write
+_file_cache = {}
+_write_lock = threading.Lock()
+
+# (settings regex generation, temp dir, config files) of the last regenerate_all_regex_patterns run
+_last_regenerated = None
+
+def is_server_pattern(line):
+    """Check if a config line looks like one of our server patterns"""
+    line_stripped = line.strip()
+    return (
+        line_stripped.startswith('\\\\') and 
+        (line_stripped.endswith('(?=\\|$)') or line_stripped.endswith('(?=\\\\|$)'))
+    )
+
+def _hash_patterns(patterns):
+    return hashlib.sha1("\n".join(patterns).encode("utf-8")).hexdigest()
+
+def _write_atomic(path, lines):
+    """Write via a temp file in the same folder and swap it in, so SSMS never sees a half-written file"""
+    tmp_path = f"{path}.ssmsplus.tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        f.writelines(lines)
+    try:
+        os.replace(tmp_path, path)
+    except PermissionError:
+        # SSMS may hold the file open without delete sharing, fall back to writing in place
+        os.remove(tmp_path)
+        with open(path, 'w', encoding="utf-8") as f:
+            f.writelines(lines)
+
+def update_regex_file(regex_file_path, patterns, keep_other_lines=True):
+    """Replace our pattern block in one ColorByRegexConfig.txt, skipping the write if nothing changed
+
+    Args:
+        regex_file_path: Path to the config file
+        patterns (list): Patterns that should be in the file, in order
+        keep_other_lines (bool): Keep lines that aren't server patterns (False writes only our patterns)
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date
+    """
+    path = str(regex_file_path)
+    new_hash = _hash_patterns(patterns)
+
+    with _write_lock:
+        # Fast path - file untouched since we last wrote/read it with the same patterns
+        try:
+            stat = os.stat(path)
+            cached = _file_cache.get(path)
+            if cached == (stat.st_mtime_ns, stat.st_size, keep_other_lines, new_hash):
+                write_stats["skipped"] += 1
+                return False
+        except OSError:
+            pass
+
+        with open(path, 'r', encoding="utf-8") as f:
+            existing_lines = f.readlines()
+
+        other_lines = [line for line in existing_lines if not is_server_pattern(line)]
+        current_patterns = [line.strip() for line in existing_lines if is_server_pattern(line)]
+
+        unchanged = _hash_patterns(current_patterns) == new_hash and (keep_other_lines or not other_lines)
+        if not unchanged:
+            new_lines = other_lines if keep_other_lines else []
+            # Make sure our block starts on its own line
+            if new_lines and not new_lines[-1].endswith("\n"):
+                new_lines[-1] += "\n"
+            new_lines = new_lines + [f"{pattern}\n" for pattern in patterns]
+            _write_atomic(path, new_lines)
+
+        stat = os.stat(path)
+        _file_cache[path] = (stat.st_mtime_ns, stat.st_size, keep_other_lines, new_hash)
+        write_stats["skipped" if unchanged else "written"] += 1
+
+    removed = set(current_patterns) - set(patterns)
+    if removed:
+        _forget_groups(path, removed)
+    return not unchanged
+
+def _forget_groups(regex_file_path, removed):
+    """Handle pattern lines that went away, e.g. a compacted line whose members or color changed
+
+    SSMS uses each line as a tab group id, so colors stored for the old lines
+    are orphaned. Drop them from the color files next to the config, and let
+    every combination get its color applied again (to its new line).
+    """
+    folder = os.path.dirname(regex_file_path)
+    for json_path in config_index.get_color_jsons(folder):
+        tab_color_engine.remove_groups(str(json_path), removed)
+    if state.tab_colors_applied:
+        state.clear_tab_color_tracking()
 
 @staticmethod
 def clear_all_regex_patterns():
     """Clear all regex patterns from ColorByRegexConfig.txt files (for disabled mode)"""
-    temp_dir = Path(state.temp_dir)
-    config_files = list(temp_dir.rglob("ColorByRegexConfig.txt"))
+    config_files = config_index.get_config_files(state.temp_dir)
     
     if not config_files:
         return
@@ -14,95 +114,54 @@ def clear_all_regex_patterns():
     files_cleared = 0
     for regex_file_path in config_files:
         try:
-            # Read existing content
-            with open(regex_file_path, 'r', encoding="utf-8") as f:
-                existing_lines = f.readlines()
-            
-            # Filter out ALL server patterns, keep only non-server lines
-            filtered_lines = []
-            
-            for line in existing_lines:
-                line_stripped = line.strip()
-                # Check if this line looks like one of our server patterns
-                is_server_pattern = (
-                    line_stripped.startswith('\\\\') and 
-                    (line_stripped.endswith('(?=\\|$)') or line_stripped.endswith('(?=\\\\|$)'))
-                )
-                
-                if not is_server_pattern:
-                    filtered_lines.append(line)
-            
-            # Write back only non-server patterns
-            with open(regex_file_path, 'w', encoding="utf-8") as f:
-                f.writelines(filtered_lines)
-            
-            files_cleared += 1
+            # Keep only non-server lines
+            if update_regex_file(regex_file_path, [], keep_other_lines=True):
+                files_cleared += 1
             
         except Exception as e:
-            pass
+            print(f"[regex_writer] Error clearing patterns in {regex_file_path}: {e}")
 
 @staticmethod
+@metrics.timed()
 def write_to_regex_file(server, db):
     # Track this server/database combination in persistent settings
     settings.add_server_db(server, db)
     
-    # Get ALL regex patterns for all tracked combinations
-    all_patterns = settings.get_all_regex_patterns()
+    # Get ALL regex patterns for all tracked combinations, sorted like regenerate_all_regex_patterns
+    # writes them so neither rewrites a file the other left up to date
+    all_patterns = sorted(settings.get_all_regex_patterns())
     
-    temp_dir = Path(state.temp_dir)
-    config_files = list(temp_dir.rglob("ColorByRegexConfig.txt"))
+    config_files = config_index.get_config_files(state.temp_dir)
     
     if not config_files:
         return
     
-    # Process all files to remove old patterns and add new ones (if any)
+    # Replace old patterns with the current set, files already up to date are left alone
     processed_files = 0
     
     for regex_file_path in config_files:
         try:
-            # Read existing content
-            with open(regex_file_path, 'r', encoding="utf-8") as f:
-                existing_lines = f.readlines()
-            
-            # Filter out ALL old server patterns first
-            filtered_lines = []
-            old_patterns_removed = 0
-            
-            for line in existing_lines:
-                line_stripped = line.strip()
-                # Check if this line looks like one of our server patterns
-                is_server_pattern = (
-                    line_stripped.startswith('\\\\') and 
-                    (line_stripped.endswith('(?=\\|$)') or line_stripped.endswith('(?=\\\\|$)'))
-                )
-                
-                if not is_server_pattern:
-                    filtered_lines.append(line)
-                else:
-                    old_patterns_removed += 1
-            
-            # Write back filtered content plus new patterns (if any)
-            with open(regex_file_path, 'w', encoding="utf-8") as f:
-                f.writelines(filtered_lines)
-                for pattern in all_patterns:
-                    f.write(f"{pattern}\n")
-            
-            processed_files += 1
-            
-        except Exception as e:
-            pass
-            
-            processed_files += 1
+            if update_regex_file(regex_file_path, all_patterns, keep_other_lines=True):
+                processed_files += 1
             
         except Exception as e:
-            pass
+            print(f"[regex_writer] Error writing patterns to {regex_file_path}: {e}")
 
 @staticmethod
 def regenerate_all_regex_patterns():
     """Regenerate all regex patterns based on current grouping mode and tracked combinations"""
     
-    # Reload settings to get the latest values
-    settings.load()
+    global _last_regenerated
+    
+    # Reload settings only if settings.ini changed on disk
+    settings.reload_if_changed()
+    
+    # Nothing to do if the pattern settings, the temp dir and its config files are the same as last run
+    # (a new SSMS instance adds a config file that still needs our patterns)
+    config_files = config_index.get_config_files(state.temp_dir)
+    run_key = (settings.regex_generation, state.temp_dir, frozenset(str(path) for path in config_files))
+    if _last_regenerated == run_key:
+        return
     
     # Get mode and check if we have any tracked combinations
     mode = settings.get_grouping_mode()
@@ -116,41 +175,21 @@ def regenerate_all_regex_patterns():
     if not tracked_combinations:
         return
     
-    temp_dir = Path(state.temp_dir)
-    config_files = list(temp_dir.rglob("ColorByRegexConfig.txt"))
-    
     if not config_files:
         return
 
-    # Generate new patterns based on current mode
-    pattern_list = []
-    
-    if mode == 'server':
-        # In server mode, get unique server names and create one pattern per server
-        server_combinations = settings.get_configured_server_combinations()
-        for server in server_combinations:
-            pattern = f"\\\\{server}\\\\.*(?=\\\\|$)"
-            if pattern not in pattern_list:
-                pattern_list.append(pattern)
-    else:  # 'server_db'
-        # In server_db mode, get server.db combinations and create one pattern per combination
-        server_db_combinations = settings.get_configured_db_combinations()
-        for combination in server_db_combinations:
-            server, db = combination.split('.', 1)  # Split on first dot only
-            pattern = f"\\\\{server}\\\\{db}(?=\\\\|$)"
-            if pattern not in pattern_list:
-                pattern_list.append(pattern)
+    # Generate new patterns based on current mode (compacted if enabled)
+    pattern_list = settings.get_all_regex_patterns()
     
     # Update each regex file - start fresh and add only our patterns
     files_updated = 0
     for regex_file_path in config_files:
         try:
-            # Start with a completely fresh file - write only our patterns
-            with open(regex_file_path, 'w', encoding="utf-8") as f:
-                for pattern in sorted(pattern_list):  # Sort for consistent ordering
-                    f.write(f"{pattern}\n")
-            
-            files_updated += 1
+            # Sort for consistent ordering (write_to_regex_file sorts the same way)
+            if update_regex_file(regex_file_path, sorted(pattern_list), keep_other_lines=False):
+                files_updated += 1
                 
         except Exception as e:
-            pass
\ No newline at end of file
+            print(f"[regex_writer] Error regenerating patterns in {regex_file_path}: {e}")
+    
+    _last_regenerated = run_key
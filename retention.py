@@ -0,0 +1,185 @@
+"""Archives temp scripts from previous sessions instead of deleting them."""
+
+import heapq
+import os
+import time
+import zipfile
+from dedup_catalog import hash_file
+
+ARCHIVE_FOLDER = "archive"
+
+def archive_folder_for(temp_folder):
+    """The archive folder next to a <server>/<db>/temp folder"""
+    return os.path.join(os.path.dirname(temp_folder), ARCHIVE_FOLDER)
+
+def archive_name(timestamp):
+    """One zip per day, named after the day the scripts were last modified"""
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp)) + ".zip"
+
+def archive_day(path, fallback):
+    """Start of the day an archive covers, from its name (appending to an old day's zip bumps its mtime)"""
+    try:
+        return time.mktime(time.strptime(os.path.basename(path)[:-len(".zip")], "%Y-%m-%d"))
+    except ValueError:
+        return fallback
+
+def _unique_arcname(name, existing):
+    """Add a counter to a file name already stored in the zip (SSMS reuses SQLQueryN.sql names)"""
+    if name not in existing:
+        return name
+    stem, ext = os.path.splitext(name)
+    counter = 2
+    while f"{stem}_{counter}{ext}" in existing:
+        counter += 1
+    return f"{stem}_{counter}{ext}"
+
+class RetentionEngine:
+    """Moves old temp files into per-day zips and keeps the archives within quotas
+
+    Archives live in <server>/<db>/archive/YYYY-MM-DD.zip. With a catalog,
+    content that's already archived is only recorded as a reference instead
+    of being stored again. Quotas apply to all
+    archives together: anything older than max_days is removed, then the
+    oldest archives are evicted until the total fits in max_bytes.
+    """
+
+    def __init__(self, max_bytes=500 * 1024 * 1024, max_days=90, catalog=None):
+        self.max_bytes = max_bytes
+        self.max_days = max_days
+        self.catalog = catalog  # DedupCatalog, identical scripts are then stored once across all archives
+        self.stats = {"archived": 0, "archived_bytes": 0, "evicted": 0, "evicted_bytes": 0}
+
+    @classmethod
+    def from_settings(cls, settings, catalog=None):
+        return cls(settings.get_retention_max_archive_mb() * 1024 * 1024, settings.get_retention_max_archive_days(), catalog)
+
+    def archive(self, temp_folder, entries):
+        """Move files into their day's archive, deleting each one only after it's stored
+
+        Args:
+            temp_folder (str): The <server>/<db>/temp folder the files are in
+            entries (list): os.DirEntry objects for the files to archive
+
+        Returns:
+            int: Number of files archived
+        """
+        by_day = {}
+        for entry in entries:
+            mtime = entry.stat().st_mtime
+            by_day.setdefault(archive_name(mtime), []).append((entry, mtime))
+
+        archive_folder = archive_folder_for(temp_folder)
+        os.makedirs(archive_folder, exist_ok=True)
+
+        archived = 0
+        for name, day_entries in sorted(by_day.items()):
+            zip_path = os.path.join(archive_folder, name)
+            blobs = {}  # hash -> (size, arcname) stored in this zip
+            references = []  # (arcname, hash, size) stored only in the catalog
+            try:
+                with zipfile.ZipFile(zip_path, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+                    existing = set(zf.namelist())
+                    if self.catalog:
+                        existing.update(self.catalog.get_references(zip_path))
+                    for entry, mtime in day_entries:
+                        arcname = _unique_arcname(entry.name, existing)
+                        existing.add(arcname)
+                        size = entry.stat().st_size
+                        if self.catalog:
+                            digest = hash_file(entry.path)
+                            if digest in blobs or self.catalog.find_archived(digest):
+                                references.append((arcname, digest, size))
+                                continue
+                            blobs[digest] = (size, arcname)
+                        # ZipFile.write streams the file in chunks, it's never read into memory whole
+                        zf.write(entry.path, arcname)
+                        self.stats["archived_bytes"] += size
+            except Exception as e:
+                print(f"[retention] Error writing {zip_path}: {e}")
+                continue
+            
+            # Catalog entries only once the zip holding the content is closed
+            for digest, (size, arcname) in blobs.items():
+                self.catalog.add_archived(digest, size, zip_path, arcname)
+            for arcname, digest, size in references:
+                self.catalog.add_reference(zip_path, arcname, digest, size)
+            if references and not blobs:
+                # Nothing was written, touch the zip so the search index re-reads it for the new references
+                os.utime(zip_path)
+
+            # Only delete once the zip has been closed successfully
+            for entry, _ in day_entries:
+                try:
+                    os.unlink(entry.path)
+                    archived += 1
+                except Exception as e:
+                    print(f"[retention] Archived but could not delete {entry.path}: {e}")
+        self.stats["archived"] += archived
+        return archived
+
+    def enforce_quotas(self, archive_folders, now=None):
+        """Evict archives past the age limit, then the oldest ones until the size quota is met
+
+        Args:
+            archive_folders (iterable): Archive folders to consider together
+
+        Returns:
+            int: Number of archives removed
+        """
+        now = now or time.time()
+        heap = []
+        sizes = {}  # zip path -> size, re-read when evicting moves blobs into the zip
+        for folder in archive_folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_file() and entry.name.endswith(".zip"):
+                            stat = entry.stat()
+                            heap.append((archive_day(entry.path, stat.st_mtime), entry.path))
+                            sizes[entry.path] = stat.st_size
+            except OSError:
+                continue
+        heapq.heapify(heap)
+        total = sum(sizes.values())
+
+        def restat(paths):
+            # Account for blobs re-homed into surviving zips
+            nonlocal total
+            for path in paths:
+                if path in sizes:
+                    try:
+                        size = os.path.getsize(path)
+                    except OSError:
+                        continue
+                    total += size - sizes[path]
+                    sizes[path] = size
+
+        max_age = self.max_days * 86400 if self.max_days else None
+        evicted = 0
+        while heap:
+            day, path = heap[0]
+            # A day's archive expires once the whole day is past the limit
+            too_old = max_age is not None and now - (day + 86400) > max_age
+            too_big = self.max_bytes and total > self.max_bytes
+            if not too_old and not too_big:
+                break
+            heapq.heappop(heap)
+            try:
+                if self.catalog:
+                    restat(set(self.catalog.evict_zip(path)))
+                os.unlink(path)
+            except OSError as e:
+                print(f"[retention] Error evicting {path}: {e}")
+                # Some blobs may have moved before the failure
+                restat(list(sizes))
+                continue
+            size = sizes.pop(path)
+            total -= size
+            evicted += 1
+            self.stats["evicted"] += 1
+            self.stats["evicted_bytes"] += size
+            print(f"[retention] Evicted {path} ({'age' if too_old else 'size quota'})")
+        return evicted
+
+    def get_stats(self):
+        return dict(self.stats)
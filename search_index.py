@@ -0,0 +1,250 @@
+"""Full-text index of saved query files."""
+
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from dedup_catalog import dedup_catalog
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    source_mtime REAL,
+    source_size INTEGER,
+    server TEXT,
+    db TEXT,
+    modified REAL
+);
+CREATE INDEX IF NOT EXISTS idx_scripts_source ON scripts (source);
+"""
+
+# Scripts content, with FTS5 when the sqlite build has it
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS scripts_text USING fts5(content, tokenize = 'unicode61')"
+PLAIN_SCHEMA = "CREATE TABLE IF NOT EXISTS scripts_text (rowid INTEGER PRIMARY KEY, content TEXT)"
+
+# Separates the zip path from the file name for archived scripts
+ARCHIVE_SEP = "!"
+
+def read_script(data):
+    """Decode a saved script (SSMS writes UTF-8 with BOM by default, UTF-16 is also common)"""
+    if data.startswith(b"\xff\xfe") or data.startswith(b"\xfe\xff"):
+        return data.decode("utf-16", errors="replace")
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+def like_pattern(word):
+    """LIKE pattern for a word anywhere in the text, with % and _ matched literally (ESCAPE '\\')"""
+    escaped = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def fts_query(text):
+    """Turn user input into an FTS5 query: every word must appear, words are quoted so SQL text can't break the syntax"""
+    terms = [t.replace('"', '""') for t in text.split()]
+    return " ".join(f'"{t}"' for t in terms)
+
+class SearchIndex:
+    """SQLite full-text index over <server>/<db>/temp scripts and their archives
+
+    Scripts are indexed when they are saved (FileManager.after_save) and the
+    whole save dir is reconciled at startup. Loose files are keyed by path;
+    archived ones by "<zip>!<name>", and a zip is only re-read when its
+    mtime or size changed.
+    """
+
+    # Sources indexed per transaction during reconcile, the lock is released in between
+    # so searches from the UI aren't stuck behind the whole startup walk
+    RECONCILE_BATCH = 50
+
+    def __init__(self, path=None, catalog=None):
+        self.path = path
+        self.catalog = catalog
+        self.conn = None
+        self.fts = False
+        self.lock = threading.Lock()
+        self.stats = {"indexed": 0, "removed": 0, "searches": 0}
+
+    def _connect(self):
+        if self.conn:
+            return
+        if not self.path:
+            from state import settings
+            self.path = settings.get_search_index_path()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            try:
+                self.conn.execute(FTS_SCHEMA)
+            except sqlite3.OperationalError:
+                # sqlite built without FTS5, fall back to LIKE scans
+                self.conn.execute(PLAIN_SCHEMA)
+            # An index created by a build without FTS5 stays a plain table
+            self.fts = self.conn.execute(
+                "SELECT sql LIKE '%fts5%' FROM sqlite_master WHERE name = 'scripts_text'").fetchone()[0] == 1
+
+    def close(self):
+        with self.lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+    def _upsert(self, path, source, source_mtime, source_size, server, db, modified, content):
+        # Re-indexed scripts get a new id, so ids follow indexing order and searches can walk them newest first
+        row = self.conn.execute("SELECT id FROM scripts WHERE path = ?", (path,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM scripts_text WHERE rowid = ?", (row[0],))
+            self.conn.execute("DELETE FROM scripts WHERE id = ?", (row[0],))
+        rowid = self.conn.execute(
+            "INSERT INTO scripts (path, source, source_mtime, source_size, server, db, modified) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, source, source_mtime, source_size, server, db, modified)).lastrowid
+        self.conn.execute("INSERT INTO scripts_text (rowid, content) VALUES (?, ?)", (rowid, content))
+        self.stats["indexed"] += 1
+
+    def _remove_source(self, source):
+        ids = [r[0] for r in self.conn.execute("SELECT id FROM scripts WHERE source = ?", (source,))]
+        for rowid in ids:
+            self.conn.execute("DELETE FROM scripts_text WHERE rowid = ?", (rowid,))
+        self.conn.execute("DELETE FROM scripts WHERE source = ?", (source,))
+        self.stats["removed"] += len(ids)
+
+    @staticmethod
+    def _server_db(folder):
+        """(server, db) from a <server>/<db>/temp or <server>/<db>/archive folder"""
+        db_folder = os.path.dirname(os.path.abspath(folder))
+        return os.path.basename(os.path.dirname(db_folder)).upper(), os.path.basename(db_folder).upper()
+
+    def _index_file(self, path, stat):
+        with open(path, "rb") as f:
+            content = read_script(f.read())
+        server, db = self._server_db(os.path.dirname(path))
+        self._upsert(path, path, stat.st_mtime, stat.st_size, server, db, stat.st_mtime, content)
+
+    def _index_zip(self, zip_path, stat):
+        self._remove_source(zip_path)
+        server, db = self._server_db(os.path.dirname(zip_path))
+        with zipfile.ZipFile(zip_path) as zf:
+            for info in sorted(zf.infolist(), key=lambda i: i.date_time):
+                if info.is_dir():
+                    continue
+                content = read_script(zf.read(info))
+                modified = time.mktime(info.date_time + (0, 0, -1))
+                self._upsert(f"{zip_path}{ARCHIVE_SEP}{info.filename}", zip_path, stat.st_mtime, stat.st_size,
+                             server, db, modified, content)
+        if not self.catalog:
+            return
+        # Duplicates archived as catalog references, their content is stored in another zip
+        # (their own modification time isn't kept, the zip's stands in for it)
+        for arcname in self.catalog.get_references(zip_path):
+            blob_zip, blob_name = self.catalog.resolve(zip_path, arcname)
+            try:
+                with zipfile.ZipFile(blob_zip) as zf:
+                    content = read_script(zf.read(blob_name))
+            except (OSError, KeyError, zipfile.BadZipFile) as e:
+                print(f"[search_index] Error reading {arcname} of {zip_path} from {blob_zip}: {e}")
+                continue
+            self._upsert(f"{zip_path}{ARCHIVE_SEP}{arcname}", zip_path, stat.st_mtime, stat.st_size,
+                         server, db, stat.st_mtime, content)
+
+    def add_file(self, path):
+        """Index (or re-index) one saved script"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        with self.lock:
+            self._connect()
+            with self.conn:
+                self._index_file(path, stat)
+        return True
+
+    def reconcile(self, folders):
+        """Bring the index in line with the scripts on disk
+
+        Args:
+            folders (iterable): temp and archive folders to index; everything
+                indexed outside of them is dropped
+
+        Returns:
+            tuple: (sources indexed, sources removed)
+        """
+        on_disk = {}  # source path -> stat
+        for folder in folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            on_disk[entry.path] = entry.stat()
+            except OSError:
+                continue
+
+        indexed = removed = 0
+        with self.lock:
+            self._connect()
+            known = {source: (mtime, size) for source, mtime, size in
+                     self.conn.execute("SELECT DISTINCT source, source_mtime, source_size FROM scripts")}
+            with self.conn:
+                for source in known.keys() - on_disk.keys():
+                    self._remove_source(source)
+                    removed += 1
+
+        # Oldest first, so ids roughly follow modification order
+        changed = [(source, stat) for source, stat in sorted(on_disk.items(), key=lambda item: item[1].st_mtime)
+                   if known.get(source) != (stat.st_mtime, stat.st_size)]
+        for start in range(0, len(changed), self.RECONCILE_BATCH):
+            with self.lock:
+                with self.conn:
+                    for source, stat in changed[start:start + self.RECONCILE_BATCH]:
+                        try:
+                            if source.endswith(".zip"):
+                                self._index_zip(source, stat)
+                            else:
+                                self._index_file(source, stat)
+                            indexed += 1
+                        except Exception as e:
+                            print(f"[search_index] Error indexing {source}: {e}")
+        print(f"[search_index] Reconciled: {indexed} indexed, {removed} removed, {len(on_disk)} on disk")
+        return indexed, removed
+
+    def search(self, text, limit=100):
+        """Find scripts containing every word of text, most recently indexed first
+
+        FTS5 walks its rowids backwards and stops at the limit, so common words
+        cost the same as rare ones.
+
+        Returns:
+            list: (path, server, db, modified, snippet) tuples
+        """
+        if not text.strip():
+            return []
+        with self.lock:
+            self._connect()
+            self.stats["searches"] += 1
+            if self.fts:
+                return self.conn.execute(
+                    "SELECT s.path, s.server, s.db, s.modified, m.snippet FROM "
+                    "(SELECT rowid, snippet(scripts_text, 0, '[', ']', '...', 12) AS snippet FROM scripts_text "
+                    " WHERE scripts_text MATCH ? ORDER BY rowid DESC LIMIT ?) m "
+                    "JOIN scripts s ON s.id = m.rowid ORDER BY s.id DESC",
+                    (fts_query(text), limit)).fetchall()
+            where = " AND ".join("t.content LIKE ? ESCAPE '\\'" for _ in text.split())
+            rows = self.conn.execute(
+                "SELECT s.path, s.server, s.db, s.modified, substr(t.content, 1, 80) "
+                f"FROM scripts_text t JOIN scripts s ON s.id = t.rowid WHERE {where} "
+                "ORDER BY s.id DESC LIMIT ?",
+                [like_pattern(word) for word in text.split()] + [limit]).fetchall()
+            return rows
+
+    def count(self):
+        with self.lock:
+            self._connect()
+            return self.conn.execute("SELECT COUNT(*) FROM scripts").fetchone()[0]
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Shared instance, the database lives next to settings.ini
+search_index = SearchIndex(catalog=dedup_catalog)
@@ -2,6 +2,11 @@
 import configparser
 import os
 import sys
+import threading
+import time
+from types import MappingProxyType
+from regex_compactor import compact_patterns, verify_compaction
+from combination_store import CombinationStore, KIND_SERVER, KIND_DB
 
 if getattr(sys, 'frozen', False):
     # Running as exe
@@ -10,32 +15,422 @@ else:
     # Running as script
     CONFIG_PATH = os.path.join(os.path.dirname(__file__), "settings.ini")
 
+# INI sections holding tracked combinations, and the store kind each maps to
+COMBINATION_SECTIONS = {"TabColoringServer": KIND_SERVER, "TabColoringDB": KIND_DB}
+# Default for _queue_store_change when only usage changes (None is a valid value: an invalid color)
+KEEP_COLOR = object()
+
+class SettingsSnapshot:
+    """Immutable copy of the settings that readers use without taking the writer lock
+
+    Writers build a new snapshot and swap the reference, so a reader always sees
+    one consistent version even while another thread is changing settings.
+    """
+
+    def __init__(self, values, grouping_mode, server_colors, db_colors, sorted_combinations=None):
+        self.values = values  # section -> read-only {option: value}
+        self.grouping_mode = grouping_mode
+        self.server_colors = server_colors  # read-only server -> color index
+        self.db_colors = db_colors  # read-only server.db -> color index
+        self._sorted = dict(sorted_combinations or {})
+
+    def get(self, section, option, fallback=None):
+        return self.values.get(section, {}).get(option.lower(), fallback)
+
+    def sorted_combinations(self, kind):
+        """Sorted display names (uppercase) for a kind, computed once per snapshot"""
+        combinations = self._sorted.get(kind)
+        if combinations is None:
+            if kind == KIND_SERVER:
+                combinations = tuple(sorted(key.upper() for key in self.server_colors))
+            else:
+                combinations = tuple(sorted(key.upper() for key in self.db_colors if "." in key))
+            self._sorted[kind] = combinations
+        return combinations
+
+EMPTY_SNAPSHOT = SettingsSnapshot(MappingProxyType({}), "server_db", MappingProxyType({}), MappingProxyType({}))
+
 class Settings:
+    # Seconds to wait after the last change before writing settings.ini
+    FLUSH_DELAY = 1.0
+
     def __init__(self, config_path=CONFIG_PATH):
         self.config_path = config_path
         self.config = configparser.ConfigParser()
+        self._lock = threading.RLock()
+        self._dirty = False  # settings.ini needs writing
+        self._config_touched = False  # config changed since the last save() call
+        self._pending_ini = {}  # (section, option) -> value set since settings.ini was last written
+        self._flush_timer = None
+        # Optional SQLite store for combinations, with changes batched until flush()
+        self.store = None
+        self._pending_store = {}
+        # In-memory color lookup tables, kept in sync by load() and set_setting()
+        self._grouping_mode = "server_db"
+        self._server_colors = {}  # server -> color index (None if the stored value is invalid)
+        self._db_colors = {}  # server.db -> color index (None if the stored value is invalid)
+        # Published read-only view of everything above, replaced on every change
+        self._snapshot = EMPTY_SNAPSHOT
+        self._batch_depth = 0
+        # Bumped every time a new snapshot is published, so callers can cheaply detect changes
+        self.generation = 0
+        # Bumped only when something the regex patterns are built from changes
+        # (grouping mode, regex compaction, tracked combinations)
+        self.regex_generation = 0
+        # (combinations with colors, compacted or expanded lines) of the last get_all_regex_patterns
+        self._compaction_cache = None
+        # Change listeners and the settings.ini watch for edits from other processes
+        self._listeners = []
+        self._file_observer = None
+        self._known_stat = None
         self.load()
 
     def load(self):
-        # Create config file if missing
-        if not os.path.exists(self.config_path):
-            with open(self.config_path, "w") as f:
-                f.write("[Folders]\n")
-        self.config.read(self.config_path)
+        with self._lock:
+            # Combination changes go to the store, the INI ones are merged over the file below
+            self._apply_pending_store()
+            # Create config file if missing
+            if not os.path.exists(self.config_path):
+                with open(self.config_path, "w") as f:
+                    f.write("[Folders]\n")
+            before = self._combination_keys() if self._listeners else None
+            old_mode = self._grouping_mode
+            # Parse into a fresh parser so keys removed from the file don't linger
+            config = configparser.ConfigParser()
+            config.read(self.config_path)
+            stat = os.stat(self.config_path)
+            self._known_stat = self._file_signature(stat)
+            # Keep changes that haven't been written yet on top of what's on disk now,
+            # instead of writing them first and overwriting the edit that caused the reload
+            for (section, option), value in self._pending_ini.items():
+                if not config.has_section(section):
+                    config.add_section(section)
+                config.set(section, option, value)
+            self.config = config
+            # Read the backend from the parsed file, the snapshot isn't rebuilt yet
+            if config.get("Storage", "Backend", fallback="ini").lower() == "sqlite":
+                self._open_store()
+            elif self.store:
+                self.store.close()
+                self.store = None
+            self._rebuild_lookup()
+            added = self._combination_keys() - before if before is not None else set()
+            mode_changed = old_mode != self._grouping_mode
+
+        for kind, key in sorted(added):
+            server, db = CombinationStore.split_key(kind, key)
+            self._notify("combination_added", kind=kind, server=server.upper(), db=db.upper() or None)
+        if before is not None:
+            self._notify("reloaded", mode_changed=mode_changed)
+
+    def _combination_keys(self):
+        return {(KIND_SERVER, k) for k in self._server_colors} | {(KIND_DB, k) for k in self._db_colors}
+
+    def add_listener(self, callback):
+        """Register callback(event, data) for settings changes
+
+        Events: "combination_added" (kind, server, db), "color_changed" (server, db, color),
+        "mode_changed" (mode) and "reloaded" (mode_changed) after settings.ini changed on disk.
+        Callbacks run on whichever thread made the change.
+        """
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify(self, event, **data):
+        for callback in list(self._listeners):
+            try:
+                callback(event, data)
+            except Exception as e:
+                print(f"[settings] Error in settings listener for {event}: {e}")
+
+    def start_file_watch(self):
+        """Watch settings.ini and reload it when another process changes it"""
+        if self._file_observer:
+            return
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        settings = self
+        config_path = os.path.normcase(os.path.abspath(self.config_path))
+
+        class ConfigFileHandler(FileSystemEventHandler):
+            def handle(self, *paths):
+                if any(p and os.path.normcase(os.path.abspath(p)) == config_path for p in paths):
+                    settings._on_file_changed()
+
+            def on_created(self, event):
+                self.handle(event.src_path)
+
+            def on_modified(self, event):
+                self.handle(event.src_path)
+
+            def on_moved(self, event):
+                self.handle(event.dest_path)
+
+        self._file_observer = Observer()
+        self._file_observer.schedule(ConfigFileHandler(), path=os.path.dirname(config_path), recursive=False)
+        self._file_observer.start()
+
+    def stop_file_watch(self):
+        if self._file_observer:
+            self._file_observer.stop()
+            self._file_observer = None
+
+    @staticmethod
+    def _file_signature(stat):
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def is_file_changed(self):
+        """Check whether settings.ini differs (size, mtime or inode) from what we last loaded or wrote"""
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return True
+        return self._file_signature(stat) != self._known_stat
+
+    def reload_if_changed(self):
+        """Reload settings.ini only if it changed on disk, returns True if it was reloaded"""
+        with self._lock:
+            if not self.is_file_changed():
+                return False
+        print("[settings] settings.ini changed on disk, reloading")
+        self.load()
+        return True
+
+    def _on_file_changed(self):
+        # Ignore events caused by our own writes, or for content we've already loaded
+        self.reload_if_changed()
+
+    def get_store_path(self):
+        """Path of the SQLite combination store (next to settings.ini)"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "combinations.db")
+
+    def get_search_index_path(self):
+        """Path of the full-text index of saved scripts (next to settings.ini)"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "search_index.db")
+
+    def get_dedup_catalog_path(self):
+        """Path of the content-hash catalog of saved and archived scripts (next to settings.ini)"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "dedup_catalog.db")
+
+    def get_journal_path(self):
+        """Path of the processed temp file journal (next to settings.ini)"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "journal.jsonl")
+
+    def get_metrics_path(self):
+        """Path of the pipeline stage timings (next to settings.ini)"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "metrics.json")
+
+    def _open_store(self):
+        """Open the SQLite store and move any combinations still in the INI into it"""
+        if not self.store:
+            self.store = CombinationStore(self.get_store_path())
+
+        changes = {}
+        for section, kind in COMBINATION_SECTIONS.items():
+            if self.config.has_section(section):
+                for key, value in self.config.items(section):
+                    # Invalid values stay invalid (NULL), so they still fall back to the server color
+                    changes[(kind, key)] = {"color": self._parse_color(value)}
+                self.config.remove_section(section)
+        if changes:
+            self.store.apply(changes)
+            self._dirty = True
+            print(f"[settings] Migrated {len(changes)} combinations from settings.ini to {self.store.path}")
+            self.save()
+
+    def get_combination_backend(self):
+        """Get where tracked combinations are stored ('ini' or 'sqlite')"""
+        return self.get_setting("Storage", "Backend", fallback="ini").lower()
+
+    def set_combination_backend(self, backend):
+        """Set where tracked combinations are stored, moving existing combinations across"""
+        with self._lock:
+            if backend == self.get_combination_backend():
+                return
+            self._batch_depth += 1
+            self.set_setting("Storage", "Backend", backend)
+            if backend == "sqlite":
+                self._open_store()
+            elif self.store:
+                # Write everything back into the INI sections
+                self._apply_pending_store()
+                store = self.store
+                self.store = None
+                for section, kind in COMBINATION_SECTIONS.items():
+                    for key, color in store.all(kind).items():
+                        self.set_setting(section, key, "" if color is None else str(color))
+                store.close()
+            self._batch_depth -= 1
+            self._rebuild_lookup()
+            self.save()
+
+    @staticmethod
+    def _parse_color(value):
+        """Parse a stored color index, returns None if it's not a valid index"""
+        try:
+            color_index = int(value)
+        except (TypeError, ValueError):
+            return None
+        return color_index if 0 <= color_index <= 16 else None
+
+    def _rebuild_lookup(self):
+        """Build the color lookup tables from the config (or the store)"""
+        self._grouping_mode = self.config.get("Appearance", "GroupingMode", fallback="server_db")
+        self._server_colors = {}
+        self._db_colors = {}
+        for section, kind in COMBINATION_SECTIONS.items():
+            table = self._server_colors if kind == KIND_SERVER else self._db_colors
+            if self.store:
+                table.update(self.store.all(kind))
+            elif self.config.has_section(section):
+                for key, value in self.config.items(section):
+                    table[key] = self._parse_color(value)
+        self._publish()
+
+    def _section_values(self, section):
+        try:
+            return MappingProxyType(dict(self.config.items(section)))
+        except configparser.InterpolationError:
+            return MappingProxyType(dict(self.config.items(section, raw=True)))
+
+    def _publish(self, section=None):
+        """Swap in a new snapshot, copying only what changed (everything if section is None)"""
+        old = self._snapshot
+        if section is None:
+            values = {name: self._section_values(name) for name in self.config.sections()}
+            server_colors = MappingProxyType(dict(self._server_colors))
+            db_colors = MappingProxyType(dict(self._db_colors))
+            sorted_combinations = None
+        else:
+            values = dict(old.values)
+            if self.config.has_section(section):
+                values[section] = self._section_values(section)
+            server_colors = old.server_colors
+            db_colors = old.db_colors
+            # Sorted lists of kinds that didn't change can be reused
+            sorted_combinations = dict(old._sorted)
+            kind = COMBINATION_SECTIONS.get(section)
+            if kind == KIND_SERVER:
+                server_colors = MappingProxyType(dict(self._server_colors))
+            elif kind == KIND_DB:
+                db_colors = MappingProxyType(dict(self._db_colors))
+            if kind and len(server_colors if kind == KIND_SERVER else db_colors) != len(
+                    old.server_colors if kind == KIND_SERVER else old.db_colors):
+                sorted_combinations.pop(kind, None)
+        self._snapshot = SettingsSnapshot(MappingProxyType(values), self._grouping_mode, 
+                                          server_colors, db_colors, sorted_combinations)
+        self.generation += 1
+        if section in COMBINATION_SECTIONS or (section in (None, "Appearance") and
+                                               self._regex_inputs(old) != self._regex_inputs(self._snapshot)):
+            self.regex_generation += 1
+
+    @staticmethod
+    def _regex_inputs(snapshot):
+        """The parts of a snapshot the regex patterns are built from"""
+        return (snapshot.grouping_mode, snapshot.get("Appearance", "CompactRegex", fallback="false").lower(),
+                dict(snapshot.server_colors), dict(snapshot.db_colors))
+
+    def snapshot(self):
+        """Get the current read-only settings snapshot"""
+        return self._snapshot
+
+    def _update_lookup(self, section, option, value):
+        """Keep the color lookup tables in sync with a single changed setting"""
+        key = self.config.optionxform(option)
+        if section in COMBINATION_SECTIONS:
+            kind = COMBINATION_SECTIONS[section]
+            table = self._server_colors if kind == KIND_SERVER else self._db_colors
+            table[key] = self._parse_color(value)
+        elif section == "Appearance" and key == "groupingmode":
+            self._grouping_mode = value
+
+    def _queue_store_change(self, kind, key, color=KEEP_COLOR, use=False):
+        """Batch a change for the SQLite store until the next flush (a color of None is an invalid one)"""
+        change = self._pending_store.setdefault((kind, key), {})
+        if color is not KEEP_COLOR:
+            change["color"] = color
+        if use:
+            change["uses"] = change.get("uses", 0) + 1
+            change["last_seen"] = time.time()
 
     def get_setting(self, section, option, fallback=None):
         """Get a setting value from the config file"""
-        return self.config.get(section, option, fallback=fallback)
+        return self._snapshot.get(section, option, fallback=fallback)
 
     def set_setting(self, section, option, value):
         """Set a setting value in the config file"""
-        if not self.config.has_section(section):
-            self.config.add_section(section)
-        self.config.set(section, option, value)
+        with self._lock:
+            if self.store and section in COMBINATION_SECTIONS:
+                # Combinations live in the SQLite store instead of the INI
+                self._queue_store_change(COMBINATION_SECTIONS[section], self.config.optionxform(option),
+                                         color=self._parse_color(value))
+                self._update_lookup(section, option, value)
+                if not self._batch_depth:
+                    self._publish(section)
+                return
+            if not self.config.has_section(section):
+                self.config.add_section(section)
+            self.config.set(section, option, value)
+            self._pending_ini[(section, option)] = value
+            self._config_touched = True
+            self._update_lookup(section, option, value)
+            if not self._batch_depth:
+                self._publish(section)
 
     def save(self):
-        with open(self.config_path, "w") as f:
-            self.config.write(f)
+        """Mark settings as changed and schedule a write, repeated saves within FLUSH_DELAY are batched"""
+        with self._lock:
+            if self._config_touched:
+                self._dirty = True
+                self._config_touched = False
+            if not self._dirty and not self._pending_store:
+                return
+            if self._flush_timer:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(self.FLUSH_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _apply_pending_store(self):
+        if self.store and self._pending_store:
+            try:
+                self.store.apply(self._pending_store)
+                self._pending_store = {}
+            except Exception as e:
+                print(f"[settings] Error writing combination store: {e}")
+
+    def flush(self):
+        """Write pending changes to settings.ini now (atomically, so a crash never leaves a partial file)"""
+        with self._lock:
+            if self._flush_timer:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._apply_pending_store()
+            if self._config_touched:
+                self._dirty = True
+                self._config_touched = False
+            if not self._dirty:
+                return
+            tmp_path = f"{self.config_path}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    self.config.write(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.config_path)
+                self._dirty = False
+                self._pending_ini = {}
+                stat = os.stat(self.config_path)
+                self._known_stat = self._file_signature(stat)
+            except Exception as e:
+                print(f"[settings] Error writing settings: {e}")
 
     def set_temp_dir(self, value):
         self.set_setting("Folders", "TempDir", value)
@@ -80,6 +475,84 @@ class Settings:
         self.set_setting("Appearance", "autocolor", "true" if enabled else "false")
         self.save()
 
+    # Regex compaction setting
+    def get_regex_compaction_enabled(self):
+        """Get whether regex patterns are folded into one line per color"""
+        return self.get_setting("Appearance", "CompactRegex", fallback="false").lower() == "true"
+    
+    def set_regex_compaction_enabled(self, enabled):
+        """Set whether regex patterns are folded into one line per color"""
+        self.set_setting("Appearance", "CompactRegex", "true" if enabled else "false")
+        self.save()
+
+    # Tab color method: 'file' edits SSMS's color JSON, 'keys' uses the Set Tab Color menu
+    def get_tab_color_method(self):
+        """Get how tab colors are applied: 'keys' (the default) or 'file', which falls back to 'keys' when the JSON can't be used"""
+        method = self.get_setting("Appearance", "TabColorMethod", fallback="keys").lower()
+        return method if method in ("file", "keys") else "keys"
+    
+    def set_tab_color_method(self, method):
+        if method not in ("file", "keys"):
+            raise ValueError(f"Invalid tab color method: {method}")
+        self.set_setting("Appearance", "TabColorMethod", method)
+        self.save()
+
+    # Retention settings for temp files from previous sessions
+    def get_retention_mode(self):
+        """Get what happens to old temp files: 'archive' (zip per day per database) or 'delete'"""
+        mode = self.get_setting("Retention", "Mode", fallback="archive").lower()
+        return mode if mode in ("archive", "delete") else "archive"
+    
+    def set_retention_mode(self, mode):
+        """Set what happens to old temp files ('archive' or 'delete')"""
+        if mode not in ("archive", "delete"):
+            raise ValueError(f"Invalid retention mode: {mode}")
+        self.set_setting("Retention", "Mode", mode)
+        self.save()
+    
+    def get_retention_max_archive_mb(self):
+        """Get the total size quota for all archives in MB (0 = no limit)"""
+        try:
+            return max(0, int(self.get_setting("Retention", "MaxArchiveMB", fallback="500")))
+        except ValueError:
+            return 500
+    
+    def set_retention_max_archive_mb(self, megabytes):
+        self.set_setting("Retention", "MaxArchiveMB", str(int(megabytes)))
+        self.save()
+    
+    def get_retention_max_archive_days(self):
+        """Get how many days archives are kept (0 = no limit)"""
+        try:
+            return max(0, int(self.get_setting("Retention", "MaxArchiveDays", fallback="90")))
+        except ValueError:
+            return 90
+    
+    def set_retention_max_archive_days(self, days):
+        self.set_setting("Retention", "MaxArchiveDays", str(int(days)))
+        self.save()
+
+    # Learned latencies of the window polling loops
+    def get_adaptive_timing(self, stage):
+        """Get the learned (mean, deviation) in seconds for a polling stage, or None"""
+        value = self.get_setting("AdaptiveTiming", stage, fallback="")
+        try:
+            mean, dev = (float(part) for part in value.split(","))
+        except ValueError:
+            return None
+        return (mean, dev) if 0 <= mean < 3600 and 0 <= dev < 3600 else None
+
+    def set_adaptive_timing(self, timings):
+        """Store learned {stage: (mean, deviation)} for the polling loops"""
+        with self._lock:
+            # One snapshot for the whole batch
+            self._batch_depth += 1
+            for stage, (mean, dev) in timings.items():
+                self.set_setting("AdaptiveTiming", stage, f"{mean:.4f},{dev:.4f}")
+            self._batch_depth -= 1
+            self._publish("AdaptiveTiming")
+        self.save()
+
     # Tab coloring settings
     def get_tab_coloring_server_enabled(self):
         """Check if server-based tab coloring is enabled based on grouping mode"""
@@ -103,30 +576,28 @@ class Settings:
         Returns:
             int: Color index (0-16), defaults to 0 (random)
         """
-        server_lower = server.lower()
+        return self.resolve_tab_color(server, db)
+    
+    def resolve_tab_color(self, server, db=None):
+        """Resolve the effective color index from the in-memory lookup tables
+
+        Same priority as get_tab_color_for_combination, without touching configparser.
+        """
+        snapshot = self._snapshot
+        mode = snapshot.grouping_mode
+        server_key = server.lower()
         
         # First, check database-specific coloring if enabled and db is provided
-        if db and self.get_tab_coloring_db_enabled():
-            db_key = f"{server_lower}.{db.lower()}"
-            color_str = self.get_setting("TabColoringDB", db_key, fallback=None)
-            if color_str is not None:
-                try:
-                    color_index = int(color_str)
-                    if 0 <= color_index <= 16:
-                        return color_index
-                except ValueError:
-                    pass
+        if db and mode == "server_db":
+            color_index = snapshot.db_colors.get(f"{server_key}.{db.lower()}")
+            if color_index is not None:
+                return color_index
         
         # Second, check server-specific coloring if enabled
-        if self.get_tab_coloring_server_enabled():
-            color_str = self.get_setting("TabColoringServer", server_lower, fallback=None)
-            if color_str is not None:
-                try:
-                    color_index = int(color_str)
-                    if 0 <= color_index <= 16:
-                        return color_index
-                except ValueError:
-                    pass
+        if mode == "server" or mode == "server_db":
+            color_index = snapshot.server_colors.get(server_key)
+            if color_index is not None:
+                return color_index
         
         # Default to 0 (random) if no specific color found
         return 0
@@ -145,6 +616,7 @@ class Settings:
         server_key = server.lower()
         self.set_setting("TabColoringServer", server_key, str(color_index))
         self.save()
+        self._notify("color_changed", server=server.upper(), db=None, color=color_index)
     
     def set_tab_color_for_database(self, server, db, color_index=0):
         """Set the tab color index for a server+database combination
@@ -161,6 +633,7 @@ class Settings:
         db_key = f"{server.lower()}.{db.lower()}"
         self.set_setting("TabColoringDB", db_key, str(color_index))
         self.save()
+        self._notify("color_changed", server=server.upper(), db=db.upper(), color=color_index)
     
     def set_tab_color_for_combination(self, server, db=None, color_index=0):
         """Legacy method - set color based on current grouping mode for backward compatibility"""
@@ -177,59 +650,53 @@ class Settings:
 
     def get_configured_db_combinations(self):
         """Get the list of server.database combinations that have colors configured"""
-        if not self.config.has_section("TabColoringDB"):
-            return []
-        
-        combinations = []
-        for key in self.config["TabColoringDB"]:
-            if "." in key:
-                # Convert back to display format (uppercase)
-                parts = key.split(".", 1)
-                if len(parts) == 2:
-                    server, db = parts
-                    combinations.append(f"{server.upper()}.{db.upper()}")
-        
-        return sorted(combinations)
+        # Display format (uppercase), sorted once per snapshot
+        return list(self._snapshot.sorted_combinations(KIND_DB))
 
     def get_configured_server_combinations(self):
         """Get the list of servers that have colors configured"""
-        if not self.config.has_section("TabColoringServer"):
-            return []
-        
-        servers = []
-        for key in self.config["TabColoringServer"]:
-            # Convert back to display format (uppercase)
-            servers.append(key.upper())
-        
-        return sorted(servers)
+        # Display format (uppercase), sorted once per snapshot
+        return list(self._snapshot.sorted_combinations(KIND_SERVER))
 
     def add_server_db(self, server, db):
         """Add a server/database combination to TabColoring sections with default colors"""
         mode = self.get_grouping_mode()
+        added = False
+        new_combinations = []
         
-        # Add to database coloring section if in server_db mode and db is provided
-        if mode == "server_db" and db:
-            db_key = f"{server.lower()}.{db.lower()}"
-            if not self.config.has_section("TabColoringDB"):
-                self.config.add_section("TabColoringDB")
+        with self._lock:
+            # Add to database coloring section if in server_db mode and db is provided
+            if mode == "server_db" and db:
+                db_key = f"{server.lower()}.{db.lower()}"
+                
+                # Only add if not already present
+                if db_key not in self._db_colors:
+                    self.set_setting("TabColoringDB", db_key, "0")  # Default color
+                    added = True
+                    new_combinations.append((KIND_DB, server.upper(), db.upper()))
+                    print(f"[settings] Added new database combination: {server}.{db} with default color")
+                if self.store:
+                    self._queue_store_change(KIND_DB, db_key, use=True)
             
-            # Only add if not already present
-            if not self.config.has_option("TabColoringDB", db_key):
-                self.set_setting("TabColoringDB", db_key, "0")  # Default color
-                print(f"[settings] Added new database combination: {server}.{db} with default color")
+            # Add to server coloring section if in server or server_db mode  
+            if mode in ["server", "server_db"]:
+                server_key = server.lower()
+                
+                # Only add if not already present
+                if server_key not in self._server_colors:
+                    self.set_setting("TabColoringServer", server_key, "0")  # Default color
+                    added = True
+                    new_combinations.append((KIND_SERVER, server.upper(), None))
+                    print(f"[settings] Added new server: {server} with default color")
+                if self.store:
+                    self._queue_store_change(KIND_SERVER, server_key, use=True)
         
-        # Add to server coloring section if in server or server_db mode  
-        if mode in ["server", "server_db"]:
-            server_key = server.lower()
-            if not self.config.has_section("TabColoringServer"):
-                self.config.add_section("TabColoringServer")
-            
-            # Only add if not already present
-            if not self.config.has_option("TabColoringServer", server_key):
-                self.set_setting("TabColoringServer", server_key, "0")  # Default color
-                print(f"[settings] Added new server: {server} with default color")
+        # Nothing to persist when the combination was already tracked (usage counts are batched)
+        if added or self._pending_store:
+            self.save()
         
-        self.save()
+        for kind, combo_server, combo_db in new_combinations:
+            self._notify("combination_added", kind=kind, server=combo_server, db=combo_db)
 
     def get_tracked_combinations(self):
         """Get combinations based on current grouping mode from TabColoring sections"""
@@ -241,12 +708,13 @@ class Settings:
     
     def get_grouping_mode(self):
         """Get the current grouping mode"""
-        return self.get_setting("Appearance", "GroupingMode", fallback="server_db")
+        return self._snapshot.grouping_mode
     
     def set_grouping_mode(self, mode):
         """Set the grouping mode ('server' or 'server_db')"""
         self.set_setting("Appearance", "GroupingMode", mode)
         self.save()
+        self._notify("mode_changed", mode=mode)
     
     def get_regex_pattern(self, server, db):
         """Generate regex pattern based on current grouping mode - returns single pattern for current combination"""
@@ -262,18 +730,33 @@ class Settings:
         """Generate all regex patterns for all tracked combinations"""
         mode = self.get_grouping_mode()
         patterns = []
+        combinations = []
         
         if mode == 'server':
             # Group by server only - get all configured servers from TabColoring
             servers = self.get_configured_server_combinations()
             for server in servers:
                 patterns.append(f"\\\\{server}\\\\.*(?=\\\\|$)")
+                combinations.append((server, None))
         else:  # 'server_db'
             # Group by server and database - get all configured server.db combinations from TabColoring
-            combinations = self.get_configured_db_combinations()
-            for combo in combinations:
+            combinations_list = self.get_configured_db_combinations()
+            for combo in combinations_list:
                 if '.' in combo:
                     combo_server, combo_db = combo.split('.', 1)
                     patterns.append(f"\\\\{combo_server}\\\\{combo_db}(?=\\\\|$)")
+                    combinations.append((combo_server, combo_db))
+        
+        if self.get_regex_compaction_enabled() and combinations:
+            # Fold combinations sharing a color into one line, only if it provably matches the same paths
+            key = tuple((server, db, self.get_tab_color_for_combination(server, db)) for server, db in combinations)
+            if self._compaction_cache and self._compaction_cache[0] == key:
+                return list(self._compaction_cache[1])
+            compacted = compact_patterns(combinations, self.get_tab_color_for_combination)
+            if verify_compaction(combinations, compacted):
+                self._compaction_cache = (key, compacted)
+                return list(compacted)
+            print("[settings] Compacted regex patterns failed verification, using expanded patterns")
+            self._compaction_cache = (key, patterns)
         
         return patterns
@@ -9,6 +9,9 @@ import ctypes
 import subprocess
 import tempfile
 import threading
+import time
+import queue
+import bisect
 import sys
 from version import get_version
 
@@ -61,8 +64,151 @@ class ToolTip:
         if tw:
             tw.destroy()
 
+class VirtualColorList:
+    """Scrollable list of color rows that only creates widgets for the visible rows
+
+    A fixed pool of rows is rebound to whichever combinations are scrolled into
+    view, so opening the tab costs the same with 10 or 10,000 combinations.
+    """
+    VISIBLE_ROWS = 12
+
+    def __init__(self, parent, colors, on_color_selected):
+        self.colors = colors
+        self.color_names = [name for name, _ in colors]
+        self.on_color_selected = on_color_selected
+        self.items = []  # Sorted (display_name, server, db, is_server)
+        self.filtered = []
+        self.filter_text = ""
+        self.top = 0
+
+        self.frame = tk.Frame(parent, bg=DARK_BG)
+        self.rows_frame = tk.Frame(self.frame, bg=DARK_BG)
+        self.rows_frame.pack(side="left", fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(self.frame, orient="vertical", command=self.on_scrollbar)
+        self.rows = [self.create_row(i) for i in range(self.VISIBLE_ROWS)]
+        # Only take the wheel while the pointer is over the list, other widgets keep their own scrolling
+        self.frame.bind("<Enter>", lambda e: self.frame.bind_all("<MouseWheel>", self.on_mousewheel))
+        self.frame.bind("<Leave>", self.on_leave)
+
+    def on_leave(self, event):
+        # Moving onto one of the rows also leaves the frame, keep the wheel then
+        widget = self.frame.winfo_containing(event.x_root, event.y_root)
+        if widget is None or not str(widget).startswith(str(self.frame)):
+            self.frame.unbind_all("<MouseWheel>")
+
+    def create_row(self, index):
+        """Create one reusable row of widgets"""
+        row = {"item": None}
+        row["label"] = tk.Label(self.rows_frame, bg=DARK_BG, fg=DARK_FG, 
+                                font=("Arial", 10, "bold"), width=20, anchor="w")
+        
+        row["var"] = tk.StringVar()
+        row["menu"] = tk.OptionMenu(self.rows_frame, row["var"], *self.color_names,
+                                    command=lambda value, r=row: self.on_row_color(r, value))
+        row["menu"].configure(bg=ENTRY_BG, fg=DARK_FG, relief='flat', width=15, 
+                              highlightthickness=0, bd=0, activebackground="#555555")
+        # Style the dropdown menu
+        row["menu"]['menu'].configure(bg=ENTRY_BG, fg=DARK_FG, relief='flat', bd=0, 
+                                      activebackground="#555555", activeborderwidth=0)
+        
+        # Color swatch - simple flat square using Canvas
+        row["swatch"] = tk.Canvas(self.rows_frame, width=20, height=20, bg=DARK_BG, highlightthickness=0)
+        
+        row["label"].grid(row=index, column=0, sticky="w", padx=(10, 5), pady=2)
+        row["menu"].grid(row=index, column=1, padx=5, pady=2)
+        row["swatch"].grid(row=index, column=2, padx=(5, 10), pady=2)
+        return row
+
+    def set_swatch(self, row, color_index):
+        row["swatch"].delete("all")
+        row["swatch"].create_rectangle(2, 2, 18, 18, fill=self.colors[color_index][1], outline="")
+
+    def set_items(self, items):
+        """Replace all items, items are (server, db, is_server)"""
+        self.items = sorted((server if is_server else f"{server}.{db}", server, db, is_server) 
+                            for server, db, is_server in items)
+        self.filtered = [item for item in self.items if self.filter_text in item[0].lower()]
+        # Colors may have changed too, so rebind every row
+        for row in self.rows:
+            row["item"] = None
+        self.render()
+
+    def add_item(self, server, db, is_server):
+        """Insert a single item in sorted position"""
+        item = (server if is_server else f"{server}.{db}", server, db, is_server)
+        bisect.insort(self.items, item)
+        if self.filter_text in item[0].lower():
+            bisect.insort(self.filtered, item)
+        self.render()
+
+    def apply_filter(self, text, keep_position=False):
+        """Show only items whose name contains text (case-insensitive)"""
+        text = text.strip().lower()
+        # Narrowing an existing search only needs to look at the current matches
+        source = self.filtered if self.filter_text and text.startswith(self.filter_text) else self.items
+        self.filtered = [item for item in source if text in item[0].lower()]
+        self.filter_text = text
+        if not keep_position:
+            self.top = 0
+        self.render()
+
+    def render(self):
+        """Bind the pooled rows to the items currently in view"""
+        max_top = max(0, len(self.filtered) - self.VISIBLE_ROWS)
+        self.top = min(max(0, self.top), max_top)
+        
+        for i, row in enumerate(self.rows):
+            index = self.top + i
+            if index < len(self.filtered):
+                item = self.filtered[index]
+                if row["item"] != item:
+                    row["item"] = item
+                    _, server, db, is_server = item
+                    color_index = settings.get_tab_color_for_combination(server, None if is_server else db)
+                    row["label"].configure(text=item[0])
+                    row["var"].set(self.color_names[color_index])
+                    self.set_swatch(row, color_index)
+                for widget in ("label", "menu", "swatch"):
+                    row[widget].grid()
+            else:
+                row["item"] = None
+                for widget in ("label", "menu", "swatch"):
+                    row[widget].grid_remove()
+        
+        if len(self.filtered) > self.VISIBLE_ROWS:
+            self.scrollbar.pack(side="right", fill="y")
+            total = len(self.filtered)
+            self.scrollbar.set(self.top / total, (self.top + self.VISIBLE_ROWS) / total)
+        else:
+            self.scrollbar.pack_forget()
+
+    def scroll_to(self, top):
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.filtered)))
+        elif args[0] == "scroll":
+            step = self.VISIBLE_ROWS if args[2] == "pages" else 1
+            self.scroll_to(self.top + int(args[1]) * step)
+
+    def on_mousewheel(self, event):
+        # Only scroll if scrolling is actually needed
+        if len(self.filtered) > self.VISIBLE_ROWS:
+            self.scroll_to(self.top - int(event.delta / 120) * 3)
+
+    def on_row_color(self, row, value):
+        if row["item"] is None or value not in self.color_names:
+            return
+        color_index = self.color_names.index(value)
+        self.set_swatch(row, color_index)
+        _, server, db, is_server = row["item"]
+        self.on_color_selected(server, db, is_server, color_index)
+
 class SettingsWindow:
-    def __init__(self, current_temp, current_save, on_save, initial_error=None):
+    def __init__(self, current_temp, current_save, on_save, initial_error=None, initial_tab=None):
         self.root = tk.Tk()
         self.root.title("SSMS Plus Settings")
         self.root.configure(bg=DARK_BG)
@@ -86,6 +232,7 @@ class SettingsWindow:
         self.tray_icon_var = tk.StringVar(value=settings.get_tray_icon())
         self.tray_name_var = tk.StringVar(value=settings.get_tray_name())
         self.auto_tab_coloring_var = tk.BooleanVar(value=settings.get_auto_tab_coloring_enabled())
+        self.compact_regex_var = tk.BooleanVar(value=settings.get_regex_compaction_enabled())
 
         # Create the tab system
         self.create_tab_system()
@@ -95,6 +242,15 @@ class SettingsWindow:
         
         # Create the color management tab content
         self.create_color_tab()
+        
+        # Create the saved script search tab content
+        self.create_search_tab()
+        
+        # Create the pipeline timing tab content
+        self.create_timing_tab()
+        
+        if initial_tab == "search":
+            self.notebook.select(self.search_frame)
 
         # Bind Enter key to save function
         self.root.bind('<Return>', lambda event: self.save())
@@ -115,10 +271,14 @@ class SettingsWindow:
         # Create frames for each tab
         self.settings_frame = tk.Frame(self.notebook, bg=DARK_BG)
         self.color_frame = tk.Frame(self.notebook, bg=DARK_BG)
+        self.search_frame = tk.Frame(self.notebook, bg=DARK_BG)
+        self.timing_frame = tk.Frame(self.notebook, bg=DARK_BG)
         
         # Add tabs to notebook
         self.notebook.add(self.settings_frame, text="Settings")
         self.notebook.add(self.color_frame, text="Tab Colors")
+        self.notebook.add(self.search_frame, text="Search")
+        self.notebook.add(self.timing_frame, text="Timing")
         
         # Configure notebook style
         style = ttk.Style()
@@ -248,9 +408,23 @@ class SettingsWindow:
                       activebackground=DARK_BG, activeforeground=DARK_FG,
                       command=self.on_auto_coloring_changed).pack(side="left", padx=(0, 20))
 
+        # Compact Regex
+        compact_regex_label = tk.Label(self.settings_frame, text="Compact Regex:", bg=DARK_BG, fg=DARK_FG)
+        compact_regex_label.grid(row=7, column=0, sticky="w", padx=10, pady=10)
+        ToolTip(compact_regex_label, "Write one regex line per color instead of one per server/database\nSpeeds up SSMS when you have thousands of combinations")
+        
+        compact_regex_frame = tk.Frame(self.settings_frame, bg=DARK_BG)
+        compact_regex_frame.grid(row=7, column=1, columnspan=2, sticky="w", padx=10, pady=10)
+        
+        tk.Checkbutton(compact_regex_frame, text="Group combinations with the same color", 
+                      variable=self.compact_regex_var,
+                      bg=DARK_BG, fg=DARK_FG, selectcolor=ENTRY_BG,
+                      activebackground=DARK_BG, activeforeground=DARK_FG,
+                      command=self.on_compact_regex_changed).pack(side="left", padx=(0, 20))
+
         # Buttons
         btn_frame = tk.Frame(self.settings_frame, bg=DARK_BG)
-        btn_frame.grid(row=7, column=0, columnspan=3, pady=15)
+        btn_frame.grid(row=8, column=0, columnspan=3, pady=15)
         
         btn_save = tk.Button(btn_frame, text="Save", command=self.save, bg=BTN_BG, fg=BTN_FG, 
                              relief='flat', width=10, bd=0, highlightthickness=0)
@@ -305,271 +479,297 @@ class SettingsWindow:
                                           font=("Arial", 10, "bold"))
         self.color_status_label.pack(pady=(10, 0))
         
-        # Create scrollable frame for color options
-        self.create_color_scrollable_frame()
+        # Everything below the status label is shown/hidden by populate_color_options
+        self.color_content = tk.Frame(self.color_frame, bg=DARK_BG)
+        self.color_content.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        # Section header
+        self.color_header_var = tk.StringVar()
+        self.color_header_frame = tk.Frame(self.color_content, bg=DARK_BG)
+        tk.Label(self.color_header_frame, textvariable=self.color_header_var, bg=DARK_BG, fg="white", 
+                font=("Arial", 12, "bold")).pack(anchor="w")
+        tk.Frame(self.color_header_frame, bg="white", height=2).pack(fill="x", pady=(2, 0))
+        
+        # Search box
+        self.color_search_var = tk.StringVar()
+        self.color_search_frame = tk.Frame(self.color_content, bg=DARK_BG)
+        tk.Label(self.color_search_frame, text="Search:", bg=DARK_BG, fg=DARK_FG).pack(side="left", padx=(10, 5))
+        tk.Entry(self.color_search_frame, textvariable=self.color_search_var, bg=ENTRY_BG, fg=DARK_FG, relief='flat', 
+                width=30, bd=0, highlightthickness=0).pack(side="left", padx=5)
+        self.color_search_var.trace('w', lambda *args: self.color_list.apply_filter(self.color_search_var.get()))
         
-        # Populate the color options and start auto-refresh
+        # Message shown instead of the list when there's nothing to show
+        self.color_message_label = tk.Label(self.color_content, bg=DARK_BG, fg="white", font=("Arial", 11), justify="center")
+        
+        self.color_list = VirtualColorList(self.color_content, self.COLORS, self.on_color_selected)
+        
+        # Populate the color options and listen for settings changes
         self.populate_color_options()
-        self.start_auto_refresh()
-
-    def create_color_scrollable_frame(self):
-        """Create a scrollable frame for the color options"""
-        # Container frame
-        container = tk.Frame(self.color_frame, bg=DARK_BG)
-        container.pack(fill="both", expand=True, padx=10, pady=10)
-        
-        # Create canvas and scrollbar
-        self.color_canvas = tk.Canvas(container, bg=DARK_BG, highlightthickness=0)
-        self.color_scrollbar = tk.Scrollbar(container, orient="vertical", command=self.color_canvas.yview)
-        self.color_scrollable_frame = tk.Frame(self.color_canvas, bg=DARK_BG)
-        
-        def update_color_scroll_region():
-            self.color_canvas.update_idletasks()
-            self.color_scrollable_frame.update_idletasks()
-            
-            canvas_height = self.color_canvas.winfo_height()
-            content_height = self.color_scrollable_frame.winfo_reqheight()
-            
-            if content_height <= canvas_height:
-                # Content fits, hide scrollbar and disable scrolling
-                self.color_scrollbar.pack_forget()
-                self.color_canvas.configure(scrollregion=(0, 0, 0, 0))
-                self.color_canvas.pack(side="left", fill="both", expand=True)
-            else:
-                # Content doesn't fit, show scrollbar and enable scrolling
-                self.color_canvas.pack(side="left", fill="both", expand=True)
-                self.color_scrollbar.pack(side="right", fill="y")
-                self.color_canvas.configure(scrollregion=self.color_canvas.bbox("all"))
+        self.settings_events = queue.Queue()
+        settings.add_listener(self.on_settings_event)
+        self.process_settings_events()
+
+    def create_search_tab(self):
+        """Create the saved script search tab content"""
+        self.search_results = []
+        self.search_after_id = None
         
-        self.color_scrollable_frame.bind("<Configure>", lambda e: update_color_scroll_region())
-        self.color_canvas.bind("<Configure>", lambda e: update_color_scroll_region())
+        self.search_status_var = tk.StringVar(value="Search the text of saved query files")
+        tk.Label(self.search_frame, textvariable=self.search_status_var, bg=DARK_BG, fg="#FFD700", 
+                font=("Arial", 10, "bold")).pack(pady=(10, 0))
         
-        self.color_canvas.create_window((0, 0), window=self.color_scrollable_frame, anchor="nw")
-        self.color_canvas.configure(yscrollcommand=self.color_scrollbar.set)
+        entry_frame = tk.Frame(self.search_frame, bg=DARK_BG)
+        entry_frame.pack(fill="x", padx=10, pady=10)
+        tk.Label(entry_frame, text="Search:", bg=DARK_BG, fg=DARK_FG).pack(side="left", padx=(10, 5))
+        self.script_search_var = tk.StringVar()
+        search_entry = tk.Entry(entry_frame, textvariable=self.script_search_var, bg=ENTRY_BG, fg=DARK_FG, relief='flat', 
+                               insertbackground=DARK_FG, width=50, bd=0, highlightthickness=0)
+        search_entry.pack(side="left", padx=5, fill="x", expand=True)
+        # Search as you type (debounced), Enter searches right away instead of saving settings
+        self.script_search_var.trace('w', lambda *args: self.schedule_script_search())
+        search_entry.bind('<Return>', lambda event: (self.run_script_search(), "break")[1])
         
-        # Initially pack canvas (scrollbar will be shown/hidden as needed)
-        self.color_canvas.pack(side="left", fill="both", expand=True)
+        list_frame = tk.Frame(self.search_frame, bg=DARK_BG)
+        list_frame.pack(fill="both", expand=True, padx=10)
+        scrollbar = tk.Scrollbar(list_frame, orient="vertical")
+        self.search_listbox = tk.Listbox(list_frame, bg=ENTRY_BG, fg=DARK_FG, selectbackground=BTN_BG, relief='flat', 
+                                         bd=0, highlightthickness=0, width=90, height=14, font=("Consolas", 9),
+                                         yscrollcommand=scrollbar.set)
+        scrollbar.config(command=self.search_listbox.yview)
+        self.search_listbox.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        self.search_listbox.bind('<<ListboxSelect>>', lambda event: self.show_search_snippet())
+        self.search_listbox.bind('<Double-Button-1>', lambda event: self.open_search_result())
         
-        # Bind mousewheel to canvas
-        def _on_color_mousewheel(event):
-            # Only scroll if scrolling is actually needed
-            canvas_height = self.color_canvas.winfo_height()
-            content_height = self.color_scrollable_frame.winfo_reqheight()
-            if content_height > canvas_height:
-                self.color_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-        self.color_canvas.bind_all("<MouseWheel>", _on_color_mousewheel)
+        self.search_snippet_var = tk.StringVar(value="Double-click a result to open it")
+        tk.Label(self.search_frame, textvariable=self.search_snippet_var, bg=DARK_BG, fg=DARK_FG, justify="left", 
+                anchor="w", wraplength=640, font=("Consolas", 9)).pack(fill="x", padx=10, pady=10)
+
+    def schedule_script_search(self):
+        """Run the search shortly after typing stops"""
+        if self.search_after_id:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(200, self.run_script_search)
+
+    def run_script_search(self):
+        """Query the search index and fill the results list"""
+        from search_index import search_index
+        self.search_after_id = None
+        text = self.script_search_var.get()
+        try:
+            start = time.perf_counter()
+            self.search_results = search_index.search(text)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            self.search_results = []
+            self.search_status_var.set(f"Search failed: {e}")
+            return
+        
+        self.search_listbox.delete(0, tk.END)
+        for path, server, db, modified, snippet in self.search_results:
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(modified)) if modified else ""
+            self.search_listbox.insert(tk.END, f"{when}  {server}.{db}  {os.path.basename(path)}")
+        if text.strip():
+            self.search_status_var.set(f"{len(self.search_results)} results in {elapsed_ms:.0f} ms")
+        else:
+            self.search_status_var.set("Search the text of saved query files")
+        self.search_snippet_var.set("Double-click a result to open it")
+
+    def selected_search_result(self):
+        selection = self.search_listbox.curselection()
+        if not selection or selection[0] >= len(self.search_results):
+            return None
+        return self.search_results[selection[0]]
+
+    def show_search_snippet(self):
+        result = self.selected_search_result()
+        if result:
+            self.search_snippet_var.set(f"{result[0]}\n{' '.join(result[4].split())}")
+
+    def open_search_result(self):
+        """Open the selected script (archived scripts are extracted to a temp folder first)"""
+        from search_index import ARCHIVE_SEP
+        result = self.selected_search_result()
+        if not result:
+            return
+        path = result[0]
+        try:
+            if ARCHIVE_SEP in path and path.split(ARCHIVE_SEP, 1)[0].endswith(".zip"):
+                import zipfile
+                from dedup_catalog import dedup_catalog
+                zip_path, name = path.split(ARCHIVE_SEP, 1)
+                # Archived duplicates are only catalog references, their content is in another zip
+                blob_zip, blob_name = dedup_catalog.resolve(zip_path, name)
+                folder = os.path.join(tempfile.gettempdir(), "ssmsplus_search")
+                os.makedirs(folder, exist_ok=True)
+                path = os.path.join(folder, os.path.basename(name))
+                with zipfile.ZipFile(blob_zip) as zf, open(path, "wb") as f:
+                    f.write(zf.read(blob_name))
+            os.startfile(path)
+        except Exception as e:
+            self.search_status_var.set(f"Could not open {os.path.basename(path)}: {e}")
+
+    def create_timing_tab(self):
+        """Create the save pipeline timing tab content"""
+        tk.Label(self.timing_frame, text="Time spent per save pipeline stage (ms)", bg=DARK_BG, fg="#FFD700", 
+                font=("Arial", 10, "bold")).pack(pady=(10, 0))
+        
+        self.timing_text_var = tk.StringVar()
+        tk.Label(self.timing_frame, textvariable=self.timing_text_var, bg=ENTRY_BG, fg=DARK_FG, justify="left", 
+                anchor="nw", font=("Consolas", 9), padx=10, pady=10).pack(fill="both", expand=True, padx=10, pady=10)
+        
+        button_frame = tk.Frame(self.timing_frame, bg=DARK_BG)
+        button_frame.pack(pady=(0, 10))
+        for text, command in (("Refresh", self.refresh_timing_tab), ("Reset", self.reset_timing)):
+            tk.Button(button_frame, text=text, command=command, bg=BTN_BG, fg=BTN_FG, 
+                     relief='flat', width=10, bd=0, highlightthickness=0).pack(side="left", padx=5)
+        
+        self.refresh_timing_tab()
+        # Refresh whenever the tab is opened
+        self.notebook.bind('<<NotebookTabChanged>>', lambda event: self.refresh_timing_tab()
+                           if self.notebook.select() == str(self.timing_frame) else None, add='+')
+
+    def refresh_timing_tab(self):
+        from metrics import metrics
+        if metrics.summary():
+            self.timing_text_var.set(metrics.format_table())
+        else:
+            self.timing_text_var.set("No files have been processed yet.")
+
+    def reset_timing(self):
+        from metrics import metrics
+        metrics.reset()
+        self.refresh_timing_tab()
 
     def refresh_color_tab(self):
         """Refresh the color tab content"""
-        # Clear existing content
-        for widget in self.color_scrollable_frame.winfo_children():
-            widget.destroy()
-        
-        # Repopulate the color options
         self.populate_color_options()
 
-    def start_auto_refresh(self):
-        """Start the automatic refresh timer"""
-        self.check_for_new_combinations()
-        # Check every 3 seconds for new combinations
-        self.root.after(3000, self.start_auto_refresh)
+    def on_settings_event(self, event, data):
+        """Settings listener - may run on any thread, so just hand the event to the Tk thread"""
+        self.settings_events.put((event, data))
 
-    def check_for_new_combinations(self):
-        """Check if new server/database combinations have been discovered"""
+    def process_settings_events(self):
+        """Apply queued settings events on the Tk thread"""
         try:
-            grouping_mode = settings.get_grouping_mode()
             needs_refresh = False
-            
-            if grouping_mode == "server":
-                current_servers = set(settings.get_configured_server_combinations())
-                if current_servers != self.last_known_servers:
-                    needs_refresh = True
-                    self.last_known_servers = current_servers
-                    
-            elif grouping_mode == "server_db":
-                current_combinations = set(settings.get_configured_db_combinations())
-                if current_combinations != self.last_known_combinations:
+            new_rows = []
+            while True:
+                try:
+                    event, data = self.settings_events.get_nowait()
+                except queue.Empty:
+                    break
+                
+                if event == "combination_added":
+                    new_rows.append(data)
+                elif event == "reloaded" and data.get("mode_changed"):
+                    # Another process switched the grouping mode
+                    self.grouping_mode_var.set(settings.get_grouping_mode())
                     needs_refresh = True
-                    self.last_known_combinations = current_combinations
             
             if needs_refresh:
                 self.refresh_color_tab()
-                # Brief visual feedback for auto-refresh
-                self.flash_color_status("New servers/databases detected!", "#00AAFF")
+            elif new_rows:
+                self.add_new_color_rows(new_rows)
                 
         except Exception as e:
             # Silently handle any errors during auto-refresh
             pass
+        
+        if self.root.winfo_exists():
+            self.root.after(250, self.process_settings_events)
 
-    def populate_color_options(self):
-        """Populate the scrollable frame with color options"""
-        row = 0
+    def add_new_color_rows(self, new_rows):
+        """Insert rows for newly discovered combinations without rebuilding the others"""
+        grouping_mode = settings.get_grouping_mode()
+        kind = "server" if grouping_mode == "server" else "db"
+        added = 0
         
-        # Only show color options if auto coloring is enabled
-        if settings.get_auto_tab_coloring_enabled():
-            grouping_mode = settings.get_grouping_mode()
+        for data in new_rows:
+            if data["kind"] != kind or not settings.get_auto_tab_coloring_enabled():
+                continue
+            if kind == "server":
+                key = data["server"]
+                if key in self.last_known_servers:
+                    continue
+                self.last_known_servers.add(key)
+            else:
+                key = f"{data['server']}.{data['db']}"
+                if key in self.last_known_combinations:
+                    continue
+                self.last_known_combinations.add(key)
             
-            # Server coloring section (only show in "server" mode)
-            if grouping_mode == "server" and settings.get_tab_coloring_server_enabled():
-                # Section header
-                header_frame = tk.Frame(self.color_scrollable_frame, bg=DARK_BG)
-                header_frame.grid(row=row, column=0, columnspan=3, sticky="ew", padx=10, pady=(10, 5))
-                
-                tk.Label(header_frame, text="Server Colors", bg=DARK_BG, fg="white", 
-                        font=("Arial", 12, "bold")).pack(anchor="w")
-                
-                tk.Frame(header_frame, bg="white", height=2).pack(fill="x", pady=(2, 0))
-                row += 1
-                
-                # Get all known servers and update tracking
-                servers = settings.get_configured_server_combinations()
-                self.last_known_servers = set(servers)
-                for server in servers:
-                    self.create_color_row(row, server, None, is_server=True)
-                    row += 1
+            if self.color_rows_placeholder:
+                # First combination replaces the "nothing found yet" message
+                self.refresh_color_tab()
+                self.flash_color_status("New servers/databases detected!", "#00AAFF")
+                return
             
-            # Database coloring section (only show in "server_db" mode)
-            if grouping_mode == "server_db" and settings.get_tab_coloring_db_enabled():
-                # Section header
-                header_frame = tk.Frame(self.color_scrollable_frame, bg=DARK_BG)
-                header_frame.grid(row=row, column=0, columnspan=3, sticky="ew", padx=10, pady=(10, 5))
-                
-                tk.Label(header_frame, text="Server + Database Colors", bg=DARK_BG, fg="white", 
-                        font=("Arial", 12, "bold")).pack(anchor="w")
-                
-                tk.Frame(header_frame, bg="white", height=2).pack(fill="x", pady=(2, 0))
-                row += 1
-                
-                # Get all known server.database combinations and update tracking
-                combinations = settings.get_configured_db_combinations()
-                self.last_known_combinations = set(combinations)
-                for combo in combinations:
-                    if '.' in combo:
-                        server, db = combo.split('.', 1)
-                        self.create_color_row(row, server, db, is_server=False)
-                        row += 1
+            self.color_list.add_item(data["server"], data["db"], kind == "server")
+            added += 1
+        
+        if added:
+            # Brief visual feedback for auto-refresh
+            self.flash_color_status("New servers/databases detected!", "#00AAFF")
+
+    def populate_color_options(self):
+        """Fill the color list with the combinations for the current grouping mode"""
+        self.color_rows_placeholder = False
+        for widget in (self.color_header_frame, self.color_search_frame, self.color_message_label, self.color_list.frame):
+            widget.pack_forget()
         
         # If auto coloring is disabled
         if not settings.get_auto_tab_coloring_enabled():
-            tk.Label(self.color_scrollable_frame, text="Auto tab coloring is disabled.\nEnable it in the Settings tab to manage colors.", 
-                    bg=DARK_BG, fg="#FF5555", font=("Arial", 11), justify="center").grid(row=0, column=0, pady=50)
-        # If auto coloring is enabled but no servers/databases exist yet
-        else:
-            grouping_mode = settings.get_grouping_mode()
-            has_content = False
-            
-            if grouping_mode == "server" and settings.get_configured_server_combinations():
-                has_content = True
-            elif grouping_mode == "server_db" and settings.get_configured_db_combinations():
-                has_content = True
-            
-            if not has_content:
-                if grouping_mode == "server":
-                    message = "No servers found yet.\nOpen a document in SSMS to see servers here."
-                else:  # server_db
-                    message = "No server + database combinations found yet.\nOpen a document in SSMS to see combinations here."
-                
-                tk.Label(self.color_scrollable_frame, text=message, 
-                        bg=DARK_BG, fg="white", font=("Arial", 11), justify="center").grid(row=0, column=0, pady=50)
-        
-        # Update scroll region after content is populated
-        self.root.after(100, self.update_color_scroll_region)
-    
-    def update_color_scroll_region(self):
-        """Update the scroll region and check if scrolling is needed"""
-        self.color_canvas.update_idletasks()
-        self.color_scrollable_frame.update_idletasks()
-        
-        canvas_height = self.color_canvas.winfo_height()
-        content_height = self.color_scrollable_frame.winfo_reqheight()
-        
-        if content_height <= canvas_height:
-            # Content fits, hide scrollbar and disable scrolling
-            self.color_scrollbar.pack_forget()
-            self.color_canvas.configure(scrollregion=(0, 0, 0, 0))
-            self.color_canvas.pack(side="left", fill="both", expand=True)
-        else:
-            # Content doesn't fit, show scrollbar and enable scrolling
-            self.color_canvas.pack(side="left", fill="both", expand=True)
-            self.color_scrollbar.pack(side="right", fill="y")
-            self.color_canvas.configure(scrollregion=self.color_canvas.bbox("all"))
-            
-    def create_color_row(self, row, server, db, is_server):
-        """Create a row with server/db name and color dropdown"""
-        # Display name
-        if is_server:
-            display_name = server
-            current_color = settings.get_tab_color_for_combination(server)
-        else:
-            display_name = f"{server}.{db}"
-            current_color = settings.get_tab_color_for_combination(server, db)
-        
-        # Name label
-        name_label = tk.Label(self.color_scrollable_frame, text=display_name, bg=DARK_BG, fg=DARK_FG, 
-                             font=("Arial", 10, "bold"), width=20, anchor="w")
-        name_label.grid(row=row, column=0, sticky="w", padx=(10, 5), pady=2)
-        
-        # Color dropdown
-        color_var = tk.StringVar()
-        color_combo = tk.OptionMenu(self.color_scrollable_frame, color_var, *[name for _, (name, _) in enumerate(self.COLORS)])
-        color_combo.configure(bg=ENTRY_BG, fg=DARK_FG, relief='flat', width=15, 
-                             highlightthickness=0, bd=0, activebackground="#555555")
-        # Style the dropdown menu
-        color_combo['menu'].configure(bg=ENTRY_BG, fg=DARK_FG, relief='flat', bd=0, 
-                                    activebackground="#555555", activeborderwidth=0)
-        color_combo.grid(row=row, column=1, padx=5, pady=2)
-        
-        # Set current value
-        color_var.set(self.COLORS[current_color][0])
-        
-        # Color swatch - rounded square using Canvas
-        swatch_canvas = tk.Canvas(self.color_scrollable_frame, width=20, height=20, bg=DARK_BG, highlightthickness=0)
-        swatch_canvas.grid(row=row, column=2, padx=(5, 10), pady=2)
-        
-        # Create simple flat rectangle
-        def create_swatch(canvas, x1, y1, x2, y2, fill):
-            canvas.delete("all")  # Clear previous content
-            # Simple flat rectangle with sharp corners
-            canvas.create_rectangle(x1, y1, x2, y2, fill=fill, outline="")
+            self.color_message_label.configure(text="Auto tab coloring is disabled.\nEnable it in the Settings tab to manage colors.", fg="#FF5555")
+            self.color_message_label.pack(pady=50)
+            return
         
-        # Initial color
-        create_swatch(swatch_canvas, 2, 2, 18, 18, self.COLORS[current_color][1])
+        grouping_mode = settings.get_grouping_mode()
+        if grouping_mode == "server":
+            # Get all known servers and update tracking
+            servers = settings.get_configured_server_combinations()
+            self.last_known_servers = set(servers)
+            items = [(server, None, True) for server in servers]
+            self.color_header_var.set("Server Colors")
+            message = "No servers found yet.\nOpen a document in SSMS to see servers here."
+        else:  # server_db
+            # Get all known server.database combinations and update tracking
+            combinations = settings.get_configured_db_combinations()
+            self.last_known_combinations = set(combinations)
+            items = [tuple(combo.split('.', 1)) + (False,) for combo in combinations if '.' in combo]
+            self.color_header_var.set("Server + Database Colors")
+            message = "No server + database combinations found yet.\nOpen a document in SSMS to see combinations here."
         
-        # Bind color change
-        def on_color_change(value, s=server, d=db, is_srv=is_server, swatch=swatch_canvas):
-            try:
-                # Find the color index by name
-                color_index = None
-                for i, (name, _) in enumerate(self.COLORS):
-                    if name == value:
-                        color_index = i
-                        break
-                
-                if color_index is None:
-                    return
-                    
-                color_hex = self.COLORS[color_index][1]
-                
-                # Update swatch using the swatch function
-                create_swatch(swatch, 2, 2, 18, 18, color_hex)
-                
-                # Save to settings
-                if is_srv:
-                    settings.set_tab_color_for_server(s, color_index)
-                    # Forget this server from applied colors so it gets colored on next save
-                    state.forget_tab_color_applied(s)
-                else:
-                    settings.set_tab_color_for_database(s, d, color_index)
-                    # Forget this server/db combination from applied colors so it gets colored on next save
-                    state.forget_tab_color_applied(s, d)
-                
-                # Show success message
-                self.flash_color_status("Color saved!", "#00FF99")
-                
-            except Exception as e:
-                self.flash_color_status("Error saving color!", "#FF5555")
+        # If auto coloring is enabled but no servers/databases exist yet
+        if not items:
+            self.color_message_label.configure(text=message, fg="white")
+            self.color_message_label.pack(pady=50)
+            self.color_rows_placeholder = True
+            return
         
-        color_var.trace('w', lambda *args, val=color_var: on_color_change(val.get()))
+        self.color_header_frame.pack(fill="x", padx=10, pady=(10, 5))
+        self.color_search_frame.pack(fill="x", pady=(0, 5))
+        self.color_list.frame.pack(fill="both", expand=True)
+        self.color_list.set_items(items)
+
+    def on_color_selected(self, server, db, is_server, color_index):
+        """Save a color picked in the color list"""
+        try:
+            # Save to settings
+            if is_server:
+                settings.set_tab_color_for_server(server, color_index)
+                # Forget this server from applied colors so it gets colored on next save
+                state.forget_tab_color_applied(server)
+            else:
+                settings.set_tab_color_for_database(server, db, color_index)
+                # Forget this server/db combination from applied colors so it gets colored on next save
+                state.forget_tab_color_applied(server, db)
+            
+            # Show success message
+            self.flash_color_status("Color saved!", "#00FF99")
+            
+        except Exception as e:
+            self.flash_color_status("Error saving color!", "#FF5555")
         
     def flash_color_status(self, message, color):
         """Flash a status message in the color tab"""
@@ -606,6 +806,13 @@ class SettingsWindow:
         # Refresh the color tab content when auto coloring is toggled
         self.refresh_color_tab()
     
+    def on_compact_regex_changed(self):
+        """Handle compact regex checkbox changes - save immediately"""
+        settings.set_regex_compaction_enabled(self.compact_regex_var.get())
+        # Rewrite the regex files in the new format
+        regenerate_all_regex_patterns()
+        self.show_saved_message()
+    
     def on_tray_icon_changed(self):
         """Handle tray icon changes - save immediately"""
         settings.set_tray_icon(self.tray_icon_var.get())
@@ -882,15 +1089,10 @@ class SettingsWindow:
             if hasattr(state, 'current_tray_app') and state.current_tray_app:
                 # Force quit the tray app properly
                 try:
-                    print("Stopping watchers...")
-                    # Stop any watchers first
-                    if hasattr(state, 'current_watcher_observer') and state.current_watcher_observer:
-                        state.current_watcher_observer.stop()
-                        state.current_watcher_observer = None
-                    
-                    print("Stopping tray icon...")
-                    # Quit the tray app's main loop
-                    state.current_tray_app.icon.stop()
+                    print("Stopping tray icon and watchers...")
+                    # Same shutdown as Exit from the tray (main.on_exit): stops the watchers and
+                    # writes settings, learned timings, metrics and the journal, which os._exit would skip
+                    state.current_tray_app.exit_app()
                     
                     # Schedule immediate exit
                     import threading
@@ -908,6 +1110,14 @@ class SettingsWindow:
                     os._exit(0)
             else:
                 print("No tray app found, direct exit...")
+                # os._exit skips the atexit handlers, write what main.on_exit would
+                from adaptive_timing import adaptive_timing
+                from metrics import metrics
+                from journal import journal
+                adaptive_timing.save()
+                settings.flush()
+                metrics.save()
+                journal.close()
                 # Fallback to direct exit
                 os._exit(0)
                 
@@ -947,4 +1157,7 @@ class SettingsWindow:
             pass
 
     def show(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            settings.remove_listener(self.on_settings_event)
@@ -0,0 +1,199 @@
+"""Scripted SSMS stand-in implementing the platform backend, for running the pipeline on Linux."""
+
+import os
+import random
+import string
+import threading
+import time
+from window_snapshot import PlatformBackend, WindowInfo, SSMS_TITLE
+
+MAIN_HANDLE = 1
+DIALOG_HANDLE = 2
+DIALOG_TITLE = "Save File As"
+COLOR_COUNT = 17  # "None" plus the 16 tab colors, the menu wraps around
+
+class SsmsSimulator(PlatformBackend):
+    """Emulates the parts of SSMS the pipeline watches and drives
+
+    - open_query() writes a new "xxxxxxxx..sql" temp file and shows a bare
+      "Microsoft SQL Server Management Studio" (loading) title for
+      loading_time seconds, then the new query's title.
+    - Ctrl+S on an unsaved query opens the Save File As dialog after
+      dialog_delay seconds (ignored while loading, like a real SSMS that is
+      still busy). Typed text goes into the dialog, Enter writes the file.
+    - Alt+W, S opens the tab color menu; the first up/right lands on the top
+      entry, then up/down move through the 17 entries (wrapping) and Enter
+      picks one.
+
+    Everything is computed from the clock when it's read, so there are no
+    background threads.
+    """
+
+    def __init__(self, temp_dir, loading_time=0.2, dialog_delay=0.05, user="sa", caps_lock=False, clock=time.monotonic):
+        self.temp_dir = temp_dir
+        self.loading_time = loading_time
+        self.dialog_delay = dialog_delay
+        self.user = user
+        self.caps_lock = caps_lock
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.tabs = []
+        self.active = None
+        self.loading_until = 0.0
+        self.dialog = None  # {"opens_at": time, "text": typed so far}
+        self.color_menu = None  # Highlighted entry in the tab color menu
+        self.menu_stage = None  # "window" after Alt+W, "color" once the color menu is open
+        self.held = set()
+        self.held_vks = set()  # Virtual keys reported as physically held (a user typing)
+        self.key_delay = 0.0
+        self.stats = {"queries": 0, "saves": 0, "colors": 0, "keys": 0, "ignored_saves": 0}
+
+    # Scripting
+    def open_query(self, server, db, content="SELECT 1\n"):
+        """Open a new query tab like Ctrl+N, returning the temp file path SSMS created"""
+        with self.lock:
+            name = "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
+            temp_path = os.path.join(self.temp_dir, f"{name}..sql")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            self.stats["queries"] += 1
+            tab = {
+                "number": self.stats["queries"],
+                "server": server,
+                "db": db,
+                "spid": 50 + self.stats["queries"],
+                "temp_path": temp_path,
+                "saved_path": None,
+                "color": None,
+            }
+            self.tabs.append(tab)
+            self.active = tab
+            self.loading_until = self.clock() + self.loading_time
+            return temp_path
+
+    def get_tab(self, temp_path):
+        with self.lock:
+            for tab in self.tabs:
+                if tab["temp_path"] == temp_path:
+                    return dict(tab)
+        return None
+
+    def _loading(self):
+        return self.clock() < self.loading_until
+
+    def _dialog_visible(self):
+        return self.dialog is not None and self.clock() >= self.dialog["opens_at"]
+
+    def _main_title(self):
+        tab = self.active
+        if not tab or self._loading():
+            return SSMS_TITLE
+        connection = f"{tab['server']}.{tab['db']} ({self.user} ({tab['spid']}))"
+        if tab["saved_path"]:
+            name = os.path.basename(tab["saved_path"])
+            return f"{name} - {connection} - {SSMS_TITLE}"
+        # A new query shows its name and connection twice
+        name = f"SQLQuery{tab['number']}.sql"
+        return f"{name} - {connection}* - {name} - {connection}* - {SSMS_TITLE}"
+
+    # PlatformBackend
+    def get_all_windows(self):
+        with self.lock:
+            windows = [WindowInfo(MAIN_HANDLE, self._main_title(), None)]
+            if self._dialog_visible():
+                windows.append(WindowInfo(DIALOG_HANDLE, DIALOG_TITLE, None))
+            return windows
+
+    def get_active_window(self):
+        with self.lock:
+            if self._dialog_visible():
+                return WindowInfo(DIALOG_HANDLE, DIALOG_TITLE, None)
+            return WindowInfo(MAIN_HANDLE, self._main_title(), None)
+
+    def key_down(self, key):
+        with self.lock:
+            self.held.add(key)
+            self.stats["keys"] += 1
+
+    def key_up(self, key):
+        with self.lock:
+            self.held.discard(key)
+
+    def hotkey(self, *keys):
+        with self.lock:
+            if keys == ("alt", "w"):
+                self.stats["keys"] += 2
+                self.menu_stage = "window"
+                return
+            super().hotkey(*keys)
+
+    def press(self, key):
+        with self.lock:
+            self.stats["keys"] += 1
+            if "ctrl" in self.held and key == "s":
+                self._save()
+            elif self.menu_stage == "window" and key == "s":
+                self.menu_stage = "color"
+                self.color_menu = None
+            elif self.menu_stage == "color" and self.color_menu is None and key in ("up", "right"):
+                # First key into the color grid lands on the top entry ("None")
+                self.color_menu = 0
+            elif self.color_menu is not None and key in ("up", "down"):
+                step = -1 if key == "up" else 1
+                self.color_menu = (self.color_menu + step) % COLOR_COUNT
+            elif key == "enter":
+                self._enter()
+
+    def write(self, text):
+        with self.lock:
+            self.stats["keys"] += len(text)
+            if not self._dialog_visible():
+                return
+            if self.caps_lock:
+                text = text.swapcase()
+            self.dialog["text"] += text
+
+    def is_key_pressed(self, vk):
+        return vk in self.held_vks
+
+    def is_caps_lock_on(self):
+        return self.caps_lock
+
+    def set_key_delay(self, seconds):
+        previous, self.key_delay = self.key_delay, seconds
+        return previous
+
+    # Key handling
+    def _save(self):
+        tab = self.active
+        if not tab:
+            return
+        if self._loading():
+            self.stats["ignored_saves"] += 1
+            return
+        if tab["saved_path"]:
+            return  # Plain save, no dialog
+        self.dialog = {"opens_at": self.clock() + self.dialog_delay, "text": ""}
+
+    def _enter(self):
+        if self._dialog_visible():
+            # The app types Windows paths, map them back when running elsewhere
+            path = self.dialog["text"].replace("\\", os.sep)
+            self.dialog = None
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(self.active["temp_path"], "r", encoding="utf-8") as f:
+                content = f.read()
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            self.active["saved_path"] = path
+            self.stats["saves"] += 1
+        elif self.color_menu is not None:
+            if self.active:
+                self.active["color"] = self.color_menu
+            self.color_menu = None
+            self.menu_stage = None
+            self.stats["colors"] += 1
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
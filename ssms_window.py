@@ -1,21 +1,22 @@
 """SSMS window parsing/interacting functions."""
-import pyautogui
-import ctypes
-import pygetwindow
 import os
 import time
 from file_manager import FileManager
 from regex_writer import write_to_regex_file
 from state import settings, state
+from window_snapshot import window_snapshots
+from config_index import config_index
+from journal import journal
+from metrics import metrics
+from adaptive_timing import adaptive_timing
+import tab_color_engine
 
 class SsmsWindow:
     
     @staticmethod
     def is_caps_lock_on():
         """Check if Caps Lock is currently enabled"""
-        # GetKeyState for VK_CAPITAL (0x14) returns 1 if Caps Lock is on, 0 if off
-        VK_CAPITAL = 0x14
-        return ctypes.windll.user32.GetKeyState(VK_CAPITAL) & 1 == 1
+        return window_snapshots.get_backend().is_caps_lock_on()
     
     @staticmethod
     def write_text_handling_caps_lock(text):
@@ -34,34 +35,34 @@ class SsmsWindow:
                 else:
                     inverted_text += char
             print(f"[ssms_window.write_text_handling_caps_lock] Caps Lock ON - inverting text: '{text}' -> '{inverted_text}'")
-            pyautogui.write(inverted_text, interval=0)
+            window_snapshots.get_backend().write(inverted_text)
         else:
             print(f"[ssms_window.write_text_handling_caps_lock] Caps Lock OFF - writing text normally: '{text}'")
-            pyautogui.write(text, interval=0)
+            window_snapshots.get_backend().write(text)
     
     @staticmethod
+    @metrics.timed()
     def wait_for_query(timeout=10):
         """Wait for SSMS loading state to disappear and query window to be ready"""
         print("[ssms_window.wait_for_query] Waiting for loading state to disappear...")
-        end = time.time() + timeout
+        poll = adaptive_timing.start("wait_for_query", timeout, min_interval=window_snapshots.ttl)
         
         # Monitor for window title changes
-        while time.time() < end:
+        while not poll.expired():
             try:
-                # Get ALL windows containing "Microsoft SQL Server Management Studio"
-                all_windows = pygetwindow.getAllWindows()
-                ssms_windows = [w for w in all_windows if w.title and "Microsoft SQL Server Management Studio" in w.title]
+                # Get the shared snapshot of SSMS windows
+                snapshot = window_snapshots.get_snapshot()
                 
                 # Check if any window is still in loading state
-                loading_windows = [w for w in ssms_windows if w.title.strip() == "Microsoft SQL Server Management Studio"]
+                loading_windows = snapshot.loading_windows
                 
                 if loading_windows:
                     print(f"[ssms_window.wait_for_query] Still loading... ({len(loading_windows)} loading windows)")
-                    time.sleep(0.1)
+                    poll.sleep()
                     continue
                 
                 # Look for SQLQuery windows and check if they show the saved file pattern
-                sqlquery_windows = [w for w in ssms_windows if "SQLQuery" in w.title and " - " in w.title]
+                sqlquery_windows = snapshot.sqlquery_windows
                 
                 if sqlquery_windows:
                     for window in sqlquery_windows:
@@ -79,6 +80,7 @@ class SsmsWindow:
                                 
                                 if first_part == third_part and first_part.startswith("SQLQuery") and first_part.endswith(".sql"):
                                     print(f"[ssms_window.wait_for_query] Ready! Saved file pattern detected: {title}")
+                                    poll.succeeded()
                                     return True
                         
                         # Also check for the temp file pattern (old behavior as fallback)
@@ -91,12 +93,13 @@ class SsmsWindow:
                                     print(f"[ssms_window.wait_for_query] Temp file pattern still showing: {title}")
                                     # Continue waiting for the saved pattern
                 
-                time.sleep(0.1)
+                poll.sleep()
                 
             except Exception as e:
                 print(f"[ssms_window.wait_for_query] Error checking windows: {e}")
-                time.sleep(0.1)
+                poll.sleep()
         
+        poll.timed_out()
         print("[ssms_window.wait_for_query] Timeout waiting for saved file pattern")
         return False
     
@@ -105,44 +108,62 @@ class SsmsWindow:
         """Set the tab color in SSMS using keyboard shortcuts"""
         print(f"[ssms_window.set_tab_color] Setting tab color to index {color_index}")
         
+        backend = window_snapshots.get_backend()
+        # Speed up key input by reducing delays
+        original_pause = backend.set_key_delay(0.01)  # Reduce from default 0.1 to 0.01
+        
         try:
-            # Speed up pyautogui by reducing delays
-            original_pause = pyautogui.PAUSE
-            pyautogui.PAUSE = 0.01  # Reduce from default 0.1 to 0.01
-            
-            pyautogui.hotkey('alt', 'w')
-            pyautogui.press('s')
-            pyautogui.press('up')  # Go to top of color list
-            pyautogui.press('right')  # Move to color grid
+            backend.hotkey('alt', 'w')
+            backend.press('s')
+            backend.press('up')  # Go to top of color list
+            backend.press('right')  # Move to color grid
             
             # Optimize navigation: if color_index > 8, use up arrows instead of down
             if color_index <= 8:
                 # For indices 0-8, just press down
                 for i in range(color_index):
-                    pyautogui.press('down')
+                    backend.press('down')
                 print(f"[ssms_window.set_tab_color] Navigated down {color_index} times")
             else:
                 # For indices 9-16, press up from the bottom (17 total colors: 0-16)
                 # Going up from 0 wraps to 16, so up_presses = 17 - color_index
                 up_presses = 17 - color_index
                 for i in range(up_presses):
-                    pyautogui.press('up')
+                    backend.press('up')
                 print(f"[ssms_window.set_tab_color] Navigated up {up_presses} times to reach index {color_index}")
                         
-            pyautogui.press('enter')
+            backend.press('enter')
             print(f"[ssms_window.set_tab_color] Tab color set successfully")
             
-            # Restore original pause setting
-            pyautogui.PAUSE = original_pause
-            
         except Exception as e:
-            # Make sure to restore pause setting even if there's an error
-            pyautogui.PAUSE = original_pause
             print(f"[ssms_window.set_tab_color] Error setting tab color: {e}")
+        finally:
+            # Restore original pause setting
+            backend.set_key_delay(original_pause)
     
     @staticmethod
-    def apply_tab_color(server, db):
-        """Apply tab color based on settings for the given server/db combination"""
+    def set_tab_color_from_file(color_index, server, db, target_path=None):
+        """Set the tab color by editing SSMS's customized-groupid-color-*.json
+
+        Returns:
+            bool: True if the color was written, False if keyboard automation is needed
+        """
+        FileManager.get_ssms_temp()
+        if not state.regex_path or not state.color_path:
+            print(f"[ssms_window.set_tab_color_from_file] No color JSON file yet, using keyboard automation")
+            return False
+        if not target_path:
+            target_path = os.path.join(state.save_dir or "", server, db, 'temp', 'SQLQuery.sql').replace('/', '\\')
+        return tab_color_engine.apply_color(state.regex_path, state.color_path, target_path, color_index)
+
+    @staticmethod
+    @metrics.timed()
+    def apply_tab_color(server, db, target_path=None, in_regex_files=None):
+        """Apply tab color based on settings for the given server/db combination
+
+        in_regex_files is the result of is_combination_in_actual_regex_files when
+        the caller already has it, so the check isn't run (and timed) twice.
+        """
         try:
             # Check if tab coloring is enabled
             if not settings.get_tab_coloring_enabled():
@@ -150,7 +171,9 @@ class SsmsWindow:
                 return
             
             # Check if the ColorByRegexConfig.txt file exists (this also clears state if missing)
-            if not SsmsWindow.is_combination_in_actual_regex_files(server, db):
+            if in_regex_files is None:
+                in_regex_files = SsmsWindow.is_combination_in_actual_regex_files(server, db)
+            if not in_regex_files:
                 print(f"[ssms_window.apply_tab_color] Regex file missing or combination not found, skipping color application")
                 return
             
@@ -163,8 +186,9 @@ class SsmsWindow:
             color_index = settings.get_tab_color_for_combination(server, db)
             print(f"[ssms_window.apply_tab_color] Applying color index {color_index} for {server}.{db}")
             
-            # Apply the color
-            SsmsWindow.set_tab_color(color_index, server, db)
+            # Apply the color, through the color JSON when possible
+            if settings.get_tab_color_method() != "file" or not SsmsWindow.set_tab_color_from_file(color_index, server, db, target_path):
+                SsmsWindow.set_tab_color(color_index, server, db)
             
             # Mark this combination as having had its color applied
             state.mark_tab_color_applied(server, db)
@@ -173,6 +197,7 @@ class SsmsWindow:
             print(f"[ssms_window.apply_tab_color] Error applying tab color: {e}")
     
     @staticmethod
+    @metrics.timed()
     def is_combination_in_actual_regex_files(server, db):
         """Check if the ColorByRegexConfig.txt file exists and clear state if no color JSON files exist"""
         try:
@@ -183,33 +208,23 @@ class SsmsWindow:
                 print(f"[ssms_window.is_combination_in_actual_regex_files] No temp directory configured")
                 return False
             
-            from pathlib import Path
-            temp_dir = Path(temp_dir_str)
-            
-            # Look for ColorByRegexConfig.txt files recursively (they're in GUID subfolders)
-            config_files = list(temp_dir.rglob("ColorByRegexConfig.txt"))
+            # Look up the most recent ColorByRegexConfig.txt (they're in GUID subfolders)
+            latest_config = config_index.get_latest_config(temp_dir_str)
             
-            if not config_files:
-                print(f"[ssms_window.is_combination_in_actual_regex_files] No ColorByRegexConfig.txt files found in {temp_dir}")
+            if not latest_config:
+                print(f"[ssms_window.is_combination_in_actual_regex_files] No ColorByRegexConfig.txt files found in {temp_dir_str}")
                 # Clear all applied color state since no config files exist
                 print(f"[ssms_window.is_combination_in_actual_regex_files] Clearing all tab color state due to missing config files")
                 state.clear_tab_color_tracking()
                 return False
             
-            # Find the most recent config file (in case there are multiple GUID folders)
-            def folder_time(path):
-                folder = path.parent
-                stat = folder.stat()
-                return max(stat.st_mtime, stat.st_ctime)
-            
-            latest_config = max(config_files, key=folder_time)
             latest_folder = latest_config.parent
             
             print(f"[ssms_window.is_combination_in_actual_regex_files] Found ColorByRegexConfig.txt in: {latest_folder}")
             
             # Check for color JSON files - if none exist, clear state but still allow color application
             try:
-                color_json_files = list(latest_folder.glob("customized-groupid-color-*.json"))
+                color_json_files = config_index.get_color_jsons(latest_folder)
                 
                 if color_json_files:
                     print(f"[ssms_window.is_combination_in_actual_regex_files] Found {len(color_json_files)} existing color JSON files: {[f.name for f in color_json_files]}")
@@ -233,7 +248,7 @@ class SsmsWindow:
     
     @staticmethod
     def save_temp_file(temp_file, save_dir, server, db):
-        """Save function that waits for loading to complete before saving"""
+        """Save function that waits for loading to complete before saving, returns the saved path or None if Save As failed"""
         
         # Extract temp name for unique naming
         basename = os.path.basename(temp_file).replace('..sql', '.sql')
@@ -253,23 +268,29 @@ class SsmsWindow:
         
         # Check if the ColorByRegexConfig.txt file exists before proceeding
         # This will also clear tab color state if the file is missing
-        SsmsWindow.is_combination_in_actual_regex_files(server, db)
+        in_regex_files = SsmsWindow.is_combination_in_actual_regex_files(server, db)
         
-        FileManager.create_save_dir(os.path.dirname(target_path))
-        SsmsWindow.automate_save_as(target_path)
+        FileManager.create_save_dir(os.path.join(save_dir, server, db, 'temp'))
+        if not SsmsWindow.automate_save_as(target_path):
+            print(f"[ssms_window.save_temp_file] Save As failed, not saved: {temp_file}")
+            return None
+        journal.record_step(temp_file, "saved", target_path=target_path)
         write_to_regex_file(server, db)
+        journal.record_step(temp_file, "regex_written")
         # Apply tab coloring if enabled
-        SsmsWindow.apply_tab_color(server, db)
+        SsmsWindow.apply_tab_color(server, db, target_path, in_regex_files)
+        journal.record_step(temp_file, "colored")
 
         return target_path
 
     @staticmethod
+    @metrics.timed()
     def automate_save_as(target_path):
-        """Automate the Save As dialog process using caps lock-aware typing"""
+        """Automate the Save As dialog process using caps lock-aware typing, returns True if the filename was entered"""
         
-        # Speed up pyautogui by reducing delays
-        original_pause = pyautogui.PAUSE
-        pyautogui.PAUSE = 0.001  # Reduce from default 0.1 to 0.001
+        # Speed up key input by reducing delays
+        backend = window_snapshots.get_backend()
+        original_pause = backend.set_key_delay(0.001)  # Reduce from default 0.1 to 0.001
 
         try:
             print(f"[ssms_window.automate_save_as] Will type filename with caps lock detection: {target_path}")
@@ -281,7 +302,7 @@ class SsmsWindow:
 
                 def any_keys_pressed(vk_list):
                     # Returns True if any of the keys in vk_list are currently pressed
-                    return any(ctypes.windll.user32.GetAsyncKeyState(vk) & 0x8000 for vk in vk_list)
+                    return any(backend.is_key_pressed(vk) for vk in vk_list)
                 
                 end = time.time() + timeout
                 while time.time() < end:
@@ -298,57 +319,63 @@ class SsmsWindow:
                 print(f"[ssms_window.perform_save_attempt] Performing save attempt with caps lock handling: {target_path}")
                 
                 # must use keyDown/press/keyUp to avoid issues with modifier keys
-                pyautogui.keyDown('ctrl')
-                pyautogui.press('s')
-                pyautogui.keyUp('ctrl')
+                backend.key_down('ctrl')
+                backend.press('s')
+                backend.key_up('ctrl')
+                window_snapshots.invalidate()
                 
                 # Check for Save As dialog with loading window detection
-                end = time.time() + 0.5
-                while time.time() < end:
+                poll = adaptive_timing.start("save_as_dialog", 0.5, max_interval=0.05)
+                while not poll.expired():
                     # Check if Save As dialog appeared
-                    w = pygetwindow.getActiveWindow()
+                    w = window_snapshots.get_active_window()
                     if w and w.title.strip().startswith("Save File As"):
                         print("[ssms_window.perform_save_attempt] Save As dialog appeared")
+                        poll.succeeded()
                         
                         # Use caps lock-aware typing
                         print(f"[ssms_window.perform_save_attempt] Typing filename with caps lock detection: {target_path}")
                         
                         SsmsWindow.write_text_handling_caps_lock(target_path)
                         
-                        pyautogui.press('enter')
+                        backend.press('enter')
                         return True
                     
                     # Check if loading window appeared (indicating save was intercepted)
                     try:
-                        all_windows = pygetwindow.getAllWindows()
-                        loading_windows = [w for w in all_windows if w.title and w.title.strip() == "Microsoft SQL Server Management Studio"]
+                        loading_windows = window_snapshots.get_snapshot().loading_windows
                         
                         if loading_windows:
                             print("[ssms_window.perform_save_attempt] Loading window detected, waiting for it to disappear...")
                             
-                            # Wait for loading window to go away
-                            loading_end = time.time() + 10  # Give it 10 seconds to load
-                            while time.time() < loading_end:
-                                all_windows = pygetwindow.getAllWindows()
-                                loading_windows = [w for w in all_windows if w.title and w.title.strip() == "Microsoft SQL Server Management Studio"]
+                            # Wait for loading window to go away, give it 10 seconds (stretched on slow machines)
+                            loading_poll = adaptive_timing.start("save_loading", 10, min_interval=window_snapshots.ttl)
+                            while not loading_poll.expired():
+                                loading_windows = window_snapshots.get_snapshot().loading_windows
                                 if not loading_windows:
                                     print("[ssms_window.perform_save_attempt] Loading window gone, retrying save...")
+                                    loading_poll.succeeded()
                                     break
-                                time.sleep(0.1)
+                                loading_poll.sleep()
+                            else:
+                                loading_poll.timed_out()
                             
                             # Retry the save after loading is done
                             print("[ssms_window.perform_save_attempt] Retrying save after loading screen...")
                             
-                            pyautogui.keyDown('ctrl')
-                            pyautogui.press('s')
-                            pyautogui.keyUp('ctrl')
-                            # Continue the loop to check for Save As dialog again
+                            backend.key_down('ctrl')
+                            backend.press('s')
+                            backend.key_up('ctrl')
+                            window_snapshots.invalidate()
+                            # Continue the loop to check for Save As dialog again, with a fresh wait
+                            poll = adaptive_timing.start("save_as_dialog", 0.5, max_interval=0.05)
                             
                     except Exception as e:
                         print(f"[ssms_window.perform_save_attempt] Error checking for loading window: {e}")
                     
-                    time.sleep(0.01)
+                    poll.sleep()
                 
+                poll.timed_out()
                 print("[ssms_window.perform_save_attempt] Save As dialog did not appear within timeout")
                 return False
             
@@ -356,12 +383,14 @@ class SsmsWindow:
             print(f"[ssms_window.automate_save_as] First save attempt for: {target_path}")
             if perform_save_attempt():
                 print(f"[ssms_window.automate_save_as] Save successful on first attempt")
-            else:
-                print(f"[ssms_window.automate_save_as] First attempt failed, retrying...")
-                # Second attempt - don't check result, just proceed
-                perform_save_attempt()
-                print(f"[ssms_window.automate_save_as] Second attempt completed")
+                return True
+            print(f"[ssms_window.automate_save_as] First attempt failed, retrying...")
+            if perform_save_attempt():
+                print(f"[ssms_window.automate_save_as] Save successful on second attempt")
+                return True
+            print(f"[ssms_window.automate_save_as] Second attempt failed, giving up")
+            return False
                     
         finally:
             # Always restore original pause setting
-            pyautogui.PAUSE = original_pause
\ No newline at end of file
+            backend.set_key_delay(original_pause)
\ No newline at end of file
@@ -1,5 +1,6 @@
 """Runtime (non-persistent) state management."""
 
+import atexit
 from settings import Settings
 
 class State:
@@ -14,9 +15,11 @@ class State:
         # Application state
         self.current_settings_window = None
         self.current_watcher_observer = None
+        self.current_job_queue = None
         
         # Session tracking
         self.session_start_time = None
+        self.cleanup_progress = None  # (folders_done, folders_total, files_deleted) of the startup cleanup
         
         # Tab color tracking - set of combinations that have had colors applied this session
         self.tab_colors_applied = set()
@@ -57,4 +60,7 @@ class State:
 
 # Create shared instances
 settings = Settings()
-state = State(settings=settings)
\ No newline at end of file
+state = State(settings=settings)
+
+# Last chance to write debounced settings changes if the app exits without on_exit
+atexit.register(settings.flush)
\ No newline at end of file
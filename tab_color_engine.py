@@ -0,0 +1,147 @@
+"""Tab coloring by editing SSMS's customized-groupid-color-*.json directly."""
+
+import json
+import os
+import re
+
+def json_color_value(color_index):
+    """SSMS stores palette positions without our "None" entry (0), so Lavender (1) is 0"""
+    return color_index - 1
+
+def read_group_ids(regex_path):
+    """Get the group ids (regex lines, without blanks and // comments) of ColorByRegexConfig.txt, or None"""
+    try:
+        with open(regex_path, "r", encoding="utf-8-sig") as f:
+            lines = [line.rstrip("\r\n") for line in f]
+    except OSError as e:
+        print(f"[tab_color_engine] Could not read {regex_path}: {e}")
+        return None
+    return [line for line in lines if line.strip() and not line.lstrip().startswith("//")]
+
+def find_group_id(regex_path, file_path, group_ids=None):
+    """Get the ColorByRegexConfig.txt line that groups a file, or None
+
+    SSMS uses the regex line itself as the tab group id, and the first line
+    that matches the file's path wins.
+    """
+    if group_ids is None:
+        group_ids = read_group_ids(regex_path) or []
+    for line in group_ids:
+        try:
+            if re.search(line, file_path, re.IGNORECASE):
+                return line
+        except re.error:
+            continue
+    return None
+
+def load_color_map(json_path):
+    """Read the group id -> color mapping, or None if the file isn't in the format we know"""
+    try:
+        with open(json_path, "r", encoding="utf-8-sig") as f:
+            text = f.read()
+    except OSError as e:
+        print(f"[tab_color_engine] Could not read {json_path}: {e}")
+        return None
+    if not text.strip():
+        return {}
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        print(f"[tab_color_engine] {json_path} is not valid JSON: {e}")
+        return None
+    if not isinstance(data, dict):
+        print(f"[tab_color_engine] Unexpected JSON layout in {json_path}, not editing it")
+        return None
+    return data
+
+def _write_map(json_path, data):
+    """Swap in a new color map atomically, returns False if it couldn't be written"""
+    tmp_path = f"{json_path}.ssmsplus.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, json_path)
+    except OSError as e:
+        print(f"[tab_color_engine] Could not write {json_path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+def remove_groups(json_path, group_ids):
+    """Drop the colors of group ids (regex lines) that were removed from ColorByRegexConfig.txt
+
+    Returns:
+        int: Number of entries removed
+    """
+    data = load_color_map(json_path)
+    if not data:
+        return 0
+    stale = [group_id for group_id in group_ids if group_id in data]
+    if not stale:
+        return 0
+    for group_id in stale:
+        del data[group_id]
+    if not _write_map(json_path, data):
+        return 0
+    print(f"[tab_color_engine] Removed {len(stale)} stale group colors from {os.path.basename(json_path)}")
+    return len(stale)
+
+def write_color(json_path, group_id, color_index, live_ids=None):
+    """Set (or with color 0, clear) one group's color, keeping every other entry
+
+    The file is re-read right before writing so colors SSMS saved in the
+    meantime aren't lost, and swapped in atomically. With live_ids (the
+    current lines of ColorByRegexConfig.txt), entries for our own pattern
+    lines that are no longer among them are dropped in the same write.
+    Group ids SSMS or the user added are always kept.
+
+    Returns:
+        bool: True if the file now has the color, False if it couldn't be edited
+    """
+    data = load_color_map(json_path)
+    if data is None:
+        return False
+
+    stale = []
+    if live_ids is not None:
+        from regex_writer import is_server_pattern
+        stale = [key for key in data if key != group_id and key not in live_ids and is_server_pattern(key)]
+    for key in stale:
+        del data[key]
+    if color_index:
+        value = json_color_value(color_index)
+        if data.get(group_id) == value and not stale:
+            return True
+        data[group_id] = value
+    elif group_id in data:
+        del data[group_id]
+    elif not stale:
+        return True
+
+    if not _write_map(json_path, data):
+        return False
+    if stale:
+        print(f"[tab_color_engine] Removed {len(stale)} stale group colors from {os.path.basename(json_path)}")
+    print(f"[tab_color_engine] Set color {color_index} for group {group_id} in {os.path.basename(json_path)}")
+    return True
+
+def apply_color(regex_path, json_path, file_path, color_index):
+    """Color the tab group a file belongs to through the JSON file
+
+    Returns:
+        bool: True if done, False if keyboard automation is needed instead
+            (no color file yet, unknown layout, or no regex line for the file)
+    """
+    if not regex_path or not json_path or not os.path.exists(json_path):
+        return False
+    group_ids = read_group_ids(regex_path)
+    if group_ids is None:
+        return False
+    group_id = find_group_id(regex_path, file_path, group_ids)
+    if group_id is None:
+        print(f"[tab_color_engine] No regex line matches {file_path}")
+        return False
+    return write_color(json_path, group_id, color_index, live_ids=set(group_ids))
@@ -0,0 +1,26 @@
+"""Shared test setup: settings.ini, and the journal and metrics kept next to it, live in a throwaway folder."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import CONFIG_PATH
+# Importing state creates settings.ini if it's missing, don't leave one behind
+SETTINGS_EXISTED = os.path.exists(CONFIG_PATH)
+
+import pytest
+from state import settings
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_settings(tmp_path_factory):
+    """Point settings at a settings.ini of their own for the whole session
+
+    It's never pointed back: the exit flush and the journal/metrics files
+    resolve their paths from it and must stay out of the repo.
+    """
+    if not SETTINGS_EXISTED and os.path.exists(CONFIG_PATH):
+        os.remove(CONFIG_PATH)
+    settings.config_path = str(tmp_path_factory.mktemp("settings") / "settings.ini")
+    settings.load()
+    return settings
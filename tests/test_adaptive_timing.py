@@ -0,0 +1,31 @@
+import pytest
+
+from adaptive_timing import AdaptiveTiming
+
+DEFAULT = 1.5
+
+def time_out(timing, stage):
+    """Run a wait that uses up its whole (possibly stretched) timeout"""
+    poll = timing.start(stage, DEFAULT)
+    poll.start -= poll.timeout
+    poll.timed_out()
+
+def test_single_timeout_decays_back_to_default():
+    timing = AdaptiveTiming()
+    for _ in range(20):
+        timing.record("single_timeout", 0.1)
+    assert timing.timeout("single_timeout", DEFAULT) == DEFAULT
+
+    time_out(timing, "single_timeout")
+    assert DEFAULT < timing.timeout("single_timeout", DEFAULT) < DEFAULT * AdaptiveTiming.MAX_STRETCH
+
+    for _ in range(10):
+        timing.record("single_timeout", 0.1)
+    assert timing.timeout("single_timeout", DEFAULT) == DEFAULT
+
+def test_repeated_timeouts_settle_at_default():
+    timing = AdaptiveTiming()
+    for _ in range(60):
+        time_out(timing, "never_succeeds")
+    assert timing.timeout("never_succeeds", DEFAULT) == pytest.approx(DEFAULT, abs=0.05)
+    assert timing.expected("never_succeeds") <= DEFAULT
@@ -0,0 +1,108 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from config_index import ConfigFileIndex
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    """Two SSMS instance folders, each with a config file and a color file"""
+    for name in ("instance-a", "instance-b"):
+        folder = tmp_path / name
+        folder.mkdir()
+        (folder / "ColorByRegexConfig.txt").write_text("")
+        (folder / "customized-groupid-color-1.json").write_text("{}")
+        (folder / "other.txt").write_text("")
+    return tmp_path
+
+@pytest.fixture
+def index(temp_dir):
+    index = ConfigFileIndex()
+    index.set_watched(str(temp_dir), True)
+    return index
+
+def touch_later(path, seconds):
+    # Folder ctimes are all "now", so move the file's mtime past them
+    stamp = time.time() + seconds
+    os.utime(path, (stamp, stamp))
+
+def test_watched_index_is_built_once(temp_dir, index):
+    assert sorted(index.get_config_files(str(temp_dir))) == [
+        temp_dir / "instance-a" / "ColorByRegexConfig.txt",
+        temp_dir / "instance-b" / "ColorByRegexConfig.txt",
+    ]
+    assert index.get_color_jsons(temp_dir / "instance-a") == [temp_dir / "instance-a" / "customized-groupid-color-1.json"]
+    index.get_config_files(str(temp_dir))
+    assert index.get_stats()["builds"] == 1
+
+def test_unwatched_index_rebuilds_on_every_lookup(temp_dir):
+    index = ConfigFileIndex()
+    index.get_config_files(str(temp_dir))
+    new_folder = temp_dir / "instance-c"
+    new_folder.mkdir()
+    (new_folder / "ColorByRegexConfig.txt").write_text("")
+    assert len(index.get_config_files(str(temp_dir))) == 3
+    assert index.get_stats()["builds"] == 2
+
+def test_add_and_remove_events_keep_the_index_current(temp_dir, index):
+    index.get_config_files(str(temp_dir))
+    new_folder = temp_dir / "instance-c"
+    new_config = new_folder / "ColorByRegexConfig.txt"
+    new_json = new_folder / "customized-groupid-color-2.json"
+
+    index.add(str(new_config))
+    index.add(str(new_json))
+    index.add(str(new_folder / "other.txt"))
+    assert new_config in index.get_config_files(str(temp_dir))
+    assert index.get_color_jsons(new_folder) == [new_json]
+
+    index.remove(str(new_config))
+    index.remove(str(new_json))
+    assert new_config not in index.get_config_files(str(temp_dir))
+    assert index.get_color_jsons(new_folder) == []
+    assert index.get_stats()["builds"] == 1
+
+def test_events_before_the_first_build_are_ignored(temp_dir, index):
+    index.add(str(temp_dir / "instance-c" / "ColorByRegexConfig.txt"))
+    assert len(index.get_config_files(str(temp_dir))) == 2
+
+def test_invalidate_and_unwatching_force_a_rebuild(temp_dir, index):
+    index.get_config_files(str(temp_dir))
+    (temp_dir / "instance-a" / "ColorByRegexConfig.txt").unlink()
+
+    index.invalidate()
+    assert index.get_config_files(str(temp_dir)) == [temp_dir / "instance-b" / "ColorByRegexConfig.txt"]
+    index.set_watched(str(temp_dir), False)
+    index.get_config_files(str(temp_dir))
+    assert index.get_stats()["builds"] == 3
+
+def test_latest_config_follows_the_most_recently_written_folder(temp_dir, index):
+    config_a = temp_dir / "instance-a" / "ColorByRegexConfig.txt"
+    config_b = temp_dir / "instance-b" / "ColorByRegexConfig.txt"
+
+    touch_later(config_a, 100)
+    assert index.get_latest_config(str(temp_dir)) == config_a
+
+    # Cached until a config file is written
+    touch_later(config_b, 200)
+    assert index.get_latest_config(str(temp_dir)) == config_a
+    index.modified(str(config_b))
+    assert index.get_latest_config(str(temp_dir)) == config_b
+
+    # A new SSMS instance folder takes over once its config file is written
+    config_c = Path(temp_dir / "instance-c" / "ColorByRegexConfig.txt")
+    config_c.parent.mkdir()
+    config_c.write_text("")
+    touch_later(config_c, 300)
+    index.add(str(config_c))
+    assert index.get_latest_config(str(temp_dir)) == config_c
+
+    index.remove(str(config_c))
+    assert index.get_latest_config(str(temp_dir)) == config_b
+
+def test_latest_config_is_none_without_config_files(tmp_path):
+    index = ConfigFileIndex()
+    assert index.get_latest_config(str(tmp_path)) is None
+    assert index.get_config_files(str(tmp_path / "missing")) == []
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import time
+import zipfile
+
+import pytest
+
+from dedup_catalog import DedupCatalog
+from retention import RetentionEngine
+from search_index import SearchIndex
+
+SCRIPT = b"SELECT name FROM sys.databases\n"
+DIGEST = hashlib.sha256(SCRIPT).hexdigest()
+
+def noon(day):
+    return time.mktime((2026, 1, day, 12, 0, 0, 0, 0, -1))
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = DedupCatalog(str(tmp_path / "catalog.db"))
+    yield catalog
+    catalog.close()
+
+@pytest.fixture
+def archive(tmp_path, catalog):
+    """The same script archived on days 1, 2 and 3, only day 1's zip stores it"""
+    temp_folder = tmp_path / "SRV0" / "DB0" / "temp"
+    temp_folder.mkdir(parents=True)
+    engine = RetentionEngine(max_days=0, catalog=catalog)
+    for day in (1, 2, 3):
+        path = temp_folder / f"SQLQuery{day}.sql"
+        path.write_bytes(SCRIPT)
+        os.utime(path, (noon(day), noon(day)))
+        with os.scandir(temp_folder) as entries:
+            engine.archive(str(temp_folder), list(entries))
+    return tmp_path / "SRV0" / "DB0" / "archive"
+
+def zip_path(archive, day):
+    return str(archive / f"2026-01-0{day}.zip")
+
+def names(path):
+    with zipfile.ZipFile(path) as zf:
+        return zf.namelist()
+
+def test_saved_duplicates_are_reported_and_left_alone(tmp_path, catalog):
+    first, second = tmp_path / "a.sql", tmp_path / "b.sql"
+    first.write_bytes(SCRIPT)
+    second.write_bytes(SCRIPT)
+
+    assert catalog.record_saved(str(first)) is None
+    assert catalog.record_saved(str(second)) == str(first)
+    assert second.read_bytes() == SCRIPT
+    assert catalog.get_stats()["saved_duplicates"] == 1
+
+def test_archived_duplicates_become_references(archive, catalog):
+    assert names(zip_path(archive, 1)) == ["SQLQuery1.sql"]
+    assert names(zip_path(archive, 2)) == [] and names(zip_path(archive, 3)) == []
+    assert catalog.get_references(zip_path(archive, 2)) == ["SQLQuery2.sql"]
+    assert catalog.resolve(zip_path(archive, 3), "SQLQuery3.sql") == (zip_path(archive, 1), "SQLQuery1.sql")
+    assert catalog.resolve(zip_path(archive, 1), "SQLQuery1.sql") == (zip_path(archive, 1), "SQLQuery1.sql")
+    assert catalog.get_stats()["archived_duplicates"] == 2
+
+def test_search_finds_referenced_scripts(tmp_path, archive, catalog):
+    index = SearchIndex(str(tmp_path / "search.db"), catalog=catalog)
+    try:
+        index.reconcile([str(archive)])
+        found = sorted(path for path, *_ in index.search("databases"))
+    finally:
+        index.close()
+    assert found == [f"{zip_path(archive, day)}!SQLQuery{day}.sql" for day in (1, 2, 3)]
+
+def test_evict_zip_moves_blobs_to_the_newest_reference(archive, catalog):
+    assert catalog.evict_zip(zip_path(archive, 1)) == [zip_path(archive, 3)]
+    os.unlink(zip_path(archive, 1))
+
+    with zipfile.ZipFile(zip_path(archive, 3)) as zf:
+        assert zf.read("SQLQuery3.sql") == SCRIPT
+    assert catalog.get_references(zip_path(archive, 3)) == []
+    assert catalog.resolve(zip_path(archive, 2), "SQLQuery2.sql") == (zip_path(archive, 3), "SQLQuery3.sql")
+
+    # Once nothing references the content any more it's forgotten with its zip
+    assert catalog.evict_zip(zip_path(archive, 2)) == []
+    assert catalog.evict_zip(zip_path(archive, 3)) == []
+    assert catalog.find_archived(DIGEST) is None
+    assert catalog.get_stats()["moved"] == 1
+
+def test_archive_is_kept_when_its_blobs_cannot_be_moved(archive, catalog):
+    # Day 3's zip can't be written to
+    os.unlink(zip_path(archive, 3))
+    os.mkdir(zip_path(archive, 3))
+    day1_size = os.path.getsize(zip_path(archive, 1))
+    engine = RetentionEngine(max_bytes=1, max_days=0, catalog=catalog)
+
+    # Day 2 only holds references and goes, day 1 stays with the content
+    assert engine.enforce_quotas([str(archive)]) == 1
+    assert os.path.getsize(zip_path(archive, 1)) == day1_size
+    assert catalog.find_archived(DIGEST) == (zip_path(archive, 1), "SQLQuery1.sql")
+    assert catalog.resolve(zip_path(archive, 3), "SQLQuery3.sql") == (zip_path(archive, 1), "SQLQuery1.sql")
+
+    # Evicted on a later run once the move works
+    os.rmdir(zip_path(archive, 3))
+    zipfile.ZipFile(zip_path(archive, 3), "w").close()
+    assert catalog.evict_zip(zip_path(archive, 1)) == [zip_path(archive, 3)]
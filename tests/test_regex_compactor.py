@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+from regex_compactor import compact_patterns, expanded_pattern, verify_compaction
+
+def owner(lines, path):
+    """The line SSMS groups a path under: the first one that matches"""
+    for line in lines:
+        if re.search(line, path, re.IGNORECASE):
+            return line
+    return None
+
+def path(server, db):
+    return f"C:\\Save\\{server}\\{db}\\temp\\{server}_{db}_ab12cd34.sql"
+
+PREFIXES = [("SRV1", "DB1"), ("SRV1", "DB10"), ("SRV10", "DB1"), ("SRV10", "DB10"), ("SRV1", "DB100")]
+
+def test_same_color_prefixes_fold_into_one_line():
+    lines = compact_patterns(PREFIXES, lambda server, db: 3)
+    assert len(lines) == 1
+    assert verify_compaction(PREFIXES, lines)
+    for server, db in PREFIXES:
+        assert owner(lines, path(server, db)) == lines[0]
+    for server, db in [("SRV", "DB1"), ("SRV100", "DB1"), ("SRV1", "DB"), ("SRV1", "DB1000"), ("SRV10", "DB100")]:
+        assert owner(lines, path(server, db)) is None
+
+@pytest.mark.parametrize("colors", [
+    {("SRV1", "DB1"): 3, ("SRV1", "DB10"): 4, ("SRV10", "DB1"): 5, ("SRV10", "DB10"): 3, ("SRV1", "DB100"): 4},
+    {("SRV1", "DB1"): 4, ("SRV1", "DB10"): 3, ("SRV10", "DB1"): 3, ("SRV10", "DB10"): 4, ("SRV1", "DB100"): 5},
+])
+def test_prefixes_with_different_colors_stay_apart(colors):
+    lines = compact_patterns(PREFIXES, lambda server, db: colors[(server, db)])
+    assert verify_compaction(PREFIXES, lines)
+    by_color = {}
+    for combination, color in colors.items():
+        by_color.setdefault(color, set()).add(owner(lines, path(*combination)))
+    # Every color owns exactly one line and no two colors share one
+    assert all(len(owned) == 1 for owned in by_color.values())
+    assert len(set.union(*by_color.values())) == len(by_color)
+
+def test_server_grouping_prefixes():
+    servers = [("SRV1", None), ("SRV10", None), ("SRV2", None)]
+    colors = {"SRV1": 3, "SRV10": 4, "SRV2": 3}
+    lines = compact_patterns(servers, lambda server, db: colors[server])
+    assert verify_compaction(servers, lines)
+    assert owner(lines, path("SRV1", "DB")) == owner(lines, path("SRV2", "DB"))
+    assert owner(lines, path("SRV10", "DB")) != owner(lines, path("SRV1", "DB"))
+    assert owner(lines, path("SRV100", "DB")) is None
+
+def test_color_zero_combinations_keep_their_own_lines():
+    combinations = [("SRV1", "DB1"), ("SRV1", "DB10"), ("SRV2", "DB1"), ("SRV2", "DB2")]
+    colors = {("SRV1", "DB1"): 0, ("SRV1", "DB10"): 0, ("SRV2", "DB1"): 6, ("SRV2", "DB2"): 6}
+    lines = compact_patterns(combinations, lambda server, db: colors[(server, db)])
+    assert expanded_pattern("SRV1", "DB1") in lines
+    assert expanded_pattern("SRV1", "DB10") in lines
+    assert len(lines) == 3
+    assert verify_compaction(combinations, lines)
+    assert owner(lines, path("SRV1", "DB10")) == expanded_pattern("SRV1", "DB10")
+
+def test_verify_rejects_a_line_that_matches_a_longer_name():
+    combinations = [("SRV1", "DB1"), ("SRV1", "DB10")]
+    # Without the lookahead DB1 also matches DB10, which belongs to another line
+    lines = ["\\\\SRV1\\\\DB1", expanded_pattern("SRV1", "DB10")]
+    assert not verify_compaction(combinations, lines)
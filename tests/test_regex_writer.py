@@ -0,0 +1,24 @@
+import regex_writer
+from state import settings, state
+
+def test_regenerate_leaves_a_file_written_by_write_to_regex_file_alone(tmp_path, monkeypatch):
+    folder = tmp_path / "temp" / "0f8fad5b-d9cb-469f-a165-70867728950e"
+    folder.mkdir(parents=True)
+    config = folder / "ColorByRegexConfig.txt"
+    config.write_text("")
+    monkeypatch.setattr(state, "temp_dir", str(tmp_path / "temp"))
+    monkeypatch.setattr(regex_writer, "_last_regenerated", None)
+    settings.set_grouping_mode("server_db")
+
+    # "SRV.DB1" sorts before "SRV1.DB1" for display, but \\SRV\\DB1 after \\SRV1\\DB1 in the file
+    for server, db in [("SRV", "DB1"), ("SRV1", "DB1")]:
+        settings.set_tab_color_for_database(server, db, 3)
+        regex_writer.write_to_regex_file(server, db)
+    written = config.read_text()
+    assert written.splitlines() == sorted(written.splitlines())
+
+    before = dict(regex_writer.write_stats)
+    regex_writer.regenerate_all_regex_patterns()
+    assert config.read_text() == written
+    assert regex_writer.write_stats["written"] == before["written"]
+    assert regex_writer.write_stats["skipped"] == before["skipped"] + 1
@@ -0,0 +1,83 @@
+import os
+import time
+import zipfile
+
+import pytest
+
+from dedup_catalog import DedupCatalog
+from retention import RetentionEngine
+
+def noon(day):
+    return time.mktime((2026, 1, day, 12, 0, 0, 0, 0, -1))
+
+@pytest.fixture
+def temp_folder(tmp_path):
+    folder = tmp_path / "SRV0" / "DB0" / "temp"
+    folder.mkdir(parents=True)
+    return folder
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = DedupCatalog(str(tmp_path / "catalog.db"))
+    yield catalog
+    catalog.close()
+
+def archive_files(engine, temp_folder, files):
+    """Write {name: (content, mtime)} into the temp folder and archive them"""
+    for name, (content, mtime) in files.items():
+        path = temp_folder / name
+        path.write_bytes(content)
+        os.utime(path, (mtime, mtime))
+    with os.scandir(temp_folder) as entries:
+        return engine.archive(str(temp_folder), [e for e in entries if e.name in files])
+
+def zips(temp_folder):
+    return sorted(os.listdir(temp_folder.parent / "archive"))
+
+def test_archive_writes_one_zip_per_day(temp_folder):
+    engine = RetentionEngine()
+    assert archive_files(engine, temp_folder, {
+        "SQLQuery1.sql": (b"SELECT 1", noon(1)),
+        "SQLQuery2.sql": (b"SELECT 2", noon(1)),
+        "SQLQuery3.sql": (b"SELECT 3", noon(2)),
+    }) == 3
+    # SSMS numbers queries from 1 again in the next session
+    assert archive_files(engine, temp_folder, {"SQLQuery1.sql": (b"SELECT 4", noon(1))}) == 1
+
+    assert os.listdir(temp_folder) == []
+    assert zips(temp_folder) == ["2026-01-01.zip", "2026-01-02.zip"]
+    with zipfile.ZipFile(temp_folder.parent / "archive" / "2026-01-01.zip") as zf:
+        assert sorted(zf.namelist()) == ["SQLQuery1.sql", "SQLQuery1_2.sql", "SQLQuery2.sql"]
+        assert zf.read("SQLQuery1_2.sql") == b"SELECT 4"
+
+def test_age_quota_evicts_whole_days_past_the_limit(temp_folder):
+    engine = RetentionEngine(max_bytes=0, max_days=30)
+    archive_files(engine, temp_folder, {"a.sql": (b"SELECT 1", noon(1)), "b.sql": (b"SELECT 2", noon(2))})
+
+    # Day 1 ended 30.5 days ago, day 2 only 29.5 days ago
+    assert engine.enforce_quotas([str(temp_folder.parent / "archive")], now=noon(2) + 30 * 86400) == 1
+    assert zips(temp_folder) == ["2026-01-02.zip"]
+
+def test_size_quota_evicts_the_oldest_days_first(temp_folder):
+    engine = RetentionEngine(max_days=0)
+    archive_files(engine, temp_folder, {f"{day}.sql": (os.urandom(10000), noon(day)) for day in (3, 1, 2)})
+    archive = temp_folder.parent / "archive"
+    sizes = {name: os.path.getsize(archive / name) for name in zips(temp_folder)}
+
+    engine.max_bytes = sizes["2026-01-02.zip"] + sizes["2026-01-03.zip"]
+    assert engine.enforce_quotas([str(archive)]) == 1
+    assert zips(temp_folder) == ["2026-01-02.zip", "2026-01-03.zip"]
+    assert engine.get_stats()["evicted_bytes"] == sizes["2026-01-01.zip"]
+
+def test_size_quota_counts_blobs_moved_into_surviving_zips(temp_folder, catalog):
+    engine = RetentionEngine(max_days=0, catalog=catalog)
+    content = os.urandom(20000)
+    archive_files(engine, temp_folder, {"a.sql": (content, noon(1))})
+    archive_files(engine, temp_folder, {"b.sql": (content, noon(2)), "c.sql": (b"SELECT 3", noon(2))})
+    archive = temp_folder.parent / "archive"
+    # Day 2 only references the content, so it's small until day 1 is evicted
+    assert os.path.getsize(archive / "2026-01-02.zip") < 1000
+
+    engine.max_bytes = 10000
+    assert engine.enforce_quotas([str(archive)]) == 2
+    assert zips(temp_folder) == []
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+from combination_store import CombinationStore, KIND_DB
+from settings import Settings
+
+INI = """[Appearance]
+groupingmode = server_db
+
+[TabColoringServer]
+srv1 = 5
+
+[TabColoringDB]
+srv1.good = 7
+srv1.bad = 99
+srv1.text = red
+"""
+
+@pytest.fixture
+def settings_path(tmp_path):
+    path = tmp_path / "settings.ini"
+    path.write_text(INI)
+    return str(path)
+
+def resolutions(settings):
+    return {db: settings.get_tab_color_for_combination("SRV1", db) for db in ("GOOD", "BAD", "TEXT", "MISSING")}
+
+def test_invalid_db_color_resolves_the_same_in_ini_and_sqlite(settings_path):
+    expected = {"GOOD": 7, "BAD": 5, "TEXT": 5, "MISSING": 5}
+    settings = Settings(settings_path)
+    assert resolutions(settings) == expected
+
+    settings.set_combination_backend("sqlite")
+    settings.flush()
+    assert resolutions(settings) == expected
+    reloaded = Settings(settings_path)
+    assert reloaded.store
+    assert resolutions(reloaded) == expected
+
+    # Setting an invalid value while on SQLite behaves like the INI too
+    reloaded.set_setting("TabColoringDB", "srv1.good", "42")
+    reloaded.flush()
+    assert resolutions(Settings(settings_path))["GOOD"] == 5
+
+    # And back to the INI
+    reloaded.set_combination_backend("ini")
+    reloaded.flush()
+    ini = Settings(settings_path)
+    assert ini.store is None
+    assert resolutions(ini) == expected | {"GOOD": 5}
+
+def test_store_created_with_not_null_colors_is_migrated(tmp_path):
+    path = str(tmp_path / "combinations.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE combinations (kind TEXT NOT NULL, server TEXT NOT NULL, db TEXT NOT NULL DEFAULT '',
+            color INTEGER NOT NULL DEFAULT 0, first_seen REAL, last_seen REAL, use_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, server, db));
+        CREATE INDEX idx_combinations_color ON combinations (color);
+        INSERT INTO combinations VALUES ('db', 'srv1', 'good', 7, 1.0, 2.0, 3);
+    """)
+    conn.close()
+
+    store = CombinationStore(path)
+    store.apply({(KIND_DB, "srv1.bad"): {"color": None}})
+    assert store.all(KIND_DB) == {"srv1.good": 7, "srv1.bad": None}
+    assert store.get_usage(KIND_DB, "srv1", "good") == (1.0, 2.0, 3)
+    store.close()
+
+def test_regex_generation_moves_only_for_pattern_settings(settings_path):
+    settings = Settings(settings_path)
+    generation = settings.regex_generation
+
+    settings.set_tray_name("Work")
+    settings.set_adaptive_timing({"dialog": (0.5, 0.1)})
+    settings.set_grouping_mode("server_db")
+    assert settings.regex_generation == generation
+
+    settings.set_regex_compaction_enabled(True)
+    assert settings.regex_generation == generation + 1
+    settings.set_grouping_mode("server")
+    assert settings.regex_generation == generation + 2
+    settings.set_tab_color_for_database("SRV1", "NEW", 3)
+    assert settings.regex_generation == generation + 3
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import tab_color_engine
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DB0 = r"\\SRV0\\DB0(?=\\|$)"
+DB1 = r"\\SRV0\\DB1(?=\\|$)"
+DB2 = r"\\SRV1\\DB2(?=\\|$)"
+STALE = r"\\OLDSRV\\OLDDB(?=\\|$)"
+# A group SSMS or the user set up outside of SSMS Plus
+FOREIGN = r".*\\Reports\\.*"
+
+@pytest.fixture
+def ssms_folder(tmp_path):
+    """A copy of the fixture SSMS folder: ColorByRegexConfig.txt and a color JSON"""
+    for name in os.listdir(FIXTURES):
+        shutil.copy(os.path.join(FIXTURES, name), tmp_path / name)
+    return tmp_path
+
+def paths(folder):
+    return str(folder / "ColorByRegexConfig.txt"), str(folder / "customized-groupid-color-fixture.json")
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.mark.parametrize("color_index, value", [(1, 0), (2, 1), (16, 15)])
+def test_json_color_value_skips_none(color_index, value):
+    assert tab_color_engine.json_color_value(color_index) == value
+
+def test_read_group_ids_skips_comments_and_blank_lines(ssms_folder):
+    regex_path, _ = paths(ssms_folder)
+    assert tab_color_engine.read_group_ids(regex_path) == [DB0, DB1, DB2]
+
+def test_find_group_id_matches_saved_path(ssms_folder):
+    regex_path, _ = paths(ssms_folder)
+    assert tab_color_engine.find_group_id(regex_path, r"C:\Save\SRV0\DB1\temp\SRV0_DB1_ab12cd34.sql") == DB1
+    assert tab_color_engine.find_group_id(regex_path, r"C:\Save\SRV0\DB10\temp\SRV0_DB10_ab12cd34.sql") is None
+
+def test_load_color_map_reads_fixture(ssms_folder):
+    _, json_path = paths(ssms_folder)
+    assert tab_color_engine.load_color_map(json_path) == {DB0: 0, DB1: 5, STALE: 3, FOREIGN: 9}
+
+def test_write_color_keeps_unknown_layout_untouched(tmp_path):
+    json_path = tmp_path / "customized-groupid-color-list.json"
+    json_path.write_text("[1, 2]")
+    assert tab_color_engine.load_color_map(str(json_path)) is None
+    assert not tab_color_engine.write_color(str(json_path), DB0, 3)
+    assert json_path.read_text() == "[1, 2]"
+
+def test_write_color_merges_and_clears(ssms_folder):
+    _, json_path = paths(ssms_folder)
+
+    assert tab_color_engine.write_color(json_path, DB2, 3)
+    assert read_json(json_path) == {DB0: 0, DB1: 5, STALE: 3, FOREIGN: 9, DB2: 2}
+
+    assert tab_color_engine.write_color(json_path, DB1, 0)
+    assert read_json(json_path) == {DB0: 0, STALE: 3, FOREIGN: 9, DB2: 2}
+
+def test_write_color_prunes_only_our_ids_that_are_no_longer_lines(ssms_folder):
+    _, json_path = paths(ssms_folder)
+    assert tab_color_engine.write_color(json_path, DB0, 1, live_ids={DB0, DB1, DB2})
+    assert read_json(json_path) == {DB0: 0, DB1: 5, FOREIGN: 9}
+
+def test_apply_color_sets_the_file_group_and_prunes(ssms_folder):
+    regex_path, json_path = paths(ssms_folder)
+    assert tab_color_engine.apply_color(regex_path, json_path, r"C:\Save\SRV1\DB2\temp\SRV1_DB2_ab12cd34.sql", 7)
+    assert read_json(json_path) == {DB0: 0, DB1: 5, FOREIGN: 9, DB2: 6}
+
+def test_apply_color_needs_keys_without_color_file(ssms_folder):
+    regex_path, _ = paths(ssms_folder)
+    missing = str(ssms_folder / "customized-groupid-color-missing.json")
+    assert not tab_color_engine.apply_color(regex_path, missing, r"C:\Save\SRV0\DB0\temp\x.sql", 2)
+    assert not os.path.exists(missing)
@@ -0,0 +1,27 @@
+from title_tracker import TitleTracker
+from window_snapshot import SSMS_TITLE
+
+def title(number, server, db, spid):
+    name = f"SQLQuery{number}.sql"
+    connection = f"{server}.{db} (sa ({spid}))"
+    return f"{name} - {connection}* - {name} - {connection}* - {SSMS_TITLE}"
+
+def test_resolve_skips_the_tab_that_already_resolved_a_file():
+    tracker = TitleTracker(snapshots=None)
+    tracker.observe(1, title(1, "SRV0", "DB0", 51), timestamp=100.0)
+    assert tracker.resolve(100.1) == ("SRV0", "DB0")
+    # The next file's tab hasn't shown its title yet
+    assert tracker.resolve(100.5) == (None, None)
+    tracker.observe(1, title(2, "SRV0", "DB1", 52), timestamp=100.6)
+    assert tracker.resolve(100.5) == ("SRV0", "DB1")
+
+def test_same_query_name_in_another_ssms_window_is_not_claimed():
+    tracker = TitleTracker(snapshots=None)
+    tracker.observe(1, title(1, "SRV0", "DB0", 51), timestamp=100.0)
+    assert tracker.resolve(100.1) == ("SRV0", "DB0")
+    assert tracker.is_claimed(1, title(1, "SRV0", "DB0", 51))
+
+    # A relaunched (or second) SSMS numbers its queries from SQLQuery1 again
+    tracker.observe(2, title(1, "SRV1", "DB1", 51), timestamp=200.0)
+    assert not tracker.is_claimed(2, title(1, "SRV1", "DB1", 51))
+    assert tracker.resolve(200.1) == ("SRV1", "DB1")
@@ -0,0 +1,205 @@
+import pytest
+
+import ssms_window
+import watcher
+from journal import Journal
+from ssms_simulator import SsmsSimulator
+from title_tracker import TitleTracker
+from window_snapshot import window_snapshots
+
+class ListQueue:
+    """Stands in for SaveJobQueue, collecting what would be processed"""
+
+    def __init__(self):
+        self.paths = []
+
+    def enqueue(self, path):
+        self.paths.append(path)
+
+@pytest.fixture
+def sim(tmp_path, monkeypatch):
+    temp_dir = tmp_path / "temp"
+    temp_dir.mkdir()
+    simulator = SsmsSimulator(str(temp_dir), loading_time=0)
+    window_snapshots.set_backend(simulator)
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(watcher, "journal", journal)
+    monkeypatch.setattr(ssms_window, "journal", journal)
+    monkeypatch.setattr(watcher, "title_tracker", TitleTracker(simulator))
+    yield simulator
+    window_snapshots.set_backend(None)
+
+def queued(job_queue):
+    return [temp_file for temp_file, _ in list(job_queue.jobs.queue)]
+
+def test_job_queue_drop_oldest_makes_room_for_the_new_job():
+    dropped = []
+    job_queue = watcher.SaveJobQueue(lambda path: None, maxsize=2, on_drop=dropped.append)
+
+    assert all(job_queue.enqueue(path) for path in ("a.sql", "b.sql", "c.sql"))
+    assert queued(job_queue) == ["b.sql", "c.sql"]
+    assert dropped == ["a.sql"]
+    stats = job_queue.get_stats()
+    assert (stats["enqueued"], stats["dropped"], stats["depth"], stats["max_depth"]) == (3, 1, 2, 2)
+
+def test_job_queue_drop_newest_keeps_the_waiting_jobs():
+    dropped = []
+    job_queue = watcher.SaveJobQueue(lambda path: None, maxsize=2, overflow=watcher.SaveJobQueue.DROP_NEWEST,
+                                     on_drop=dropped.append)
+
+    assert job_queue.enqueue("a.sql") and job_queue.enqueue("b.sql")
+    assert not job_queue.enqueue("c.sql")
+    assert queued(job_queue) == ["a.sql", "b.sql"]
+    assert dropped == ["c.sql"]
+    stats = job_queue.get_stats()
+    assert (stats["enqueued"], stats["dropped"], stats["depth"]) == (2, 1, 2)
+
+def test_job_queue_runs_jobs_in_order_and_survives_failures():
+    done = []
+
+    def on_new_sql(path):
+        if path == "bad.sql":
+            raise RuntimeError("save failed")
+        done.append(path)
+
+    def on_drop(path):
+        raise RuntimeError("callback failed")
+
+    job_queue = watcher.SaveJobQueue(on_new_sql, maxsize=3, on_drop=on_drop)
+    for path in ("a.sql", "bad.sql", "b.sql", "c.sql"):
+        job_queue.enqueue(path)
+    job_queue.start()
+    try:
+        end = watcher.time.time() + 5
+        while len(done) < 2 and watcher.time.time() < end:
+            watcher.time.sleep(0.01)
+    finally:
+        job_queue.stop()
+    # a.sql was dropped to make room, the failing job didn't stop the consumer
+    assert done == ["b.sql", "c.sql"]
+    stats = job_queue.get_stats()
+    assert (stats["processed"], stats["failed"], stats["dropped"], stats["depth"]) == (2, 1, 1, 0)
+
+def test_reconcile_queues_only_the_focused_new_query(sim):
+    older = sim.open_query("SRV0", "DB0")
+    newest = sim.open_query("SRV0", "DB1")
+    job_queue = ListQueue()
+
+    assert watcher.reconcile_temp_dir(sim.temp_dir, job_queue, tracker=watcher.TempFileTracker()) == 1
+    assert job_queue.paths == [newest]
+    assert watcher.journal.get_incomplete()[watcher.journal._key(older)]["data"]["skipped"]
+
+def test_reconcile_skips_files_when_focused_tab_does_not_match(sim):
+    sim.open_query("SRV0", "DB0")
+    sim.open_query("SRV0", "DB1")
+    # The focused tab already resolved the file it was opened with
+    focused = sim.get_active_window()
+    watcher.title_tracker.observe(focused.handle, focused.title)
+    assert watcher.title_tracker.resolve(watcher.time.time()) == ("SRV0", "DB1")
+    job_queue = ListQueue()
+
+    assert watcher.reconcile_temp_dir(sim.temp_dir, job_queue, tracker=watcher.TempFileTracker()) == 0
+    assert job_queue.paths == []
+    assert len(watcher.journal.get_incomplete()) == 2
+    assert sim.stats["keys"] == 0
+
+def test_failed_save_as_is_not_journaled_as_saved(sim, tmp_path):
+    sim.dialog_delay = 60  # The Save As dialog never shows up
+    temp_file = sim.open_query("SRV0", "DB0")
+
+    assert ssms_window.SsmsWindow.save_temp_file(temp_file, str(tmp_path / "save"), "SRV0", "DB0") is None
+    assert "saved" not in watcher.journal.get_incomplete().get(watcher.journal._key(temp_file), {"steps": {}})["steps"]
+    assert not watcher.journal.is_processed(temp_file)
+
+def test_saved_folder_is_watched_after_a_save(tmp_path, monkeypatch):
+    saved = []
+    monkeypatch.setattr(watcher.FileManager, "after_save", staticmethod(saved.append))
+    folder = tmp_path / "save" / "SRV0" / "DB0" / "temp"
+    folder.mkdir(parents=True)
+    (folder / "archive").mkdir()
+    script = folder / "SRV0_DB0_ab12cd34.sql"
+    script.write_text("")
+
+    watches = watcher.SavedFolderWatches()
+    observer = watcher.Observer()
+    watches.attach(observer)
+    observer.start()
+    try:
+        watches.add(str(script))
+        watches.add(str(script))
+        assert watches.get_stats() == {"folders": 1}
+        # The user saves the real query later, and nothing below the folder is watched
+        script.write_text("SELECT 1\n")
+        (folder / "archive" / "other.sql").write_text("SELECT 2\n")
+        end = watcher.time.time() + 5
+        while str(script) not in saved and watcher.time.time() < end:
+            watcher.time.sleep(0.05)
+    finally:
+        observer.stop()
+        observer.join()
+        watches.detach(observer)
+    assert str(script) in saved
+    assert all("other.sql" not in path for path in saved)
+    assert watches.get_stats() == {"folders": 0}
+
+def test_tracker_moves_a_path_through_its_states_once(tmp_path):
+    tracker = watcher.TempFileTracker()
+    path = str(tmp_path / "ab12cd34..sql")
+
+    assert tracker.observe(path, settled=True)
+    assert tracker.get_state(path) == tracker.SEEN
+    assert tracker.begin(path)
+    assert tracker.get_state(path) == tracker.RESOLVING
+    tracker.set_state(path, tracker.SAVING)
+    # A late event or a second worker doesn't start it again
+    assert not tracker.observe(path)
+    assert not tracker.begin(path)
+    tracker.set_state(path, tracker.DONE)
+    assert not tracker.begin(path)
+
+    failed = str(tmp_path / "ef56ab78..sql")
+    assert tracker.begin(failed)
+    tracker.set_state(failed, tracker.FAILED)
+    assert tracker.get_state(failed) == tracker.FAILED
+    stats = tracker.get_stats()
+    assert (stats["tracked"], stats["done"], stats["failed"], stats["active"]) == (2, 1, 1, 0)
+    assert stats["duplicates_suppressed"] == 3
+
+def test_tracker_coalesces_duplicate_events(tmp_path):
+    tracker = watcher.TempFileTracker()
+    path = tmp_path / "ab12cd34..sql"
+    path.write_text("")
+
+    assert tracker.observe(str(path))
+    assert not tracker.observe(str(path))
+    assert tracker.touch(str(path))
+    assert not tracker.touch(str(tmp_path / "unknown..sql"))
+    assert tracker.get_stats()["tracked"] == 1
+    assert tracker.get_stats()["duplicates_suppressed"] == 2
+
+    # Dropped before processing, the next event starts over
+    tracker.forget(str(path))
+    assert tracker.get_state(str(path)) is None
+    assert tracker.observe(str(path))
+
+def test_tracker_settles_once_the_size_is_stable(tmp_path):
+    tracker = watcher.TempFileTracker(coalesce_window=5)
+    path = tmp_path / "ab12cd34..sql"
+    path.write_text("")
+    tracker.observe(str(path))
+    path.write_text("SELECT 1\n")
+    tracker.touch(str(path))
+
+    start = watcher.time.time()
+    tracker.wait_until_quiet(str(path))
+    assert watcher.time.time() - start < 1
+
+def test_tracker_waits_out_the_window_for_an_empty_file(tmp_path):
+    tracker = watcher.TempFileTracker(coalesce_window=0.2)
+    path = tmp_path / "ab12cd34..sql"
+    path.write_text("")
+    tracker.observe(str(path))
+
+    start = watcher.time.time()
+    tracker.wait_until_quiet(str(path))
+    assert watcher.time.time() - start >= 0.2
@@ -0,0 +1,139 @@
+"""Background tracker of SSMS query window titles."""
+
+import re
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from window_snapshot import window_snapshots, SSMS_TITLE
+
+TitleRecord = namedtuple("TitleRecord", ["handle", "title", "server", "db", "timestamp"])
+
+def parse_server_db_from_title(title):
+    # Looks for the first "SOME_SERVER.SOME_DB (" pattern
+    m = re.search(r'([A-Za-z0-9_-]+)\.([A-Za-z0-9_-]+) \(', title)
+    if m:
+        # Always return server and database names in uppercase to handle caps lock issues
+        # When caps lock is on, users type server/db names in lowercase, but we want
+        # consistent uppercase naming for filenames and display throughout the system
+        return m.group(1).upper(), m.group(2).upper()
+    return None, None
+
+def tab_key(title):
+    """Identify a query tab by its SQLQueryN name, which stays put while the title's dirty marker changes"""
+    m = re.search(r'SQLQuery\d+', title)
+    return m.group(0) if m else title
+
+class TitleTracker:
+    """Records focused SQLQuery window title changes into a ring buffer
+
+    The temp file handler correlates a file's creation time with the most
+    recent title change instead of polling windows after the file appears.
+    Each tab resolves one file at most, so a title left over from the
+    previous tab isn't reused for the next one. Tabs are told apart by their
+    SSMS window and SQLQueryN name, since every SSMS instance (and every new
+    launch) numbers its queries from SQLQuery1.
+    """
+
+    def __init__(self, snapshots=window_snapshots, poll_interval=0.05, capacity=256):
+        self.snapshots = snapshots
+        self.poll_interval = poll_interval
+        self.records = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.last_seen = None  # (handle, title) of the last focused window we looked at
+        self.claimed = OrderedDict()  # (window handle, tab key) that already resolved a file, oldest first
+        self.stats = {"records": 0, "hits": 0, "misses": 0}
+
+    def start(self):
+        """Start polling the focused window in the background"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="TitleTracker", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(1)
+        self.thread = None
+
+    def _run(self):
+        while self.running:
+            try:
+                w = self.snapshots.get_active_window()
+                if w and w.title:
+                    self.observe(w.handle, w.title)
+            except Exception as e:
+                print(f"[title_tracker] Error reading active window: {e}")
+            time.sleep(self.poll_interval)
+
+    def observe(self, handle, title, timestamp=None):
+        """Record a focused window title if it's a new SQLQuery title with a parsable server/db"""
+        key = (handle, title)
+        if key == self.last_seen:
+            return None
+        self.last_seen = key
+
+        title = title.strip()
+        if SSMS_TITLE not in title or "SQLQuery" not in title or " - " not in title:
+            return None
+        server, db = parse_server_db_from_title(title)
+        if not server or not db:
+            return None
+
+        record = TitleRecord(handle, title, server, db, timestamp or time.time())
+        with self.lock:
+            self.records.append(record)
+            self.stats["records"] += 1
+        return record
+
+    def latest(self):
+        """Get the most recent record, or None"""
+        with self.lock:
+            return self.records[-1] if self.records else None
+
+    def resolve(self, created_at, before=2.0, after=1.0):
+        """Get (server, db) for the title change closest to a file's creation time
+
+        Only records between `before` seconds ahead of and `after` seconds past
+        created_at are considered, skipping tabs that already resolved a file.
+        The newest change at or before created_at wins; without one, the first
+        change after it (the tab's title can land just after its file). Only
+        the last few records are ever looked at.
+        """
+        with self.lock:
+            match = None
+            for record in reversed(self.records):
+                if record.timestamp > created_at + after:
+                    continue
+                if record.timestamp < created_at - before:
+                    break
+                if (record.handle, tab_key(record.title)) in self.claimed:
+                    continue
+                match = record
+                if record.timestamp <= created_at:
+                    break
+            if match:
+                self.claimed[(match.handle, tab_key(match.title))] = True
+                if len(self.claimed) > self.records.maxlen:
+                    self.claimed.popitem(last=False)
+                self.stats["hits"] += 1
+                return match.server, match.db
+            self.stats["misses"] += 1
+        return None, None
+
+    def is_claimed(self, handle, title):
+        """Check whether the tab with this title in this window already resolved a file"""
+        with self.lock:
+            return (handle, tab_key(title)) in self.claimed
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["buffered"] = len(self.records)
+        return stats
+
+# Shared instance started alongside the watcher
+title_tracker = TitleTracker()
@@ -8,10 +8,11 @@ from PIL import Image
 from state import settings, state
 
 class TrayApp:
-    def __init__(self, on_exit=None, on_settings=None):
+    def __init__(self, on_exit=None, on_settings=None, on_search=None):
         self.icon = None
         self.on_exit = on_exit
         self.on_settings = on_settings
+        self.on_search = on_search
         self.running = True
 
     def run(self):
@@ -41,6 +42,7 @@ class TrayApp:
         # Create menu - add a separator and make the first item the default
         menu = pystray.Menu(
             pystray.MenuItem('Open Settings', self.show_settings, default=True),
+            pystray.MenuItem('Search Saved Scripts', self.show_search),
             pystray.Menu.SEPARATOR,
             pystray.MenuItem('Reset Tab Colors', self.reset_tab_colors),
             pystray.MenuItem('Exit', self.exit_app)
@@ -53,6 +55,10 @@ class TrayApp:
         if self.on_settings:
             self.on_settings()
 
+    def show_search(self):
+        if self.on_search:
+            self.on_search()
+
     def reset_tab_colors(self):
         """Reset tab color tracking so colors will be applied again"""
         state.clear_tab_color_tracking()
@@ -3,34 +3,537 @@
 import os
 import re
 import time
+import queue
+import threading
 import configparser
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import pygetwindow as gw
 from ssms_window import SsmsWindow
+from window_snapshot import window_snapshots
+from title_tracker import title_tracker, parse_server_db_from_title
+from config_index import config_index, is_indexed_name
 from state import state
+from file_manager import FileManager
+from journal import journal
+from metrics import metrics
+from adaptive_timing import adaptive_timing
 
 # Pattern: 8 chars + "..sql" (e.g., qhrai0ji..sql)
 SSMS_TEMP_PATTERN = re.compile(r"^[a-z0-9]{8}\.\.sql$", re.IGNORECASE)
 
+class SaveJobQueue:
+    """Bounded job queue that runs on_new_sql on a dedicated consumer thread
+
+    The watchdog observer thread only enqueues temp file paths, so one slow
+    save (window polling, Save As automation) no longer stalls event dispatch
+    for the other temp files SSMS creates when it restores a session.
+    """
+
+    # Overflow policies when the queue is full
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest waiting job to make room
+    DROP_NEWEST = "drop_newest"  # Discard the job being enqueued
+
+    def __init__(self, on_new_sql, maxsize=64, overflow=DROP_OLDEST, on_drop=None):
+        self.on_new_sql = on_new_sql
+        self.overflow = overflow
+        self.on_drop = on_drop  # Called with the path of every dropped job
+        self.jobs = queue.Queue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "max_depth": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+            "total_run": 0.0,
+        }
+
+    def start(self):
+        """Start the consumer thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="SaveJobQueue", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        """Stop the consumer thread after the job currently running finishes"""
+        if not self.running:
+            return
+        self.running = False
+        # Wake the consumer up if it's blocked waiting for a job
+        try:
+            self.jobs.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
+
+    def enqueue(self, temp_file):
+        """Add a temp file to the queue, applying the overflow policy if it's full"""
+        job = (temp_file, time.time())
+        dropped_file = None
+        with self.lock:
+            try:
+                self.jobs.put_nowait(job)
+            except queue.Full:
+                if self.overflow == self.DROP_NEWEST:
+                    self.stats["dropped"] += 1
+                    print(f"[watcher.SaveJobQueue] Queue full, dropping new job: {temp_file}")
+                    self._dropped(temp_file)
+                    return False
+                try:
+                    dropped_file, _ = self.jobs.get_nowait()
+                    self.stats["dropped"] += 1
+                    print(f"[watcher.SaveJobQueue] Queue full, dropping oldest job: {dropped_file}")
+                except queue.Empty:
+                    pass
+                self.jobs.put_nowait(job)
+
+            self.stats["enqueued"] += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], self.jobs.qsize())
+        if dropped_file:
+            self._dropped(dropped_file)
+        return True
+
+    def _dropped(self, temp_file):
+        # Let the owner forget the path, so a later event for it is treated as new
+        if self.on_drop:
+            try:
+                self.on_drop(temp_file)
+            except Exception as e:
+                print(f"[watcher.SaveJobQueue] Error in drop callback for {temp_file}: {e}")
+
+    def get_stats(self):
+        """Get a copy of the queue counters including current depth and average latencies"""
+        with self.lock:
+            stats = dict(self.stats)
+        stats["depth"] = self.jobs.qsize()
+        finished = stats["processed"] + stats["failed"]
+        stats["avg_wait"] = stats["total_wait"] / finished if finished else 0.0
+        stats["avg_run"] = stats["total_run"] / finished if finished else 0.0
+        return stats
+
+    def _run(self):
+        while self.running:
+            job = self.jobs.get()
+            if job is None:
+                continue
+
+            temp_file, enqueued_at = job
+            started_at = time.time()
+            wait = started_at - enqueued_at
+            print(f"[watcher.SaveJobQueue] Processing {temp_file} (waited {wait:.3f}s, {self.jobs.qsize()} still queued)")
+
+            try:
+                self.on_new_sql(temp_file)
+                outcome = "processed"
+            except Exception as e:
+                print(f"[watcher.SaveJobQueue] Error processing {temp_file}: {e}")
+                outcome = "failed"
+
+            run = time.time() - started_at
+            with self.lock:
+                self.stats[outcome] += 1
+                self.stats["total_wait"] += wait
+                self.stats["max_wait"] = max(self.stats["max_wait"], wait)
+                self.stats["total_run"] += run
+
+class TempFileTracker:
+    """Per-path state machine so each SSMS temp file is processed exactly once
+
+    watchdog often reports several created/modified/moved events for the same
+    temp file. The first event registers the path as "seen" and later events
+    are folded into it. Paths move through seen -> resolving -> saving and end
+    in done or failed; finished paths are kept for a while so late events for
+    them are still suppressed.
+
+    Only a file that was created empty is still expected to be written, so
+    only those wait for it to settle: until its size reads the same non-zero
+    value twice in a row with no event in between, or at most the coalescing
+    window without events. Paths observed as settled (a file created with
+    content, a rename, or a file found by the startup scan) are processed
+    right away unless a modified event arrives first.
+    """
+
+    SEEN = "seen"
+    RESOLVING = "resolving"
+    SAVING = "saving"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, coalesce_window=0.25, retention=300, stable_interval=0.03):
+        self.coalesce_window = coalesce_window  # Seconds without events before processing starts
+        self.stable_interval = stable_interval  # Seconds between size checks while waiting
+        self.retention = retention  # Seconds to remember finished paths
+        self.files = {}
+        self.lock = threading.Lock()
+        self.stats = {"tracked": 0, "duplicates_suppressed": 0, "done": 0, "failed": 0}
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def observe(self, path, settled=False):
+        """Record an event for a path, returns True only for the first event of a new file
+
+        settled means no follow-up events are expected, so processing needn't wait for quiet.
+        """
+        key = self._key(path)
+        now = time.time()
+        with self.lock:
+            self._prune(now)
+            entry = self.files.get(key)
+            if entry:
+                entry["last_event"] = now
+                entry["events"] += 1
+                self.stats["duplicates_suppressed"] += 1
+                return False
+            self.files[key] = {"state": self.SEEN, "first_seen": now, "last_event": now, "events": 1, "settled": settled}
+            self.stats["tracked"] += 1
+            return True
+
+    def touch(self, path):
+        """Record a follow-up event (e.g. modified) for a path that's already tracked"""
+        key = self._key(path)
+        with self.lock:
+            entry = self.files.get(key)
+            if not entry:
+                return False
+            entry["last_event"] = time.time()
+            entry["events"] += 1
+            # It's being written, wait for that to finish after all
+            entry["settled"] = False
+            self.stats["duplicates_suppressed"] += 1
+            return True
+
+    def forget(self, path):
+        """Drop a path that was seen but never processed (its job was dropped)"""
+        key = self._key(path)
+        with self.lock:
+            entry = self.files.get(key)
+            if entry and entry["state"] == self.SEEN:
+                del self.files[key]
+
+    def wait_until_quiet(self, path):
+        """Block until the path's size is stable and non-zero, or no events arrived within the coalescing window"""
+        key = self._key(path)
+        last_reading = None
+        while True:
+            with self.lock:
+                entry = self.files.get(key)
+                if not entry or entry.get("settled"):
+                    return
+                last_event = entry["last_event"]
+                remaining = last_event + self.coalesce_window - time.time()
+            if remaining <= 0:
+                return
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            reading = (size, last_event)
+            if size and reading == last_reading:
+                return
+            last_reading = reading
+            time.sleep(min(self.stable_interval, remaining))
+
+    def begin(self, path):
+        """Move a seen path to resolving, returns False if it's already being processed or finished"""
+        key = self._key(path)
+        with self.lock:
+            entry = self.files.get(key)
+            if entry is None:
+                now = time.time()
+                entry = {"state": self.SEEN, "first_seen": now, "last_event": now, "events": 1}
+                self.files[key] = entry
+                self.stats["tracked"] += 1
+            if entry["state"] != self.SEEN:
+                self.stats["duplicates_suppressed"] += 1
+                return False
+            entry["state"] = self.RESOLVING
+            return True
+
+    def set_state(self, path, new_state):
+        """Move a path to a new state"""
+        key = self._key(path)
+        with self.lock:
+            entry = self.files.get(key)
+            if not entry:
+                return
+            entry["state"] = new_state
+            if new_state in (self.DONE, self.FAILED):
+                entry["finished"] = time.time()
+                self.stats[new_state] += 1
+
+    def get_first_seen(self, path):
+        """Get the time the first event for a path arrived, or None"""
+        with self.lock:
+            entry = self.files.get(self._key(path))
+            return entry["first_seen"] if entry else None
+
+    def get_state(self, path):
+        with self.lock:
+            entry = self.files.get(self._key(path))
+            return entry["state"] if entry else None
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["active"] = sum(1 for e in self.files.values() if e["state"] not in (self.DONE, self.FAILED))
+        return stats
+
+    def _prune(self, now):
+        # Forget finished paths once they're past the retention period
+        expired = [k for k, e in self.files.items() if e.get("finished") and now - e["finished"] > self.retention]
+        for key in expired:
+            del self.files[key]
+
+temp_file_tracker = TempFileTracker()
+
 class SSMSTempSQLHandler(FileSystemEventHandler):
-    def __init__(self, on_new_sql):
+    def __init__(self, job_queue, tracker=temp_file_tracker):
         super().__init__()
-        self.on_new_sql = on_new_sql
+        self.job_queue = job_queue
+        self.tracker = tracker
+
+    def on_created(self, event):
+        if not event.is_directory:
+            # SSMS writes a new temp file right after creating it, unless it's already written
+            try:
+                settled = os.path.getsize(event.src_path) > 0
+            except OSError:
+                settled = False
+            self.handle_new_path(event.src_path, settled=settled)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            # A renamed file is already complete
+            self.handle_new_path(event.dest_path, settled=True)
+
+    def on_modified(self, event):
+        if not event.is_directory and SSMS_TEMP_PATTERN.match(os.path.basename(event.src_path)):
+            # Only coalesce into files we already know about, never start processing from a modify
+            self.tracker.touch(event.src_path)
+
+    def handle_new_path(self, path, settled=False):
+        filename = os.path.basename(path)
+        if SSMS_TEMP_PATTERN.match(filename):
+            if not self.tracker.observe(path, settled=settled):
+                print(f"[Watcher] Duplicate event suppressed for: {path}")
+                return
+            print(f"[Watcher] New SSMS temp SQL file: {path}")
+            self.job_queue.enqueue(path)
+
+class SavedScriptHandler(FileSystemEventHandler):
+    """Re-indexes saved scripts when SSMS writes them again (the user saving the query later)"""
 
     def on_created(self, event):
         if not event.is_directory:
-            filename = os.path.basename(event.src_path)
-            if SSMS_TEMP_PATTERN.match(filename):
-                print(f"[Watcher] New SSMS temp SQL file: {event.src_path}")
-                self.on_new_sql(event.src_path)
+            self.handle(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.handle(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.handle(event.dest_path)
+
+    def handle(self, path):
+        if path.lower().endswith(".sql"):
+            FileManager.after_save(path)
+
+class SavedFolderWatches:
+    """Non-recursive watches on the <server>/<db>/temp folders scripts were saved into while running
+
+    The save dir can be a large network share, so it's never watched (or
+    walked) as a whole. A folder is only watched once a script was saved into
+    it, which is where the user saves that query again. Scripts changed while
+    we weren't running are picked up by the search index reconcile at startup.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.observer = None
+        self.handler = SavedScriptHandler()
+        self.folders = set()
+
+    def attach(self, observer):
+        """Schedule future watches on a (new) observer, the old observer's watches go with it"""
+        with self.lock:
+            self.observer = observer
+            self.folders = set()
+
+    def detach(self, observer=None):
+        with self.lock:
+            if observer is None or observer is self.observer:
+                self.observer = None
+                self.folders = set()
+
+    def add(self, saved_path):
+        """Watch the folder of a script that was just saved"""
+        folder = os.path.dirname(saved_path)
+        with self.lock:
+            if not self.observer or folder in self.folders or not os.path.isdir(folder):
+                return
+            try:
+                self.observer.schedule(self.handler, path=folder, recursive=False)
+            except Exception as e:
+                print(f"[Watcher] Could not watch saved scripts in {folder}: {e}")
+                return
+            self.folders.add(folder)
+
+    def get_stats(self):
+        with self.lock:
+            return {"folders": len(self.folders)}
+
+saved_folder_watches = SavedFolderWatches()
+
+class ConfigIndexHandler(FileSystemEventHandler):
+    """Keeps the ColorByRegexConfig.txt / color JSON index current (scheduled recursively)"""
+
+    def __init__(self, index=config_index):
+        super().__init__()
+        self.index = index
+
+    def on_created(self, event):
+        if not event.is_directory and is_indexed_name(event.src_path):
+            self.index.add(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory and is_indexed_name(event.src_path):
+            self.index.modified(event.src_path)
+
+    def on_deleted(self, event):
+        if event.is_directory:
+            # A whole SSMS GUID folder may have gone, rebuild on next lookup
+            self.index.invalidate()
+        elif is_indexed_name(event.src_path):
+            self.index.remove(event.src_path)
+
+    def on_moved(self, event):
+        if event.is_directory:
+            self.index.invalidate()
+            return
+        if is_indexed_name(event.src_path):
+            self.index.remove(event.src_path)
+        if is_indexed_name(event.dest_path):
+            self.index.add(event.dest_path)
+
+def recover_incomplete():
+    """Finish the steps a crash or exit left undone for files that were already saved
+
+    Files that never got saved are left for reconcile_temp_dir to queue again.
+    The regex file is rewritten for saved ones, but tab coloring isn't replayed:
+    it automates whatever SSMS window has focus now, which may not be the one
+    the file belonged to.
+
+    Returns:
+        int: Number of files recovered
+    """
+    from regex_writer import write_to_regex_file
+    recovered = 0
+    for temp_file, entry in journal.get_incomplete().items():
+        steps, data = entry["steps"], entry["data"]
+        if "saved" not in steps:
+            continue
+        server, db, target_path = data.get("server"), data.get("db"), data.get("target_path")
+        print(f"[Watcher] Recovering {temp_file} (last step: {max(steps, key=steps.get)})")
+        try:
+            if "regex_written" not in steps and server and db:
+                write_to_regex_file(server, db)
+                journal.record_step(temp_file, "regex_written", recovered=True)
+            if target_path and os.path.exists(target_path):
+                FileManager.after_save(target_path)
+            journal.mark_processed(temp_file)
+            recovered += 1
+        except Exception as e:
+            print(f"[Watcher] Error recovering {temp_file}: {e}")
+    return recovered
+
+def focused_query_title():
+    """Get the focused window's title if it's a new query tab that hasn't resolved a file yet, else None"""
+    w = window_snapshots.get_active_window()
+    title = w.title.strip() if w and w.title else ""
+    if "SQLQuery" not in title or title_tracker.is_claimed(w.handle, title):
+        return None
+    server, db = parse_server_db_from_title(title)
+    return title if server and db else None
+
+def reconcile_temp_dir(temp_dir, job_queue, max_age=600, tracker=temp_file_tracker):
+    """Queue a temp file SSMS created while we weren't watching (app restart, update)
+
+    Only top-level temp files modified within max_age seconds that the journal
+    hasn't recorded as processed are considered, so running this again is a
+    no-op. Save As works on whatever tab has focus, so only the newest of them
+    is queued, and only while the focused tab is a new query that hasn't been
+    organized yet (its file is the newest one). The others are journaled as
+    skipped. Run it after the observer has started: a file created in between
+    is seen by both, and the tracker drops the second one.
+
+    Returns:
+        int: Number of files queued
+    """
+    cutoff = time.time() - max_age
+    try:
+        with os.scandir(temp_dir) as entries:
+            candidates = [e for e in entries if SSMS_TEMP_PATTERN.match(e.name) and e.is_file()]
+    except OSError as e:
+        print(f"[Watcher] Could not scan {temp_dir} for missed temp files: {e}")
+        return 0
+
+    unprocessed = []  # (mtime, path)
+    for entry in candidates:
+        try:
+            mtime = entry.stat().st_mtime
+        except OSError:
+            continue
+        if mtime >= cutoff and not journal.is_processed(entry.path):
+            unprocessed.append((mtime, entry.path))
+    unprocessed.sort()
+
+    queued = 0
+    title = focused_query_title() if unprocessed else None
+    for i, (_, path) in enumerate(unprocessed):
+        if tracker.get_state(path) is not None:
+            continue  # Already picked up by the observer
+        if title and i == len(unprocessed) - 1:
+            if tracker.observe(path, settled=True):
+                print(f"[Watcher] Found unprocessed temp file from before the watcher started: {path} (focused: {title})")
+                job_queue.enqueue(path)
+                queued += 1
+            continue
+        print(f"[Watcher] Skipping unprocessed temp file, the focused tab isn't its query: {path}")
+        journal.record_step(path, "detected", skipped="focused tab doesn't match")
+    print(f"[Watcher] Startup reconciliation: {len(candidates)} temp files, {queued} queued")
+    return queued
+
+def schedule_handlers(observer, temp_dir, job_queue):
+    """Schedule the temp file handler (top level only) and the config index handler (recursive)
+
+    Saved script folders are added to the observer as scripts get saved (saved_folder_watches).
+    """
+    observer.schedule(SSMSTempSQLHandler(job_queue), path=temp_dir, recursive=False)
+    observer.schedule(ConfigIndexHandler(), path=temp_dir, recursive=True)
+    saved_folder_watches.attach(observer)
+    config_index.set_watched(temp_dir, True)
 
 def start_watching(temp_dir, on_new_sql):
-    event_handler = SSMSTempSQLHandler(on_new_sql)
+    job_queue = SaveJobQueue(on_new_sql, on_drop=temp_file_tracker.forget)
+    job_queue.start()
+    title_tracker.start()
     observer = Observer()
-    observer.schedule(event_handler, path=temp_dir, recursive=False)
+    schedule_handlers(observer, temp_dir, job_queue)
     observer.start()
     print(f"[Watcher] Watching {temp_dir} for SSMS temp .sql files.")
+    recover_incomplete()
+    reconcile_temp_dir(temp_dir, job_queue)
 
     try:
         while True:
@@ -38,36 +541,51 @@ def start_watching(temp_dir, on_new_sql):
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    saved_folder_watches.detach(observer)
+    config_index.set_watched(temp_dir, False)
+    job_queue.stop()
+    title_tracker.stop()
 
 def create_watcher(temp_dir, on_new_sql):
     """Create and start a watcher observer that can be stopped later"""
-    event_handler = SSMSTempSQLHandler(on_new_sql)
+    job_queue = SaveJobQueue(on_new_sql, on_drop=temp_file_tracker.forget)
+    job_queue.start()
+    state.current_job_queue = job_queue
+    title_tracker.start()
+
     observer = Observer()
-    observer.schedule(event_handler, path=temp_dir, recursive=False)
+    schedule_handlers(observer, temp_dir, job_queue)
     observer.start()
     print(f"[Watcher] Started watching {temp_dir} for SSMS temp .sql files.")
+    recover_incomplete()
+    reconcile_temp_dir(temp_dir, job_queue)
     return observer
 
-def parse_server_db_from_title(title):
-    # Looks for the first "SOME_SERVER.SOME_DB (" pattern
-    m = re.search(r'([A-Za-z0-9_-]+)\.([A-Za-z0-9_-]+) \(', title)
-    if m:
-        # Always return server and database names in uppercase to handle caps lock issues
-        # When caps lock is on, users type server/db names in lowercase, but we want
-        # consistent uppercase naming for filenames and display throughout the system
-        return m.group(1).upper(), m.group(2).upper()
-    return None, None
+def stop_watcher():
+    """Stop the current watcher observer and its job queue"""
+    if state.current_watcher_observer:
+        state.current_watcher_observer.stop()
+        saved_folder_watches.detach(state.current_watcher_observer)
+        state.current_watcher_observer = None
+        config_index.set_watched(state.temp_dir, False)
+    if state.current_job_queue:
+        print(f"[Watcher] Stopping job queue: {state.current_job_queue.get_stats()}")
+        print(f"[Watcher] Temp file tracker: {temp_file_tracker.get_stats()}")
+        state.current_job_queue.stop()
+        state.current_job_queue = None
+    title_tracker.stop()
 
+@metrics.timed()
 def get_server_db(timeout=1.5, poll_interval=0.1):
-    """Get server/db info specifically from SQLQuery windows"""
-    end = time.time() + timeout
-    while time.time() < end:
-        # Get ALL SSMS windows, not just the active one
-        all_windows = gw.getAllWindows()
-        ssms_windows = [w for w in all_windows if w.title and "Microsoft SQL Server Management Studio" in w.title]
-        
-        # Look specifically for SQLQuery windows
-        sqlquery_windows = [w for w in ssms_windows if "SQLQuery" in w.title and " - " in w.title]
+    """Get server/db info specifically from SQLQuery windows
+
+    timeout is stretched and polling tightened from how long this took before
+    (poll_interval is the longest sleep between checks).
+    """
+    poll = adaptive_timing.start("get_server_db", timeout, min_interval=window_snapshots.ttl, max_interval=poll_interval)
+    while not poll.expired():
+        # Look specifically for SQLQuery windows in the shared window snapshot
+        sqlquery_windows = window_snapshots.get_snapshot().sqlquery_windows
         
         if sqlquery_windows:
             # Use the first SQLQuery window found
@@ -76,15 +594,36 @@ def get_server_db(timeout=1.5, poll_interval=0.1):
             server, db = parse_server_db_from_title(title)
             if server and db:
                 print(f"[watcher.get_server_db] Extracted server='{server}', db='{db}'")
+                poll.succeeded()
                 return server, db
             else:
                 print(f"[watcher.get_server_db] Could not parse server/db from: {title}")
         
-        time.sleep(poll_interval)
+        poll.sleep()
     
+    poll.timed_out()
     print("[watcher.get_server_db] Timeout - no SQLQuery windows found")
     return None, None
 
+@metrics.timed()
+def resolve_server_db(created_at, settle=1.0):
+    """Resolve server/db for a temp file from the title tracker, falling back to polling windows"""
+    server, db = title_tracker.resolve(created_at, after=settle)
+    if server and db:
+        print(f"[watcher.resolve_server_db] Resolved from title tracker: server='{server}', db='{db}'")
+        return server, db
+
+    # The tab's title change may land shortly after the file appears, give the tracker a moment
+    while time.time() < created_at + settle:
+        time.sleep(0.02)
+        server, db = title_tracker.resolve(created_at, after=settle)
+        if server and db:
+            print(f"[watcher.resolve_server_db] Resolved from title tracker: server='{server}', db='{db}'")
+            return server, db
+
+    print("[watcher.resolve_server_db] No tracked title change near file creation, polling windows")
+    return get_server_db()
+
 def update_color_mappings_ini(config_path, server, db):
     config = configparser.ConfigParser()
     config.read(config_path)
@@ -96,17 +635,42 @@ def update_color_mappings_ini(config_path, server, db):
             config.write(f)
 
 def get_active_ssms_title():
-    w = gw.getActiveWindow()
+    w = window_snapshots.get_active_window()
     if w and 'SQL Server Management Studio' in w.title:
         return w.title
     return None
 
+@metrics.timed()
 def on_new_sql(temp_file):
-    print(f"[watcher.on_new_sql] New temp file detected: {temp_file}")
-    server, db = get_server_db()
-    if not server or not db:
-        print(f"[watcher.on_new_sql] Could not detect server/db from SQLQuery windows, skipping: {temp_file}")
+    # Let any burst of duplicate events for this file settle, then claim it
+    temp_file_tracker.wait_until_quiet(temp_file)
+    if not temp_file_tracker.begin(temp_file):
+        print(f"[watcher.on_new_sql] Already processed, skipping: {temp_file}")
         return
-    print(f"[watcher.on_new_sql] Processing file for {server}.{db}")
-    save_dir = state.save_dir
-    SsmsWindow.save_temp_file(temp_file, save_dir, server, db)
\ No newline at end of file
+
+    try:
+        print(f"[watcher.on_new_sql] New temp file detected: {temp_file}")
+        created_at = temp_file_tracker.get_first_seen(temp_file) or time.time()
+        journal.record_step(temp_file, "detected", created_at=created_at)
+        server, db = resolve_server_db(created_at)
+        if not server or not db:
+            print(f"[watcher.on_new_sql] Could not detect server/db from SQLQuery windows, skipping: {temp_file}")
+            temp_file_tracker.set_state(temp_file, TempFileTracker.FAILED)
+            return
+        print(f"[watcher.on_new_sql] Processing file for {server}.{db}")
+        journal.record_step(temp_file, "resolved", server=server, db=db)
+        temp_file_tracker.set_state(temp_file, TempFileTracker.SAVING)
+        save_dir = state.save_dir
+        target_path = SsmsWindow.save_temp_file(temp_file, save_dir, server, db)
+        if not target_path:
+            # Not journaled as saved, so it's still unprocessed on the next startup
+            print(f"[watcher.on_new_sql] Save As failed, leaving file unprocessed: {temp_file}")
+            temp_file_tracker.set_state(temp_file, TempFileTracker.FAILED)
+            return
+        FileManager.after_save(target_path)
+        saved_folder_watches.add(target_path)
+        journal.mark_processed(temp_file)
+        temp_file_tracker.set_state(temp_file, TempFileTracker.DONE)
+    except Exception:
+        temp_file_tracker.set_state(temp_file, TempFileTracker.FAILED)
+        raise
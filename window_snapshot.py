@@ -0,0 +1,230 @@
+"""Platform backends and the shared, cached snapshot of the top-level windows."""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+SSMS_TITLE = "Microsoft SQL Server Management Studio"
+
+# Titles are captured when the snapshot is taken - pygetwindow reads .title live on every access
+WindowInfo = namedtuple("WindowInfo", ["handle", "title", "window"])
+
+class PlatformBackend(ABC):
+    """Everything SSMS Plus needs from the desktop: windows, keyboard input and key state
+
+    Swappable (WindowSnapshotService.set_backend) so the whole pipeline can be
+    driven by a fake provider or the SSMS simulator. Key names are pyautogui's.
+    A backend missing any abstract method fails when it's constructed.
+    """
+
+    @abstractmethod
+    def get_all_windows(self):
+        """Return a list of WindowInfo for every top-level window"""
+        ...
+
+    @abstractmethod
+    def get_active_window(self):
+        """Return a WindowInfo for the foreground window, or None"""
+        ...
+
+    @abstractmethod
+    def key_down(self, key):
+        ...
+
+    @abstractmethod
+    def key_up(self, key):
+        ...
+
+    @abstractmethod
+    def press(self, key):
+        ...
+
+    def hotkey(self, *keys):
+        """Press keys in order and release them in reverse"""
+        for key in keys:
+            self.key_down(key)
+        for key in reversed(keys):
+            self.key_up(key)
+
+    @abstractmethod
+    def write(self, text):
+        """Type text, one key per character"""
+        ...
+
+    @abstractmethod
+    def is_key_pressed(self, vk):
+        """Check if a virtual key code is physically held down right now"""
+        ...
+
+    @abstractmethod
+    def is_caps_lock_on(self):
+        ...
+
+    def set_key_delay(self, seconds):
+        """Set the pause after each key action, returning the previous value"""
+        return 0
+
+class WindowsBackend(PlatformBackend):
+    """Real backend using pygetwindow, pyautogui and user32 (Windows only)"""
+
+    VK_CAPITAL = 0x14
+
+    @staticmethod
+    def _info(window):
+        return WindowInfo(getattr(window, "_hWnd", None), window.title or "", window)
+
+    def get_all_windows(self):
+        import pygetwindow
+        return [self._info(w) for w in pygetwindow.getAllWindows()]
+
+    def get_active_window(self):
+        import pygetwindow
+        w = pygetwindow.getActiveWindow()
+        return self._info(w) if w else None
+
+    def key_down(self, key):
+        import pyautogui
+        pyautogui.keyDown(key)
+
+    def key_up(self, key):
+        import pyautogui
+        pyautogui.keyUp(key)
+
+    def press(self, key):
+        import pyautogui
+        pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        import pyautogui
+        pyautogui.hotkey(*keys)
+
+    def write(self, text):
+        import pyautogui
+        pyautogui.write(text, interval=0)
+
+    def is_key_pressed(self, vk):
+        import ctypes
+        return bool(ctypes.windll.user32.GetAsyncKeyState(vk) & 0x8000)
+
+    def is_caps_lock_on(self):
+        import ctypes
+        # GetKeyState for VK_CAPITAL returns 1 in the low bit if Caps Lock is on
+        return ctypes.windll.user32.GetKeyState(self.VK_CAPITAL) & 1 == 1
+
+    def set_key_delay(self, seconds):
+        import pyautogui
+        previous = pyautogui.PAUSE
+        pyautogui.PAUSE = seconds
+        return previous
+
+class FakeWindowBackend(PlatformBackend):
+    """In-memory backend for tests and benchmarks on machines without a desktop
+
+    Key input is recorded in `keys` and otherwise ignored.
+    """
+
+    def __init__(self, titles=None, active_title=None):
+        self.enumerations = 0
+        self.keys = []
+        self.set_titles(titles or [], active_title)
+
+    def set_titles(self, titles, active_title=None):
+        """Replace the window list; handles are assigned by position"""
+        self.windows = [WindowInfo(i + 1, title, None) for i, title in enumerate(titles)]
+        self.active = None
+        if active_title is not None:
+            self.set_active(active_title)
+
+    def set_active(self, title):
+        """Make the first window with this title the foreground window (added if missing)"""
+        for w in self.windows:
+            if w.title == title:
+                self.active = w
+                return
+        w = WindowInfo(len(self.windows) + 1, title, None)
+        self.windows.append(w)
+        self.active = w
+
+    def get_all_windows(self):
+        self.enumerations += 1
+        return list(self.windows)
+
+    def get_active_window(self):
+        return self.active
+
+    def key_down(self, key):
+        self.keys.append(("down", key))
+
+    def key_up(self, key):
+        self.keys.append(("up", key))
+
+    def press(self, key):
+        self.keys.append(("press", key))
+
+    def write(self, text):
+        self.keys.append(("write", text))
+
+    def is_key_pressed(self, vk):
+        return False
+
+    def is_caps_lock_on(self):
+        return False
+
+class WindowSnapshot:
+    """Immutable view of the windows at one point in time, pre-filtered for SSMS"""
+
+    def __init__(self, windows, taken_at):
+        self.taken_at = taken_at
+        self.windows = windows
+        self.ssms_windows = [w for w in windows if w.title and SSMS_TITLE in w.title]
+        # A bare "Microsoft SQL Server Management Studio" title means SSMS is still loading
+        self.loading_windows = [w for w in self.ssms_windows if w.title.strip() == SSMS_TITLE]
+        self.sqlquery_windows = [w for w in self.ssms_windows if "SQLQuery" in w.title and " - " in w.title]
+
+class WindowSnapshotService:
+    """Enumerates windows at most once per TTL and shares the result with every caller"""
+
+    def __init__(self, backend=None, ttl=0.05):
+        self.backend = backend or WindowsBackend()
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.stats = {"enumerations": 0, "cache_hits": 0}
+
+    def set_backend(self, backend):
+        """Swap the platform backend (None for the real one) and drop the cached snapshot"""
+        with self.lock:
+            self.backend = backend or WindowsBackend()
+            self.snapshot = None
+
+    def invalidate(self):
+        """Force the next call to enumerate windows again (e.g. after sending keystrokes)"""
+        with self.lock:
+            self.snapshot = None
+
+    def get_snapshot(self):
+        """Get the current window snapshot, enumerating only if the cached one is older than the TTL"""
+        with self.lock:
+            now = time.time()
+            if self.snapshot and now - self.snapshot.taken_at < self.ttl:
+                self.stats["cache_hits"] += 1
+                return self.snapshot
+            self.snapshot = WindowSnapshot(self.backend.get_all_windows(), now)
+            self.stats["enumerations"] += 1
+            return self.snapshot
+
+    def get_active_window(self):
+        """Get the foreground window (not cached, it's a single cheap call)"""
+        return self.backend.get_active_window()
+
+    def get_backend(self):
+        """The current platform backend, for keyboard input"""
+        return self.backend
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+# Shared instance used by the watcher and SSMS automation
+window_snapshots = WindowSnapshotService()